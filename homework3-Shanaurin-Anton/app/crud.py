@@ -8,8 +8,10 @@ from .models import User, Post, PostStatus
 from contextlib import contextmanager
 
 @contextmanager
-def get_session():
+def get_session(read_only: bool = False):
+    """read_only=True — чтение с реплики (см. app/routing.py)"""
     session = SessionLocal()
+    session.info["read_only"] = read_only
     try:
         yield session
         session.commit()
@@ -43,7 +45,7 @@ def create_user_with_posts(email: str, full_name: str | None, posts: list[dict])
 
 # Read: получить пользователя с постами
 def get_user_with_posts(user_id: int) -> User | None:
-    with get_session() as s:
+    with get_session(read_only=True) as s:
         stmt = (
             select(User)
             .options(selectinload(User.posts))
@@ -56,7 +58,7 @@ def get_user_with_posts(user_id: int) -> User | None:
 
 # Read: пагинация постов по статусу
 def list_posts_by_status(status: PostStatus, limit: int = 50, offset: int = 0) -> Sequence[Post]:
-    with get_session() as s:
+    with get_session(read_only=True) as s:
         stmt = (
             select(Post)
             .where(Post.status == status)
@@ -0,0 +1,195 @@
+"""
+Маршрутизация запросов между primary и репликами.
+
+Запись и всё, что выполняется при flush, идёт на primary, чтение в
+сессиях с read_only=True — на реплику. Реплика пропускается, если:
+  - она недоступна;
+  - её отставание больше max_lag секунд;
+  - она ещё не воспроизвела последнюю запись текущего контекста
+    (read-your-writes). После commit с изменениями запоминается
+    pg_current_wal_lsn() primary, реплика подходит, когда
+    pg_last_wal_replay_lsn() дошёл до этой позиции.
+Если подходящей реплики нет, чтение уходит на primary.
+
+Позиция последней записи хранится в ContextVar, поэтому у каждого
+потока или asyncio-задачи она своя. Если после commit её не удалось
+получить, она сбрасывается, и следующее чтение может не увидеть эту запись.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+logger = logging.getLogger(__name__)
+
+_last_write_lsn: ContextVar[int | None] = ContextVar("last_write_lsn", default=None)
+
+REPLICA_STATUS_SQL = text("""
+    SELECT pg_is_in_recovery(),
+           pg_last_wal_replay_lsn()::text,
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END
+""")
+
+
+def parse_lsn(lsn: str | None) -> int | None:
+    """'16/B374D848' -> позиция в WAL числом"""
+    if lsn is None:
+        return None
+    hi, lo = lsn.split("/")
+    return (int(hi, 16) << 32) | int(lo, 16)
+
+
+class ReplicaStatus:
+    def __init__(self, replay_lsn: int | None, lag: float, checked_at: float):
+        self.replay_lsn = replay_lsn  # None — сервер не в режиме восстановления
+        self.lag = lag
+        self.checked_at = checked_at
+
+    def caught_up(self, lsn: int | None) -> bool:
+        return lsn is None or self.replay_lsn is None or self.replay_lsn >= lsn
+
+
+class ReplicaRouter:
+    """
+    primary       — движок для записи (роль приложения с ограниченными правами);
+    replicas      — движки реплик, перебираются по кругу;
+    max_lag       — допустимое отставание реплики, с;
+    check_interval — как долго кешировать состояние реплики, с (в том
+                    числе неудачную проверку: недоступная реплика не
+                    опрашивается при каждом чтении);
+    wait_timeout  — сколько ждать, пока реплика догонит свою запись,
+                    прежде чем читать с primary (0 — не ждать).
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: list[Engine] | None = None,
+        *,
+        max_lag: float = 1.0,
+        check_interval: float = 0.5,
+        wait_timeout: float = 0.0,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas or [])
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.wait_timeout = wait_timeout
+        # реплика -> (состояние или None при ошибке, время проверки)
+        self._status: dict[Engine, tuple[ReplicaStatus | None, float]] = {}
+        self._lock = threading.Lock()
+        self._next = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+
+    def note_write(self) -> None:
+        """Запомнить позицию WAL primary после commit с изменениями"""
+        with self.primary.connect() as conn:
+            lsn = conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar_one()
+        _last_write_lsn.set(parse_lsn(lsn))
+
+    def forget_writes(self) -> None:
+        _last_write_lsn.set(None)
+
+    def _check(self, replica: Engine) -> ReplicaStatus | None:
+        try:
+            with replica.connect() as conn:
+                in_recovery, replay_lsn, lag = conn.execute(REPLICA_STATUS_SQL).one()
+        except Exception:
+            status = None
+        else:
+            status = ReplicaStatus(
+                parse_lsn(replay_lsn) if in_recovery else None,
+                float(lag) if in_recovery else 0.0,
+                time.monotonic(),
+            )
+        with self._lock:
+            self._status[replica] = (status, time.monotonic())
+        return status
+
+    def status(self, replica: Engine, fresh: bool = False) -> ReplicaStatus | None:
+        with self._lock:
+            cached = self._status.get(replica)
+        if not fresh and cached is not None and time.monotonic() - cached[1] < self.check_interval:
+            return cached[0]
+        return self._check(replica)
+
+    def _usable(self, replica: Engine, lsn: int | None) -> bool:
+        status = self.status(replica)
+        if status is None or status.lag > self.max_lag:
+            return False
+        if status.caught_up(lsn):
+            return True
+        # кешированное состояние могло устареть — проверяем заново,
+        # при необходимости ждём wait_timeout
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            status = self.status(replica, fresh=True)
+            if status is not None and status.caught_up(lsn):
+                return True
+            if status is None or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def read_engine(self) -> Engine:
+        """Реплика, пригодная для чтения в текущем контексте, иначе primary"""
+        if not self.replicas:
+            return self.primary
+        lsn = _last_write_lsn.get()
+        with self._lock:
+            start = next(self._next)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if self._usable(replica, lsn):
+                return replica
+        return self.primary
+
+
+class RoutingSession(Session):
+    """
+    Session, выбирающая движок через ReplicaRouter. Сессия с
+    info["read_only"] = True читает с одной реплики до конца транзакции;
+    flush и UPDATE/DELETE/INSERT всегда уходят на primary.
+    """
+
+    def __init__(self, *args, router: ReplicaRouter, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        # _flushing — внутренний атрибут Session (SQLAlchemy 1.4/2.0): flush
+        # не передаёт в get_bind признак записи, при обновлении версии
+        # проверить, что атрибут ещё есть
+        if self.info.get("read_only") and not self._flushing and not isinstance(clause, UpdateBase):
+            if "read_bind" not in self.info:
+                self.info["read_bind"] = self.router.read_engine()
+            return self.info["read_bind"]
+        # text() на запись не отличить от чтения, поэтому он считается
+        # изменением; обычный SELECT позицию WAL не сдвигает
+        if self._flushing or isinstance(clause, (UpdateBase, TextClause)):
+            self.info["wrote"] = True
+        return self.router.primary
+
+    def commit(self) -> None:
+        super().commit()
+        self.info.pop("read_bind", None)
+        if self.info.pop("wrote", False):
+            try:
+                self.router.note_write()
+            except SQLAlchemyError:
+                # транзакция уже зафиксирована, ошибку не пробрасываем
+                logger.warning("Не удалось получить позицию WAL после commit", exc_info=True)
+                self.router.forget_writes()
+
+    def rollback(self) -> None:
+        super().rollback()
+        self.info.pop("read_bind", None)
+        self.info.pop("wrote", None)
@@ -0,0 +1,45 @@
+"""
+Проверка маршрутизации на паре primary/реплика из docker-compose.replica.yaml:
+чтение идёт на реплику, сразу после записи — на primary или на
+догнавшую реплику, а роль приложения не может удалить таблицу.
+"""
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from app.crud import create_user_with_posts, delete_user, get_user_with_posts, list_posts_by_status
+from app.db import engine, router
+from app.models import PostStatus
+
+
+def where_reads_go() -> str:
+    bind = router.read_engine()
+    return "primary" if bind is router.primary else f"реплика {bind.url.port}"
+
+
+print("Чтение до записи:", where_reads_go())
+
+u = create_user_with_posts(
+    email=f"routing-{int(time.time())}@example.com",
+    full_name="Routing",
+    posts=[{"title": "Hello", "content": "World", "status": PostStatus.published}],
+)
+print("Чтение сразу после записи:", where_reads_go())
+
+u2 = get_user_with_posts(u.id)
+assert u2 is not None and len(u2.posts) == 1, "реплика вернула данные без последней записи"
+print("Пользователь прочитан:", u2.id, [p.title for p in u2.posts])
+print("Опубликовано:", len(list_posts_by_status(PostStatus.published)))
+
+time.sleep(1)
+print("Чтение через секунду:", where_reads_go())
+
+try:
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE posts"))
+    print("ВНИМАНИЕ: роль приложения смогла удалить таблицу")
+except ProgrammingError as e:
+    print("DROP TABLE запрещён:", e.orig.pgerror.strip())
+
+print("Delete user:", delete_user(u.id))
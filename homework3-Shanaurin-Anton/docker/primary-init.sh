@@ -0,0 +1,21 @@
+#!/bin/sh
+# Инициализация primary: роль для репликации и роль приложения без права DROP
+# (раздел 2 отчёта homework8). Выполняется один раз при создании кластера.
+set -e
+
+psql -v ON_ERROR_STOP=1 -U "$POSTGRES_USER" -d "$POSTGRES_DB" <<SQL
+CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD 'replicator_pass';
+SELECT pg_create_physical_replication_slot('replica1');
+
+CREATE ROLE limited_user WITH LOGIN PASSWORD 'strong_password';
+GRANT CONNECT ON DATABASE $POSTGRES_DB TO limited_user;
+GRANT USAGE ON SCHEMA public TO limited_user;
+REVOKE CREATE ON SCHEMA public FROM limited_user;
+-- таблицы создаёт alembic под владельцем app: права выдаются заранее
+ALTER DEFAULT PRIVILEGES FOR ROLE $POSTGRES_USER IN SCHEMA public
+    GRANT SELECT, INSERT, UPDATE, DELETE ON TABLES TO limited_user;
+ALTER DEFAULT PRIVILEGES FOR ROLE $POSTGRES_USER IN SCHEMA public
+    GRANT USAGE, SELECT ON SEQUENCES TO limited_user;
+SQL
+
+echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
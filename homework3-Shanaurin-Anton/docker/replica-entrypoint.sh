@@ -0,0 +1,17 @@
+#!/bin/sh
+# Реплика: при пустом каталоге данных снимает pg_basebackup с primary
+# (-R пишет standby.signal и primary_conninfo), затем запускает postgres.
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    export PGPASSWORD="$REPLICATION_PASSWORD"
+    until pg_basebackup -h "$PRIMARY_HOST" -U replicator -D "$PGDATA" \
+            -S replica1 -X stream -R; do
+        echo "primary недоступен, повтор через 1 с"
+        rm -rf "$PGDATA"/*
+        sleep 1
+    done
+    chmod 0700 "$PGDATA"
+fi
+
+exec postgres -c hot_standby=on -c hot_standby_feedback=on
@@ -0,0 +1,172 @@
+"""Тесты маршрутизации чтения без серверов: движки подменяются заглушками"""
+
+import pytest
+from sqlalchemy import select, table, text, update
+from sqlalchemy.exc import OperationalError
+
+from app import routing
+from app.routing import ReplicaRouter, ReplicaStatus, RoutingSession, parse_lsn
+
+users = table("users")
+
+
+class FakeEngine:
+    """
+    Движок, отвечающий на запросы ReplicaRouter: состояние реплики
+    (in_recovery, replay_lsn, lag) и pg_current_wal_lsn(). down=True —
+    сервер недоступен.
+    """
+
+    def __init__(self, replay_lsn="0/10", lag=0.0, in_recovery=True, current_lsn="0/10"):
+        self.replay_lsn = replay_lsn
+        self.lag = lag
+        self.in_recovery = in_recovery
+        self.current_lsn = current_lsn
+        self.down = False
+        self.checks = 0
+
+    def connect(self):
+        self.checks += 1
+        if self.down:
+            raise OperationalError("connect", {}, ConnectionError("сервер недоступен"))
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement):
+        return self
+
+    def one(self):
+        return self.in_recovery, self.replay_lsn, self.lag
+
+    def scalar_one(self):
+        return self.current_lsn
+
+
+@pytest.fixture(autouse=True)
+def no_writes():
+    routing._last_write_lsn.set(None)
+
+
+def test_parse_lsn():
+    assert parse_lsn("16/B374D848") == 0x16_B374D848
+    assert parse_lsn("0/10") < parse_lsn("0/FF") < parse_lsn("1/0")
+    assert parse_lsn(None) is None
+
+
+def test_caught_up():
+    replica = ReplicaStatus(replay_lsn=100, lag=0.0, checked_at=0.0)
+    assert replica.caught_up(None)
+    assert replica.caught_up(100)
+    assert not replica.caught_up(101)
+    # не в режиме восстановления — это primary, на нём все записи
+    assert ReplicaStatus(None, 0.0, 0.0).caught_up(101)
+
+
+def test_read_engine_without_replicas_is_primary():
+    primary = FakeEngine()
+    assert ReplicaRouter(primary).read_engine() is primary
+
+
+def test_failed_check_is_cached():
+    primary, replica = FakeEngine(), FakeEngine()
+    replica.down = True
+    router = ReplicaRouter(primary, [replica], check_interval=60)
+
+    assert router.read_engine() is primary
+    assert router.read_engine() is primary
+    assert replica.checks == 1
+
+
+def test_lagging_replica_skipped():
+    primary, replica = FakeEngine(), FakeEngine(lag=5.0)
+    router = ReplicaRouter(primary, [replica], max_lag=1.0)
+
+    assert router.read_engine() is primary
+
+
+def test_replica_behind_own_write_skipped_without_wait():
+    primary, replica = FakeEngine(current_lsn="0/20"), FakeEngine(replay_lsn="0/10")
+    router = ReplicaRouter(primary, [replica], check_interval=60)
+    assert router.read_engine() is replica
+
+    router.note_write()
+
+    assert router.read_engine() is primary
+    assert replica.checks == 2  # кешированное состояние перепроверено
+
+
+def test_waits_for_replica_to_catch_up():
+    primary, replica = FakeEngine(current_lsn="0/20"), FakeEngine(replay_lsn="0/10")
+    router = ReplicaRouter(primary, [replica], check_interval=60, wait_timeout=1.0)
+    router.note_write()
+
+    def catch_up(statement):
+        if replica.checks >= 3:
+            replica.replay_lsn = "0/20"
+        return replica
+
+    replica.execute = catch_up
+
+    assert router.read_engine() is replica
+    assert replica.checks == 3
+
+
+def make_session(**info):
+    primary, replica = FakeEngine(), FakeEngine()
+    session = RoutingSession(router=ReplicaRouter(primary, [replica]))
+    session.info.update(info)
+    return session, primary, replica
+
+
+def test_read_only_select_goes_to_one_replica():
+    session, primary, replica = make_session(read_only=True)
+
+    assert session.get_bind(clause=select(users)) is replica
+    assert session.get_bind(clause=select(users)) is replica
+    assert "wrote" not in session.info
+
+
+def test_dml_in_read_only_session_goes_to_primary():
+    session, primary, replica = make_session(read_only=True)
+
+    assert session.get_bind(clause=update(users)) is primary
+    assert session.info["wrote"]
+
+
+@pytest.mark.parametrize("clause", [update(users), text("SELECT 1")])
+def test_dml_and_text_count_as_writes(clause):
+    session, primary, replica = make_session()
+
+    assert session.get_bind(clause=clause) is primary
+    assert session.info["wrote"]
+
+
+def test_flush_goes_to_primary():
+    session, primary, replica = make_session(read_only=True)
+    session._flushing = True
+
+    assert session.get_bind() is primary
+    assert session.info["wrote"]
+
+
+def test_select_without_read_only_uses_primary_and_is_not_a_write():
+    session, primary, replica = make_session()
+
+    assert session.get_bind(clause=select(users)) is primary
+    assert "wrote" not in session.info
+
+
+def test_commit_succeeds_when_wal_position_unavailable():
+    session, primary, replica = make_session()
+    session.router.note_write()
+    session.get_bind(clause=update(users))
+    primary.down = True
+
+    session.commit()
+
+    assert routing._last_write_lsn.get() is None
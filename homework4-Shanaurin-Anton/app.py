@@ -1,8 +1,42 @@
-from datetime import datetime
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pprint import pprint
-from typing import Optional
+from typing import Iterator, Optional
 
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from bson import MinKey
+from pymongo import MongoClient, ASCENDING, DESCENDING, HASHED
+from pymongo.errors import OperationFailure
+
+
+# Поддерживаемые ключи шардирования коллекции orders:
+#   - customer   — хешированный customer.customer_id: равномерное распределение,
+#                  запросы по клиенту уходят на один шард (targeted);
+#   - order_date — диапазонный ключ по дате: запросы по периоду затрагивают
+#                  только шарды с нужными чанками, но вставки «горячие».
+SHARD_KEYS = {
+    "customer": [("customer.customer_id", HASHED)],
+    "order_date": [("order_date", ASCENDING)],
+}
+
+# Квантиль нормального распределения для 95% доверительного интервала
+Z_95 = 1.96
+
+
+def _estimate_total(
+    sample_sum: float, sample_sum_sq: float, n: int, population: int
+) -> tuple[float, float]:
+    """
+    Оценка суммы показателя по всей коллекции по простой случайной выборке
+    из n документов (документы без вклада считаются нулями):
+        total ≈ N·mean,  ошибка = z·N·s/√n·√(1 − n/N)  (95% интервал).
+    Возвращает (оценка, полуширина интервала).
+    """
+    mean = sample_sum / n
+    variance = max(sample_sum_sq - n * mean * mean, 0.0) / (n - 1) if n > 1 else 0.0
+    fpc = max(1 - n / population, 0.0)
+    return population * mean, Z_95 * population * math.sqrt(variance / n * fpc)
 
 
 class OrdersRepository:
@@ -47,14 +81,111 @@ class OrdersRepository:
     }
     """
 
-    def __init__(self, mongo_uri="mongodb://localhost:27017", db_name="shop_db"):
+    def __init__(
+        self,
+        mongo_uri="mongodb://localhost:27017",
+        db_name="shop_db",
+        shard_key: Optional[str] = None,
+    ):
+        """
+        shard_key — режим шардированного кластера (подключение через mongos):
+            None         — одиночный mongod, коллекция не шардируется;
+            "customer"   — хешированный ключ customer.customer_id;
+            "order_date" — диапазонный ключ order_date.
+        """
+        if shard_key is not None and shard_key not in SHARD_KEYS:
+            raise ValueError(
+                f"Неизвестный ключ шардирования: {shard_key!r}, "
+                f"допустимые: {', '.join(SHARD_KEYS)}"
+            )
         self.client = MongoClient(mongo_uri)
         self.db = self.client[db_name]
         self.collection = self.db["orders"]
+        self.shard_key = shard_key
+
+        if shard_key is not None:
+            self._ensure_sharding()
 
         # Создаём индексы на часто используемых полях
         self._ensure_indexes()
 
+    def _ensure_sharding(self):
+        """
+        Включение шардирования БД и коллекции orders.
+        Индекс под ключ шардирования создаётся заранее, чтобы shardCollection
+        работал и для уже заполненной коллекции. Повторный вызов безопасен.
+        """
+        key = SHARD_KEYS[self.shard_key]
+        namespace = f"{self.db.name}.{self.collection.name}"
+
+        existing = self.client["config"]["collections"].find_one(
+            {"_id": namespace, "dropped": {"$ne": True}}
+        )
+        if existing is not None:
+            if existing["key"] != dict(key):
+                raise RuntimeError(
+                    f"Коллекция {namespace} уже шардирована по ключу {existing['key']}"
+                )
+            return
+
+        self.client.admin.command("enableSharding", self.db.name)
+        self.collection.create_index(key, name=f"idx_shard_{self.shard_key}")
+        self.client.admin.command("shardCollection", namespace, key=dict(key))
+
+    def presplit_by_month(self, start: datetime, end: datetime):
+        """
+        Для ключа order_date: разбить коллекцию на чанки по месяцам периода
+        [start, end) и разложить их по шардам непрерывными блоками.
+        Вызывается до загрузки: иначе все вставки попадают в единственный
+        чанк на первичном шарде, и данные расползаются по кластеру только
+        после миграций балансировщика. Повторный вызов безопасен.
+        """
+        if self.shard_key != "order_date":
+            raise ValueError("Предварительное разбиение нужно только для ключа order_date")
+        namespace = f"{self.db.name}.{self.collection.name}"
+
+        bounds = []
+        month = datetime(start.year, start.month, 1)
+        while month < end:
+            if month > start:
+                bounds.append(month)
+            month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+        for bound in bounds:
+            try:
+                self.client.admin.command("split", namespace, middle={"order_date": bound})
+            except OperationFailure as exc:
+                # граница уже есть после предыдущего вызова
+                if "boundary" not in str(exc):
+                    raise
+
+        shards = [s["_id"] for s in self.client.admin.command("listShards")["shards"]]
+        lowers = [MinKey()] + bounds
+        for i, lower in enumerate(lowers):
+            # соседние месяцы — на одном шарде: запрос за период остаётся targeted
+            shard = shards[i * len(shards) // len(lowers)]
+            try:
+                self.client.admin.command(
+                    "moveChunk", namespace, find={"order_date": lower}, to=shard
+                )
+            except OperationFailure as exc:
+                if "already" not in str(exc):
+                    raise
+
+    def query_shards(self, query: dict) -> list[str]:
+        """
+        Список шардов, на которые mongos отправит find с данным фильтром.
+        Один шард — targeted-запрос, все шарды — scatter-gather.
+        Для нешардированной коллекции возвращает пустой список.
+        """
+        plan = self.db.command(
+            "explain",
+            {"find": self.collection.name, "filter": query},
+            verbosity="queryPlanner",
+        )
+        winning = plan["queryPlanner"]["winningPlan"]
+        return [shard["shardName"] for shard in winning.get("shards", [])]
+
     def _ensure_indexes(self):
         """
         Создание индексов.
@@ -101,12 +232,22 @@ class OrdersRepository:
         """
         return self.collection.find_one({"_id": order_id})
 
-    def get_orders_by_customer(self, customer_id: str, limit: int = 10):
+    def get_orders_by_customer(
+        self, customer_id: str, limit: int = 10, since: Optional[datetime] = None
+    ):
         """
         Использует индекс idx_customer_id.
+        При shard_key="customer" равенство по ключу шардирования делает запрос
+        targeted (один шард). При shard_key="order_date" запрос по клиенту
+        рассылается на все шарды; ограничение since сужает его до шардов
+        с чанками за нужный период.
         """
+        query = {"customer.customer_id": customer_id}
+        if since is not None:
+            query["order_date"] = {"$gte": since}
+
         cursor = (
-            self.collection.find({"customer.customer_id": customer_id})
+            self.collection.find(query)
             .sort("order_date", DESCENDING)
             .limit(limit)
         )
@@ -128,64 +269,176 @@ class OrdersRepository:
 
     # --------------- Агрегационные аналитические запросы ---------------
 
-    def total_revenue_by_city(self, start_date: datetime, end_date: datetime):
+    @staticmethod
+    def _split_period(
+        start_date: datetime, end_date: datetime, partitions: int
+    ) -> list[dict]:
+        """
+        Разбиение [start_date, end_date] на partitions непересекающихся
+        подпериодов. Возвращает условия на order_date: [lo, hi) для всех
+        подпериодов, кроме последнего, который включает end_date.
+        """
+        if partitions < 1:
+            raise ValueError("partitions должно быть >= 1")
+        step = (end_date - start_date) / partitions
+        bounds = [start_date + step * i for i in range(partitions)] + [end_date]
+        conditions = [
+            {"$gte": lo, "$lt": hi} for lo, hi in zip(bounds[:-2], bounds[1:-1])
+        ]
+        conditions.append({"$gte": bounds[-2], "$lte": end_date})
+        return conditions
+
+    def _fan_out(
+        self,
+        build_pipeline,
+        start_date: datetime,
+        end_date: datetime,
+        partitions: int,
+        max_workers: Optional[int],
+    ) -> list[list[dict]]:
+        """
+        Параллельный запуск конвейера по подпериодам в пуле потоков
+        (MongoClient потокобезопасен и держит собственный пул соединений).
+        build_pipeline получает условие на order_date и возвращает конвейер.
+        """
+        conditions = self._split_period(start_date, end_date, partitions)
+
+        def run(condition):
+            return list(self.collection.aggregate(build_pipeline(condition)))
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(conditions)) as pool:
+            return list(pool.map(run, conditions))
+
+    def total_revenue_by_city(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        partitions: int = 1,
+        max_workers: Optional[int] = None,
+    ):
         """
         Посчитать выручку по городам за период.
         Использует индексы:
             - order_date (idx_order_date)
             - shipping.address.city (idx_city)
+
+        partitions > 1 — период делится на подпериоды, агрегации по ним
+        выполняются параллельно (не более max_workers одновременно),
+        частичные суммы объединяются на клиенте.
         """
-        pipeline = [
-            {
-                "$match": {
-                    "order_date": {"$gte": start_date, "$lte": end_date},
-                    "status": "delivered",
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$shipping.address.city",
-                    "total_revenue": {"$sum": "$total_amount"},
-                    "orders_count": {"$sum": 1},
-                }
-            },
-            {"$sort": {"total_revenue": -1}},
-        ]
-        return list(self.collection.aggregate(pipeline))
 
-    def avg_check_by_segment(self, start_date: datetime, end_date: datetime):
+        def build_pipeline(order_date: dict) -> list[dict]:
+            return [
+                {"$match": {"order_date": order_date, "status": "delivered"}},
+                {
+                    "$group": {
+                        "_id": "$shipping.address.city",
+                        "total_revenue": {"$sum": "$total_amount"},
+                        "orders_count": {"$sum": 1},
+                    }
+                },
+            ]
+
+        if partitions == 1:
+            pipeline = build_pipeline({"$gte": start_date, "$lte": end_date})
+            pipeline.append({"$sort": {"total_revenue": -1}})
+            return list(self.collection.aggregate(pipeline))
+
+        merged = {}
+        for partial in self._fan_out(
+            build_pipeline, start_date, end_date, partitions, max_workers
+        ):
+            for doc in partial:
+                acc = merged.setdefault(
+                    doc["_id"], {"_id": doc["_id"], "total_revenue": 0, "orders_count": 0}
+                )
+                acc["total_revenue"] += doc["total_revenue"]
+                acc["orders_count"] += doc["orders_count"]
+        return sorted(merged.values(), key=lambda doc: doc["total_revenue"], reverse=True)
+
+    def avg_check_by_segment(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        partitions: int = 1,
+        max_workers: Optional[int] = None,
+    ):
         """
         Средний чек по сегментам клиентов (b2c/b2b и т.п.) за период.
         Индексы:
           - order_date (idx_order_date)
           - customer.segment можно проиндексировать дополнительно при необходимости.
+
+        partitions > 1 — параллельный расчёт по подпериодам, как
+        в total_revenue_by_city. Средние подпериодов не усредняются:
+        подпериоды возвращают сумму и количество, среднее считается
+        по объединённым значениям.
         """
         # при желании можно добавить индекс:
         # self.collection.create_index([("customer.segment", ASCENDING)], name="idx_segment")
 
-        pipeline = [
-            {
-                "$match": {
-                    "order_date": {"$gte": start_date, "$lte": end_date},
-                    "status": "delivered",
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$customer.segment",
-                    "avg_check": {"$avg": "$total_amount"},
-                    "orders_count": {"$sum": 1},
-                }
-            },
-            {"$sort": {"avg_check": -1}},
+        match = {"status": "delivered"}
+
+        if partitions == 1:
+            pipeline = [
+                {
+                    "$match": {
+                        **match,
+                        "order_date": {"$gte": start_date, "$lte": end_date},
+                    }
+                },
+                {
+                    "$group": {
+                        "_id": "$customer.segment",
+                        "avg_check": {"$avg": "$total_amount"},
+                        "orders_count": {"$sum": 1},
+                    }
+                },
+                {"$sort": {"avg_check": -1}},
+            ]
+            return list(self.collection.aggregate(pipeline))
+
+        def build_pipeline(order_date: dict) -> list[dict]:
+            return [
+                {"$match": {**match, "order_date": order_date}},
+                {
+                    "$group": {
+                        "_id": "$customer.segment",
+                        "revenue": {"$sum": "$total_amount"},
+                        "orders_count": {"$sum": 1},
+                    }
+                },
+            ]
+
+        totals = {}
+        for partial in self._fan_out(
+            build_pipeline, start_date, end_date, partitions, max_workers
+        ):
+            for doc in partial:
+                revenue, count = totals.get(doc["_id"], (0, 0))
+                totals[doc["_id"]] = (revenue + doc["revenue"], count + doc["orders_count"])
+
+        result = [
+            {"_id": segment, "avg_check": revenue / count, "orders_count": count}
+            for segment, (revenue, count) in totals.items()
         ]
-        return list(self.collection.aggregate(pipeline))
+        return sorted(result, key=lambda doc: doc["avg_check"], reverse=True)
 
-    def top_categories(self, limit: int = 5):
+    def top_categories(
+        self, limit: int = 5, approx: bool = False, sample_size: int = 10_000
+    ):
         """
         Топ категорий товаров по выручке за всё время.
         Использует индекс по items.category (idx_items_category).
+
+        approx=True — приближённый ответ по случайной выборке из sample_size
+        заказов ($sample) вместо $unwind всей коллекции. revenue и items_sold
+        масштабируются на размер коллекции, revenue_error — полуширина 95%
+        доверительного интервала для revenue.
         """
+        if approx:
+            return self._approx_top_categories(limit, sample_size)
+
         pipeline = [
             {"$unwind": "$items"},
             {
@@ -202,26 +455,118 @@ class OrdersRepository:
         ]
         return list(self.collection.aggregate(pipeline))
 
-    def monthly_revenue_by_status(self):
+    def _approx_top_categories(self, limit: int, sample_size: int):
+        population = self.collection.estimated_document_count()
+        if population == 0:
+            return []
+        n = min(sample_size, population)
+
+        # Сначала выручка категории в каждом заказе выборки, затем сумма
+        # и сумма квадратов по категориям — для оценки дисперсии.
+        pipeline = [
+            {"$sample": {"size": n}},
+            {"$unwind": "$items"},
+            {
+                "$group": {
+                    "_id": {"order": "$_id", "category": "$items.category"},
+                    "revenue": {
+                        "$sum": {"$multiply": ["$items.price", "$items.quantity"]}
+                    },
+                    "items_sold": {"$sum": "$items.quantity"},
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$_id.category",
+                    "revenue": {"$sum": "$revenue"},
+                    "revenue_sq": {"$sum": {"$multiply": ["$revenue", "$revenue"]}},
+                    "items_sold": {"$sum": "$items_sold"},
+                }
+            },
+        ]
+        result = []
+        for doc in self.collection.aggregate(pipeline, allowDiskUse=True):
+            revenue, revenue_error = _estimate_total(
+                doc["revenue"], doc["revenue_sq"], n, population
+            )
+            result.append(
+                {
+                    "_id": doc["_id"],
+                    "revenue": revenue,
+                    "revenue_error": revenue_error,
+                    "items_sold": doc["items_sold"] * population / n,
+                }
+            )
+        result.sort(key=lambda doc: doc["revenue"], reverse=True)
+        return result[:limit]
+
+    def monthly_revenue_by_status(self, approx: bool = False, sample_size: int = 10_000):
         """
         Помесячная выручка в разрезе статусов заказов.
         Использует индекс order_date и status.
+
+        approx=True — оценка по случайной выборке из sample_size заказов,
+        как в top_categories; total_revenue_error и orders_count_error —
+        полуширины 95% доверительных интервалов.
         """
+        group_id = {
+            "year": {"$year": "$order_date"},
+            "month": {"$month": "$order_date"},
+            "status": "$status",
+        }
+        sort = {"$sort": {"_id.year": 1, "_id.month": 1, "_id.status": 1}}
+
+        if not approx:
+            pipeline = [
+                {
+                    "$group": {
+                        "_id": group_id,
+                        "total_revenue": {"$sum": "$total_amount"},
+                        "orders_count": {"$sum": 1},
+                    }
+                },
+                sort,
+            ]
+            return list(self.collection.aggregate(pipeline))
+
+        population = self.collection.estimated_document_count()
+        if population == 0:
+            return []
+        n = min(sample_size, population)
+
         pipeline = [
+            {"$sample": {"size": n}},
             {
                 "$group": {
-                    "_id": {
-                        "year": {"$year": "$order_date"},
-                        "month": {"$month": "$order_date"},
-                        "status": "$status",
-                    },
+                    "_id": group_id,
                     "total_revenue": {"$sum": "$total_amount"},
+                    "total_revenue_sq": {
+                        "$sum": {"$multiply": ["$total_amount", "$total_amount"]}
+                    },
                     "orders_count": {"$sum": 1},
                 }
             },
-            {"$sort": {"_id.year": 1, "_id.month": 1, "_id.status": 1}},
+            sort,
         ]
-        return list(self.collection.aggregate(pipeline))
+        result = []
+        for doc in self.collection.aggregate(pipeline, allowDiskUse=True):
+            revenue, revenue_error = _estimate_total(
+                doc["total_revenue"], doc["total_revenue_sq"], n, population
+            )
+            # для счётчика вклад заказа — 0 или 1, сумма квадратов равна сумме
+            count, count_error = _estimate_total(
+                doc["orders_count"], doc["orders_count"], n, population
+            )
+            result.append(
+                {
+                    "_id": doc["_id"],
+                    "total_revenue": revenue,
+                    "total_revenue_error": revenue_error,
+                    "orders_count": count,
+                    "orders_count_error": count_error,
+                }
+            )
+        return result
 
     def get_orders_with_filter(
         self,
@@ -350,6 +695,60 @@ def seed_data(repo: OrdersRepository):
     repo.insert_many_orders(orders)
 
 
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Екатеринбург"]
+CATEGORIES = ["electronics", "accessories", "books", "clothes", "food", "toys"]
+SEGMENTS = ["b2c", "b2b"]
+STATUSES = ["delivered", "delivered", "delivered", "processing", "cancelled"]
+
+
+def generate_orders(
+    n: int,
+    customers: int = 10_000,
+    start: datetime = datetime(2024, 1, 1),
+    days: int = 365,
+    seed: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Генерация n случайных заказов той же структуры, что и в seed_data.
+    Используется для нагрузочных замеров (bench_*.py).
+    """
+    rnd = random.Random(seed)
+    for _ in range(n):
+        customer_no = rnd.randint(1, customers)
+        items = []
+        for _ in range(rnd.randint(1, 4)):
+            category = rnd.choice(CATEGORIES)
+            items.append(
+                {
+                    "sku": f"SKU-{rnd.randint(1000, 9999)}",
+                    "name": category,
+                    "category": category,
+                    "price": rnd.randint(100, 100_000),
+                    "quantity": rnd.randint(1, 5),
+                }
+            )
+        shipping_cost = rnd.choice([0, 300, 500])
+        yield {
+            "customer": {
+                "customer_id": f"C{customer_no:06d}",
+                "name": f"Клиент {customer_no}",
+                "email": f"c{customer_no}@example.com",
+                "segment": SEGMENTS[customer_no % len(SEGMENTS)],
+            },
+            "items": items,
+            "shipping": {
+                "address": {"city": rnd.choice(CITIES), "street": "", "zip": ""},
+                "method": "courier",
+                "cost": shipping_cost,
+            },
+            "payment": {"method": "card", "status": "paid"},
+            "order_date": start + timedelta(seconds=rnd.randint(0, days * 86400)),
+            "status": rnd.choice(STATUSES),
+            "total_amount": sum(i["price"] * i["quantity"] for i in items)
+            + shipping_cost,
+        }
+
+
 if __name__ == "__main__":
     repo = OrdersRepository()
 
@@ -373,5 +772,8 @@ if __name__ == "__main__":
     print("\nПомесячная выручка по статусам:")
     pprint(repo.monthly_revenue_by_status())
 
+    print("\nТоп категорий по выручке (оценка по выборке):")
+    pprint(repo.top_categories(approx=True, sample_size=2))
+
     print("\nФильтр: город Москва, статус delivered:")
     pprint(repo.get_orders_with_filter(city="Москва", status="delivered"))
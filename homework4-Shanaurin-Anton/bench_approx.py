@@ -0,0 +1,86 @@
+"""
+Точность и задержка приближённых агрегаций (approx=True) в сравнении
+с точными конвейерами top_categories и monthly_revenue_by_status.
+
+Коллекция последовательно дозаполняется до каждого из размеров --sizes,
+на каждом размере выводится p50 задержки обоих режимов, средняя
+относительная ошибка оценки и доля точных значений, попавших
+в 95% доверительный интервал.
+
+    python bench_approx.py --sizes 1000000 10000000 50000000
+"""
+
+import argparse
+
+from app import OrdersRepository
+from bench_common import measure, seed_orders
+
+
+def compare(exact: list[dict], approx: list[dict], value: str, error: str):
+    """Средняя относительная ошибка и покрытие интервалом по общим ключам."""
+    estimates = {str(doc["_id"]): doc for doc in approx}
+    rel_errors, covered = [], 0
+    for doc in exact:
+        estimate = estimates.get(str(doc["_id"]))
+        if estimate is None or not doc[value]:
+            continue
+        rel_errors.append(abs(estimate[value] - doc[value]) / doc[value])
+        covered += abs(estimate[value] - doc[value]) <= estimate[error]
+    if not rel_errors:
+        return float("nan"), float("nan")
+    return sum(rel_errors) / len(rel_errors), covered / len(rel_errors)
+
+
+def run_size(repo: OrdersRepository, size: int, sample_size: int, repeat: int):
+    current = repo.collection.estimated_document_count()
+    if current < size:
+        print(f"\nДозаполняю коллекцию: {current} -> {size}")
+        seed_orders(repo, size - current, seed=size)
+
+    cases = [
+        (
+            "top_categories",
+            lambda **kw: repo.top_categories(limit=100, **kw),
+            "revenue",
+            "revenue_error",
+        ),
+        (
+            "monthly_revenue_by_status",
+            repo.monthly_revenue_by_status,
+            "total_revenue",
+            "total_revenue_error",
+        ),
+    ]
+
+    print(f"\n== {size} заказов, выборка {sample_size} ==")
+    print(f"{'метод':<28}{'точно, мс':>12}{'оценка, мс':>12}{'ошибка':>10}{'покрытие':>10}")
+    for name, func, value, error in cases:
+        exact_ms, _ = measure(func, repeat)
+        approx_ms, _ = measure(lambda: func(approx=True, sample_size=sample_size), repeat)
+        rel_error, coverage = compare(
+            func(), func(approx=True, sample_size=sample_size), value, error
+        )
+        print(
+            f"{name:<28}{exact_ms:>12.1f}{approx_ms:>12.1f}"
+            f"{rel_error:>9.2%}{coverage:>10.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="shop_bench_approx")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000]
+    )
+    parser.add_argument("--sample-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    repo = OrdersRepository(args.uri, args.db)
+    for size in sorted(args.sizes):
+        run_size(repo, size, args.sample_size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
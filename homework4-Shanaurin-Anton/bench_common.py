@@ -0,0 +1,28 @@
+"""Общие помощники для нагрузочных замеров OrdersRepository (bench_*.py)."""
+
+import statistics
+import time
+from itertools import islice
+from typing import Optional
+
+from app import OrdersRepository, generate_orders
+
+
+def seed_orders(
+    repo: OrdersRepository, n: int, batch_size: int = 10_000, seed: Optional[int] = 42
+):
+    """Добавить в коллекцию n сгенерированных заказов пачками по batch_size."""
+    orders = generate_orders(n, seed=seed)
+    while batch := list(islice(orders, batch_size)):
+        repo.insert_many_orders(batch)
+
+
+def measure(func, repeat: int) -> tuple[float, float]:
+    """Медиана и p95 времени выполнения в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
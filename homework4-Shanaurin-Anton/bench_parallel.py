@@ -0,0 +1,64 @@
+"""
+Замер параллельного расчёта total_revenue_by_city и avg_check_by_segment
+по подпериодам на годовом диапазоне.
+
+Для каждого числа подпериодов из --partitions выводится p50/p95 задержки
+и проверяется, что результат совпадает с последовательным расчётом.
+
+    python bench_parallel.py --orders 2000000 --partitions 1 2 4 8 12
+"""
+
+import argparse
+import math
+from datetime import datetime
+
+from app import OrdersRepository
+from bench_common import measure, seed_orders
+
+
+def same_result(expected: list[dict], actual: list[dict], fields: tuple[str, ...]) -> bool:
+    by_id = {doc["_id"]: doc for doc in actual}
+    return len(expected) == len(actual) and all(
+        doc["_id"] in by_id
+        and all(math.isclose(doc[f], by_id[doc["_id"]][f]) for f in fields)
+        for doc in expected
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="shop_bench_parallel")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--partitions", type=int, nargs="+", default=[1, 2, 4, 8, 12])
+    parser.add_argument(
+        "--max-workers", type=int, default=None,
+        help="ограничение параллелизма (по умолчанию — по числу подпериодов)",
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    repo = OrdersRepository(args.uri, args.db)
+    current = repo.collection.estimated_document_count()
+    if current < args.orders:
+        print(f"Дозаполняю коллекцию: {current} -> {args.orders}")
+        seed_orders(repo, args.orders - current, seed=current)
+
+    start, end = datetime(2024, 1, 1), datetime(2024, 12, 31, 23, 59, 59)
+    cases = [
+        ("total_revenue_by_city", repo.total_revenue_by_city, ("total_revenue", "orders_count")),
+        ("avg_check_by_segment", repo.avg_check_by_segment, ("avg_check", "orders_count")),
+    ]
+
+    print(f"{'метод':<24}{'подпериоды':>12}{'p50, мс':>12}{'p95, мс':>12}{'совпадает':>12}")
+    for name, func, fields in cases:
+        expected = func(start, end)
+        for partitions in args.partitions:
+            call = lambda: func(start, end, partitions=partitions, max_workers=args.max_workers)
+            p50, p95 = measure(call, args.repeat)
+            ok = same_result(expected, call(), fields)
+            print(f"{name:<24}{partitions:>12}{p50:>12.1f}{p95:>12.1f}{str(ok):>12}")
+
+
+if __name__ == "__main__":
+    main()
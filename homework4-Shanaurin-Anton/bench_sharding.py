@@ -0,0 +1,88 @@
+"""
+Сравнение scatter-gather и targeted запросов OrdersRepository
+на шардированном кластере (docker-compose.sharded.yaml).
+
+Для каждого ключа шардирования коллекция заполняется одинаковыми данными,
+затем каждый метод репозитория выполняется --repeat раз, выводится
+медианная и p95 задержка и число шардов, затронутых find-запросами.
+
+    python bench_sharding.py --orders 200000 --repeat 50
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from pymongo import MongoClient
+
+from app import SHARD_KEYS, OrdersRepository
+from bench_common import measure, seed_orders
+
+
+def run(mongo_uri: str, shard_key: str, n_orders: int, repeat: int):
+    db_name = f"shop_bench_{shard_key}"
+    MongoClient(mongo_uri).drop_database(db_name)
+    repo = OrdersRepository(mongo_uri, db_name, shard_key=shard_key)
+    if shard_key == "order_date":
+        # период generate_orders по умолчанию: 2024 год
+        repo.presplit_by_month(datetime(2024, 1, 1), datetime(2025, 1, 1))
+
+    started = time.perf_counter()
+    seed_orders(repo, n_orders)
+    print(f"\n[{shard_key}] вставка {n_orders} заказов: {time.perf_counter() - started:.1f} с")
+
+    start, end = datetime(2024, 3, 1), datetime(2024, 3, 31)
+    some_order = repo.collection.find_one({}, {"_id": 1})
+
+    # (название, вызов, фильтр для explain или None для агрегаций)
+    cases = [
+        (
+            "get_order_by_id",
+            lambda: repo.get_order_by_id(some_order["_id"]),
+            {"_id": some_order["_id"]},
+        ),
+        (
+            "get_orders_by_customer",
+            lambda: repo.get_orders_by_customer("C000042"),
+            {"customer.customer_id": "C000042"},
+        ),
+        (
+            "get_orders_by_customer(since)",
+            lambda: repo.get_orders_by_customer("C000042", since=start),
+            {"customer.customer_id": "C000042", "order_date": {"$gte": start}},
+        ),
+        (
+            "get_orders_with_filter",
+            lambda: repo.get_orders_with_filter(city="Москва", status="delivered"),
+            {"shipping.address.city": "Москва", "status": "delivered"},
+        ),
+        ("total_revenue_by_city", lambda: repo.total_revenue_by_city(start, end), None),
+        ("avg_check_by_segment", lambda: repo.avg_check_by_segment(start, end), None),
+        ("top_categories", lambda: repo.top_categories(), None),
+        ("monthly_revenue_by_status", lambda: repo.monthly_revenue_by_status(), None),
+    ]
+
+    print(f"{'метод':<32}{'шарды':>8}{'p50, мс':>12}{'p95, мс':>12}")
+    for name, func, query in cases:
+        shards = len(repo.query_shards(query)) if query is not None else "-"
+        p50, p95 = measure(func, repeat)
+        print(f"{name:<32}{shards:>8}{p50:>12.2f}{p95:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--shard-key", choices=list(SHARD_KEYS), action="append",
+        help="режимы для сравнения (по умолчанию все)",
+    )
+    args = parser.parse_args()
+
+    for shard_key in args.shard_key or SHARD_KEYS:
+        run(args.uri, shard_key, args.orders, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
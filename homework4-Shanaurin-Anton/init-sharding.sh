@@ -0,0 +1,36 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Ожидание готовности узла: wait_for host:port
+wait_for() {
+  until mongosh --quiet --host "$1" --eval "db.adminCommand('ping')" >/dev/null 2>&1; do
+    echo "Жду $1..."
+    sleep 2
+  done
+}
+
+# Инициализация replica set из одного узла (повторный запуск безопасен)
+init_rs() {
+  local host="$1" rs="$2" extra="$3"
+  wait_for "$host"
+  mongosh --quiet --host "$host" --eval "
+    try { rs.status() } catch (e) {
+      rs.initiate({_id: '$rs', $extra members: [{_id: 0, host: '$host'}]})
+    }"
+}
+
+init_rs configsvr:27019 cfgrs "configsvr: true,"
+init_rs shard1:27018 shard1rs ""
+init_rs shard2:27018 shard2rs ""
+init_rs shard3:27018 shard3rs ""
+
+wait_for mongos:27017
+for i in 1 2 3; do
+  mongosh --quiet --host mongos:27017 --eval "
+    if (!db.adminCommand({listShards: 1}).shards.some(s => s._id === 'shard${i}rs')) {
+      sh.addShard('shard${i}rs/shard${i}:27018')
+    }"
+done
+
+mongosh --quiet --host mongos:27017 --eval "sh.status()"
+echo "Шардированный кластер готов"
@@ -0,0 +1,234 @@
+"""
+Асинхронный pub/sub поверх redis.asyncio с раздачей сообщений подписчикам.
+
+Одно соединение читает сообщения по всем шаблонам (PSUBSCRIBE) и
+раскладывает их по очередям подписчиков ограниченного размера. Каждый
+подписчик получает сообщения пачками: обработчик вызывается, когда
+набралось batch_size сообщений или прошло batch_timeout секунд с первого.
+
+Политики переполнения очереди подписчика:
+  - "block"       — читатель ждёт освобождения места (обратное давление;
+                    при долгом ожидании растёт буфер вывода на стороне
+                    Redis, см. client-output-buffer-limit pubsub);
+  - "drop_new"    — новое сообщение отбрасывается;
+  - "drop_oldest" — отбрасывается самое старое сообщение в очереди.
+
+При обрыве соединения читатель переподписывается с экспоненциальной
+задержкой (от reconnect_delay до max_reconnect_delay). Сообщения,
+опубликованные, пока подписки не было, теряются — так устроен pub/sub.
+
+    bus = AsyncPubSub(redis.asyncio.Redis())
+    bus.subscribe("orders:*", handle_batch, policy="drop_oldest", batch_size=100)
+    await bus.start()
+    ...
+    await bus.close()
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("block", "drop_new", "drop_oldest")
+
+Handler = Callable[[list[dict]], Awaitable[None]]
+
+
+class Subscription:
+    """Подписчик: своя очередь, политика переполнения и пакетная доставка."""
+
+    def __init__(
+        self,
+        pattern: str,
+        handler: Handler,
+        queue_size: int,
+        policy: str,
+        batch_size: int,
+        batch_timeout: float,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Неизвестная политика: {policy!r}, допустимые: {', '.join(POLICIES)}")
+        self.pattern = pattern
+        self.handler = handler
+        self.policy = policy
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.batches = 0
+
+    async def offer(self, message: dict):
+        self.received += 1
+        if self.policy == "block":
+            await self.queue.put(message)
+            return
+        if self.queue.full():
+            self.dropped += 1
+            if self.policy == "drop_new":
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def _next_batch(self) -> list[dict]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            # сначала забираем то, что уже лежит в очереди, без ожидания
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.handler(batch)
+            except Exception:
+                logger.exception("Ошибка обработчика подписки %s", self.pattern)
+            self.delivered += len(batch)
+            self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "pattern": self.pattern,
+            "received": self.received,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "queued": self.queue.qsize(),
+        }
+
+
+class AsyncPubSub:
+    """Асинхронная шина pub/sub с шаблонными подписками."""
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.redis = redis_client
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.reconnects = 0
+        self._subscriptions: dict[str, list[Subscription]] = {}
+        self._pubsub = None
+        self._tasks: list[asyncio.Task] = []
+
+    def subscribe(
+        self,
+        pattern: str,
+        handler: Handler,
+        *,
+        queue_size: int = 1000,
+        policy: str = "block",
+        batch_size: int = 100,
+        batch_timeout: float = 0.01,
+    ) -> Subscription:
+        """
+        Добавить подписчика на шаблон каналов (синтаксис PSUBSCRIBE).
+        handler — корутина, получает список сообщений {"channel", "data"}.
+        Подписчиков нужно добавить до start().
+        """
+        subscription = Subscription(
+            pattern, handler, queue_size, policy, batch_size, batch_timeout
+        )
+        self._subscriptions.setdefault(pattern, []).append(subscription)
+        return subscription
+
+    async def start(self):
+        await self._subscribe()
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                self._tasks.append(asyncio.create_task(subscription.run()))
+        self._tasks.append(asyncio.create_task(self._read()))
+
+    async def _subscribe(self):
+        self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(*self._subscriptions)
+
+    async def _drop_pubsub(self):
+        try:
+            await self._pubsub.aclose()
+        except redis.RedisError:
+            pass
+        self._pubsub = None
+
+    async def _read(self):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    self.reconnects += 1
+                    logger.info("Подписка pub/sub восстановлена")
+                    delay = self.reconnect_delay
+                await self._dispatch()
+                return
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                logger.warning(
+                    "Соединение pub/sub потеряно (%s), переподписка через %.1f с", e, delay
+                )
+                await self._drop_pubsub()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _dispatch(self):
+        # одно совпадение шаблона — одно pmessage, поэтому раздаём по шаблону
+        async for message in self._pubsub.listen():
+            if message["type"] != "pmessage":
+                continue
+            pattern = message["pattern"]
+            if isinstance(pattern, bytes):
+                pattern = pattern.decode()
+            item = {"channel": message["channel"], "data": message["data"]}
+            for subscription in self._subscriptions.get(pattern, ()):
+                await subscription.offer(item)
+
+    async def publish(self, channel: str, data) -> int:
+        return await self.redis.publish(channel, data)
+
+    async def publish_many(self, channel: str, messages, batch_size: int = 500):
+        """Публикация пачками через pipeline: один сетевой обмен на пачку."""
+        batch = []
+        for data in messages:
+            batch.append(data)
+            if len(batch) >= batch_size:
+                await self._publish_batch(channel, batch)
+                batch = []
+        if batch:
+            await self._publish_batch(channel, batch)
+
+    async def _publish_batch(self, channel: str, batch: list):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for data in batch:
+                pipe.publish(channel, data)
+            await pipe.execute()
+
+    def stats(self) -> list[dict]:
+        return [s.stats() for subs in self._subscriptions.values() for s in subs]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
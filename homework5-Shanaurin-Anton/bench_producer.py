@@ -0,0 +1,66 @@
+"""
+Пропускная способность TaskProducer: по одной задаче за сетевой обмен
+против пакетов в pipeline (для списков — LPUSH с несколькими значениями).
+
+    python bench_producer.py --tasks 100000 --batch-sizes 10 100 1000
+    python bench_producer.py --fake          # без Redis, через fakeredis
+    python bench_producer.py --backend stream
+"""
+
+import argparse
+import time
+
+from common import get_redis
+from serializers import get_serializer
+from task_queue import QUEUE_BACKENDS, TaskProducer, make_queue
+
+BENCH_QUEUE = "bench_task_queue"
+
+
+def run(producer: TaskProducer, n: int, batched: bool) -> float:
+    queue = producer.queue
+    queue.clear()
+    payloads = ({"n": i} for i in range(n))
+    started = time.perf_counter()
+    if batched:
+        producer.enqueue_many(payloads)
+    else:
+        for payload in payloads:
+            producer.enqueue(payload)
+    elapsed = time.perf_counter() - started
+    assert queue.length() == n
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--pipeline-batches", type=int, default=10)
+    parser.add_argument("--serializer", default="json", choices=["json", "msgpack", "pickle"])
+    parser.add_argument("--backend", choices=list(QUEUE_BACKENDS), default="list")
+    parser.add_argument("--fake", action="store_true", help="fakeredis вместо localhost:6379")
+    args = parser.parse_args()
+
+    if args.fake:
+        import fakeredis
+        r = fakeredis.FakeRedis()
+    else:
+        r = get_redis(decode_responses=False)
+
+    name = "queue" if args.backend == "list" else "stream"
+    queue = make_queue(
+        args.backend, r, serializer=get_serializer(args.serializer), **{name: BENCH_QUEUE}
+    )
+    print(f"{'режим':<28}{'задач/с':>14}")
+    single = TaskProducer(queue)
+    print(f"{'по одной':<28}{run(single, args.tasks, batched=False):>14,.0f}")
+    for batch_size in args.batch_sizes:
+        producer = TaskProducer(queue, batch_size, args.pipeline_batches)
+        label = f"пакет {batch_size} x {args.pipeline_batches}"
+        print(f"{label:<28}{run(producer, args.tasks, batched=True):>14,.0f}")
+    queue.clear()
+
+
+if __name__ == "__main__":
+    main()
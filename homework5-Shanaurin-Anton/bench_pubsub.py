@@ -0,0 +1,111 @@
+"""
+Пропускная способность и задержка доставки AsyncPubSub при 1, 10 и 100
+подписчиках на один шаблон каналов.
+
+Публикатор отправляет --messages сообщений пачками через pipeline, в теле
+сообщения — момент отправки. Выводится число доставленных сообщений в
+секунду (суммарно по подписчикам), p50/p99 задержки от публикации до
+вызова обработчика и число отброшенных сообщений.
+
+    python bench_pubsub.py --messages 20000 --subscribers 1 10 100
+    python bench_pubsub.py --policy drop_oldest --queue-size 100
+    python bench_pubsub.py --fake          # без Redis, через fakeredis
+"""
+
+import argparse
+import asyncio
+import time
+
+import redis.asyncio as aioredis
+
+from async_pubsub import POLICIES, AsyncPubSub
+
+BENCH_CHANNEL = "bench_pubsub:events"
+BENCH_PATTERN = "bench_pubsub:*"
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def run(redis_client, n_subscribers: int, args) -> tuple[float, float, float, int]:
+    bus = AsyncPubSub(redis_client)
+    latencies: list[float] = []
+    done = asyncio.Event()
+    expected = args.messages * n_subscribers
+    delivered = 0
+
+    async def handler(batch):
+        nonlocal delivered
+        now = time.time()
+        latencies.extend(now - float(message["data"]) for message in batch)
+        delivered += len(batch)
+        if delivered + sum(s.dropped for s in subscriptions) >= expected:
+            done.set()
+
+    subscriptions = [
+        bus.subscribe(
+            BENCH_PATTERN,
+            handler,
+            queue_size=args.queue_size,
+            policy=args.policy,
+            batch_size=args.batch_size,
+            batch_timeout=args.batch_timeout,
+        )
+        for _ in range(n_subscribers)
+    ]
+    await bus.start()
+
+    started = time.perf_counter()
+    await bus.publish_many(
+        BENCH_CHANNEL, (repr(time.time()) for _ in range(args.messages)), args.publish_batch
+    )
+    try:
+        await asyncio.wait_for(done.wait(), args.timeout)
+    except asyncio.TimeoutError:
+        print(f"  не дождались доставки за {args.timeout} с")
+    elapsed = time.perf_counter() - started
+    await bus.close()
+
+    dropped = sum(s.dropped for s in subscriptions)
+    return (
+        delivered / elapsed,
+        percentile(latencies, 0.5) * 1000,
+        percentile(latencies, 0.99) * 1000,
+        dropped,
+    )
+
+
+async def main_async(args):
+    if args.fake:
+        import fakeredis
+        redis_client = fakeredis.FakeAsyncRedis()
+    else:
+        redis_client = aioredis.Redis(host="localhost", port=6379, db=0)
+
+    print(f"{'подписчиков':<14}{'сообщ./с':>14}{'p50, мс':>12}{'p99, мс':>12}{'отброшено':>12}")
+    for n in args.subscribers:
+        rate, p50, p99, dropped = await run(redis_client, n, args)
+        print(f"{n:<14}{rate:>14,.0f}{p50:>12.2f}{p99:>12.2f}{dropped:>12}")
+    await redis_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--policy", choices=POLICIES, default="block")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--batch-timeout", type=float, default=0.01)
+    parser.add_argument("--publish-batch", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=60.0, help="ожидание доставки, с")
+    parser.add_argument("--fake", action="store_true", help="fakeredis вместо localhost:6379")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
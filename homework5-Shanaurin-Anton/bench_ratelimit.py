@@ -0,0 +1,76 @@
+"""
+Пропускная способность ограничителей из ratelimit.py: число решений
+в секунду при --threads параллельных клиентах на общем пуле соединений.
+
+Клиенты обращаются к --identities разным ключам (например, IP-адресам);
+кроме скорости выводится доля разрешённых запросов.
+
+    python bench_ratelimit.py --threads 1 8 32 --requests 20000
+    python bench_ratelimit.py --fake          # без Redis, через fakeredis
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from common import get_redis
+from ratelimit import LIMITERS, SlidingWindowLimiter, TokenBucketLimiter
+
+
+def make_limiters(r, limit: int, window: float) -> dict:
+    return {
+        "sliding": SlidingWindowLimiter(r, "bench_sliding", limit, window),
+        "bucket": TokenBucketLimiter(r, "bench_bucket", rate=limit / window, capacity=limit),
+    }
+
+
+def run(limiter, n_threads: int, n_requests: int, identities: int) -> tuple[float, float]:
+    for i in range(identities):
+        limiter.reset(f"client-{i}")
+    per_thread = n_requests // n_threads
+    allowed = [0] * n_threads
+
+    def client(index: int):
+        rng = random.Random(index)
+        for _ in range(per_thread):
+            allowed[index] += limiter.allow(f"client-{rng.randrange(identities)}").allowed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = per_thread * n_threads
+    return total / elapsed, sum(allowed) / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--identities", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=100, help="запросов на ключ за окно")
+    parser.add_argument("--window", type=float, default=1.0, help="окно, с")
+    parser.add_argument("--limiter", choices=list(LIMITERS), action="append")
+    parser.add_argument("--fake", action="store_true", help="fakeredis вместо localhost:6379")
+    args = parser.parse_args()
+
+    if args.fake:
+        import fakeredis
+        r = fakeredis.FakeRedis()
+    else:
+        r = get_redis()
+
+    limiters = make_limiters(r, args.limit, args.window)
+    print(f"{'ограничитель':<14}{'потоков':>9}{'решений/с':>14}{'разрешено':>12}")
+    for name in args.limiter or LIMITERS:
+        for n_threads in args.threads:
+            rate, allowed = run(limiters[name], n_threads, args.requests, args.identities)
+            print(f"{name:<14}{n_threads:>9}{rate:>14,.0f}{allowed:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+Кеширование результатов функций в Redis.
+
+    cache = RedisCache(get_redis(decode_responses=False), namespace="orders")
+
+    @cache.cached(ttl_seconds=60)
+    def total_revenue_by_city(start, end): ...
+
+    cache.invalidate()            # сбросить весь namespace (новая версия)
+    total_revenue_by_city.invalidate(start, end)  # сбросить один вызов
+    cache.stats.snapshot()        # счётчики попаданий/промахов и задержки
+
+Защита от «эффекта толпы» при истечении горячего ключа:
+  - single-flight: пересчитывает один вызов, взявший блокировку
+    SET <key>:lock <token> NX PX, остальные ждут появления значения;
+  - XFetch (early_refresh_beta > 0): значение с вероятностью, растущей
+    к концу TTL, пересчитывается заранее, до истечения;
+  - stale-while-revalidate (stale_ttl > 0): после истечения TTL ещё
+    stale_ttl секунд отдаётся старое значение, а пересчёт идёт в фоне.
+
+Ключ: cache:<namespace>:f<формат>:v<версия>:<функция>:<sha256 аргументов>.
+Формат — версия представления значения (сейчас заголовок _HEADER +
+сериализованные данные); при его смене записи старого формата просто
+перестают читаться.
+Аргументы приводятся к каноническому виду (позиционные и именованные
+с учётом сигнатуры, словари и множества — в отсортированном виде),
+поэтому f(1, b=2) и f(b=2, a=1) попадают в один ключ, а длина ключа
+ограничена независимо от размера аргументов. Первый параметр методов
+(self / cls) в ключ не входит: экземпляры одного класса делят записи
+namespace. Если результат зависит от состояния экземпляра (например,
+базы, к которой он подключён), это состояние передаётся через key_func
+или отдельный namespace. Аргументы без стабильного представления
+(произвольные объекты) ключом быть не могут — make_key выбрасывает
+TypeError, для них нужен key_func.
+"""
+
+import hashlib
+import inspect
+import json
+import math
+import random
+import struct
+import threading
+import uuid
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+
+import redis
+
+from serializers import PickleSerializer
+
+KEY_PREFIX = "cache"
+# Ограничение на часть ключа с именем функции; хеш аргументов — 32 символа
+MAX_NAME_LENGTH = 100
+
+# Заголовок сохранённого значения: время вычисления (delta, с) и момент
+# логического истечения (unix time). Физический TTL ключа может быть больше
+# на stale_ttl — для режима stale-while-revalidate.
+_HEADER = struct.Struct("!dd")
+STORAGE_FORMAT = 2
+
+# Параметры, которые не входят в ключ: экземпляр или класс метода
+_BOUND_PARAMETERS = ("self", "cls")
+
+# Снятие блокировки только её владельцем
+_RELEASE_LOCK = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def _canonical(value):
+    """Представление аргумента, не зависящее от порядка ключей и элементов множеств."""
+    if isinstance(value, dict):
+        items = ([_canonical(k), _canonical(v)] for k, v in value.items())
+        return {"__dict__": sorted(items, key=repr)}
+    if isinstance(value, (list, tuple)):
+        return {f"__{type(value).__name__}__": [_canonical(v) for v in value]}
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": sorted((_canonical(v) for v in value), key=repr)}
+    if isinstance(value, (datetime, date)):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, bytes):
+        return {"__bytes__": value.hex()}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    # repr произвольного объекта обычно содержит адрес в памяти и разный
+    # у каждого экземпляра и процесса — такой ключ никогда не совпадёт
+    raise TypeError(
+        f"Аргумент типа {type(value).__name__} нельзя использовать в ключе кеша: "
+        "передайте key_func, возвращающий его стабильное представление"
+    )
+
+
+def make_key(
+    namespace: str, version: int, func, args: tuple, kwargs: dict, key_func=None
+) -> str:
+    """
+    key_func — необязательная функция с теми же аргументами, что и func;
+    в ключ идёт её результат вместо аргументов вызова.
+    """
+    if key_func is not None:
+        arguments = key_func(*args, **kwargs)
+    else:
+        try:
+            bound = inspect.signature(func).bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                name: value
+                for i, (name, value) in enumerate(bound.arguments.items())
+                if not (i == 0 and name in _BOUND_PARAMETERS)
+            }
+        except (TypeError, ValueError):
+            # сигнатура недоступна или не совпала — используем аргументы как есть
+            arguments = {"args": args, "kwargs": kwargs}
+
+    payload = json.dumps(_canonical(arguments), ensure_ascii=False, separators=(",", ":"))
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:32]
+    name = f"{func.__module__}.{func.__qualname__}"[:MAX_NAME_LENGTH]
+    return f"{KEY_PREFIX}:{namespace}:f{STORAGE_FORMAT}:v{version}:{name}:{digest}"
+
+
+def _parse_header(data: bytes):
+    """(delta, expires_at) или None, если данные короче заголовка."""
+    if len(data) < _HEADER.size:
+        return None
+    return _HEADER.unpack_from(data)
+
+
+class CacheStats:
+    """Потокобезопасные счётчики кеша."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.errors = 0
+            self.stale_hits = 0
+            self.early_refreshes = 0
+            self.lock_waits = 0
+            self.hit_seconds = 0.0
+            self.miss_seconds = 0.0
+
+    def record_hit(self, seconds: float):
+        with self._lock:
+            self.hits += 1
+            self.hit_seconds += seconds
+
+    def record_miss(self, seconds: float):
+        with self._lock:
+            self.misses += 1
+            self.miss_seconds += seconds
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_stale_hit(self):
+        with self._lock:
+            self.stale_hits += 1
+
+    def record_early_refresh(self):
+        with self._lock:
+            self.early_refreshes += 1
+
+    def record_lock_wait(self):
+        with self._lock:
+            self.lock_waits += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "stale_hits": self.stale_hits,
+                "early_refreshes": self.early_refreshes,
+                "lock_waits": self.lock_waits,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "avg_hit_ms": self.hit_seconds / self.hits * 1000 if self.hits else 0.0,
+                "avg_miss_ms": self.miss_seconds / self.misses * 1000 if self.misses else 0.0,
+            }
+
+
+class RedisCache:
+    """
+    Кеш результатов функций в Redis с сериализацией и версионированием.
+
+    serializer — объект с методами dumps/loads (см. serializers.py);
+    клиент Redis должен быть создан с decode_responses=False.
+    version_check_interval — как часто (в секундах) перечитывать версию
+    namespace из Redis: инвалидация из другого процесса становится видна
+    не позже чем через этот интервал.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        namespace: str = "default",
+        serializer=None,
+        version_check_interval: float = 1.0,
+    ):
+        self.redis = redis_client
+        self.namespace = namespace
+        self.serializer = serializer or PickleSerializer()
+        self.version_check_interval = version_check_interval
+        self.stats = CacheStats()
+        self._version_key = f"{KEY_PREFIX}:{namespace}:__version__"
+        self._version = 0
+        self._version_checked_at = float("-inf")
+        self._release_lock_script = redis_client.register_script(_RELEASE_LOCK)
+
+    # ---------------- Версия namespace ----------------
+
+    def get_version(self) -> int:
+        now = time.monotonic()
+        if now - self._version_checked_at >= self.version_check_interval:
+            self._version = int(self.redis.get(self._version_key) or 0)
+            self._version_checked_at = now
+        return self._version
+
+    def invalidate(self) -> int:
+        """
+        Инвалидация всего namespace: увеличиваем версию, старые ключи
+        перестают читаться и удаляются Redis по TTL.
+        """
+        self._version = self.redis.incr(self._version_key)
+        self._version_checked_at = time.monotonic()
+        return self._version
+
+    # ---------------- Хранилище ----------------
+
+    def _load(self, key: str):
+        return self._load_shared(key)
+
+    def _load_shared(self, key: str):
+        """Чтение из общего хранилища в обход локальных уровней и их статистики"""
+        return self.redis.get(key)
+
+    def _store(self, key: str, data: bytes, ttl_seconds: float):
+        self.redis.set(key, data, px=int(ttl_seconds * 1000))
+
+    def _delete(self, key: str):
+        self.redis.delete(key)
+
+    # ---------------- Блокировка пересчёта ----------------
+
+    def _acquire_lock(self, key: str, lock_timeout: float):
+        token = uuid.uuid4().hex
+        if self.redis.set(f"{key}:lock", token, nx=True, px=int(lock_timeout * 1000)):
+            return token
+        return None
+
+    def _release_lock(self, key: str, token: str):
+        try:
+            self._release_lock_script(keys=[f"{key}:lock"], args=[token])
+        except redis.RedisError:
+            # блокировка снимется сама по PX
+            self.stats.record_error()
+
+    # ---------------- Пересчёт ----------------
+
+    def _compute_and_store(self, key: str, func, args, kwargs, ttl_seconds, stale_ttl):
+        started = time.perf_counter()
+        value = func(*args, **kwargs)
+        delta = time.perf_counter() - started
+        header = _HEADER.pack(delta, time.time() + ttl_seconds)
+        try:
+            self._store(key, header + self.serializer.dumps(value), ttl_seconds + stale_ttl)
+        except redis.RedisError:
+            self.stats.record_error()
+        return value
+
+    def _refresh_locked(self, key, token, func, args, kwargs, ttl_seconds, stale_ttl):
+        try:
+            return self._compute_and_store(key, func, args, kwargs, ttl_seconds, stale_ttl)
+        finally:
+            self._release_lock(key, token)
+
+    def _try_acquire_lock(self, key: str, lock_timeout: float):
+        """Как _acquire_lock, но при ошибке Redis — None (пересчёт не начинается)."""
+        try:
+            return self._acquire_lock(key, lock_timeout)
+        except redis.RedisError:
+            self.stats.record_error()
+            return None
+
+    def _wait_for_value(self, key: str, wait_timeout: float, poll_interval: float):
+        """
+        Ожидание, пока владелец блокировки не положит свежее значение.
+        Опрашивается общее хранилище: локальная копия значение от другого
+        процесса не увидит. None — не дождались, владелец снял блокировку
+        без значения (функция упала) или Redis стал недоступен.
+        """
+        self.stats.record_lock_wait()
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            try:
+                # блокировку проверяем до чтения: владелец сначала пишет
+                # значение, потом снимает блокировку
+                locked = self.redis.exists(f"{key}:lock")
+                data = self._load_shared(key)
+            except redis.RedisError:
+                self.stats.record_error()
+                return None
+            header = None if data is None else _parse_header(data)
+            if header is not None and time.time() < header[1]:
+                return data
+            if not locked:
+                return None
+        return None
+
+    # ---------------- Декоратор ----------------
+
+    def cached(
+        self,
+        ttl_seconds: float,
+        *,
+        single_flight: bool = True,
+        lock_timeout: float = 30.0,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+        early_refresh_beta: float = 0.0,
+        stale_ttl: float = 0.0,
+        key_func=None,
+    ):
+        """
+        Декоратор: кеширование результата функции на ttl_seconds.
+
+        single_flight      — пересчёт промаха только одним вызовом;
+        lock_timeout       — время жизни блокировки пересчёта (PX);
+        wait_timeout       — сколько ждать чужого пересчёта, после чего
+                             вызов вычисляет значение сам;
+        early_refresh_beta — коэффициент XFetch (0 — выключено, 1 — обычно);
+        stale_ttl          — окно stale-while-revalidate после истечения TTL;
+        key_func           — что положить в ключ вместо аргументов вызова
+                             (см. make_key).
+        """
+
+        def decorator(func):
+            def key_for(*args, **kwargs) -> str:
+                return make_key(
+                    self.namespace, self.get_version(), func, args, kwargs, key_func
+                )
+
+            def refresh(key, token, args, kwargs):
+                return self._refresh_locked(
+                    key, token, func, args, kwargs, ttl_seconds, stale_ttl
+                )
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    key = key_for(*args, **kwargs)
+                    data = self._load(key)
+                except redis.RedisError:
+                    # Redis недоступен — работаем без кеша
+                    self.stats.record_error()
+                    return func(*args, **kwargs)
+
+                header = None if data is None else _parse_header(data)
+                if header is not None:
+                    delta, expires_at = header
+                    now = time.time()
+
+                    if now < expires_at:
+                        # XFetch: -delta·beta·ln(U) — случайный «запас» до истечения
+                        if early_refresh_beta > 0 and (
+                            now - delta * early_refresh_beta * math.log(1.0 - random.random())
+                            >= expires_at
+                        ):
+                            token = self._try_acquire_lock(key, lock_timeout)
+                            if token is not None:
+                                self.stats.record_early_refresh()
+                                value = refresh(key, token, args, kwargs)
+                                self.stats.record_miss(time.perf_counter() - started)
+                                return value
+                        value = self.serializer.loads(data[_HEADER.size:])
+                        self.stats.record_hit(time.perf_counter() - started)
+                        return value
+
+                    if stale_ttl > 0:
+                        # Отдаём устаревшее значение, пересчёт — в фоне одним потоком
+                        token = self._try_acquire_lock(key, lock_timeout)
+                        if token is not None:
+                            threading.Thread(
+                                target=refresh, args=(key, token, args, kwargs), daemon=True
+                            ).start()
+                        self.stats.record_stale_hit()
+                        value = self.serializer.loads(data[_HEADER.size:])
+                        self.stats.record_hit(time.perf_counter() - started)
+                        return value
+
+                if single_flight:
+                    try:
+                        token = self._acquire_lock(key, lock_timeout)
+                    except redis.RedisError:
+                        # Redis пропал после чтения — работаем без кеша
+                        self.stats.record_error()
+                        return func(*args, **kwargs)
+                    if token is None:
+                        data = self._wait_for_value(key, wait_timeout, poll_interval)
+                        if data is not None:
+                            value = self.serializer.loads(data[_HEADER.size:])
+                            self.stats.record_hit(time.perf_counter() - started)
+                            return value
+                    else:
+                        value = refresh(key, token, args, kwargs)
+                        self.stats.record_miss(time.perf_counter() - started)
+                        return value
+
+                value = self._compute_and_store(
+                    key, func, args, kwargs, ttl_seconds, stale_ttl
+                )
+                self.stats.record_miss(time.perf_counter() - started)
+                return value
+
+            def invalidate(*args, **kwargs):
+                """Удалить из кеша результат конкретного вызова."""
+                self._delete(key_for(*args, **kwargs))
+
+            wrapper.cache_key = key_for
+            wrapper.invalidate = invalidate
+            return wrapper
+
+        return decorator
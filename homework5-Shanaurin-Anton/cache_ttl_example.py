@@ -1,46 +1,51 @@
+import threading
 import time
-from functools import wraps
+from pprint import pprint
 
+from cache import RedisCache
 from common import get_redis
 
-r = get_redis()
+# Значения хранятся сериализованными (bytes), поэтому без decode_responses
+cache = RedisCache(get_redis(decode_responses=False), namespace="example")
 
-def redis_cache_ttl(ttl_seconds: int):
-    """Декоратор: кеширование результатов функции в Redis с TTL."""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Формируем ключ по имени функции и аргументам (упрощённо)
-            key = f"cache:{func.__name__}:{args}:{tuple(sorted(kwargs.items()))}"
+def redis_cache_ttl(ttl_seconds: int, **options):
+    """
+    Декоратор: кеширование результатов функции в Redis с TTL.
+    options — параметры защиты от «толпы» (см. RedisCache.cached).
+    """
+    return cache.cached(ttl_seconds, **options)
 
-            # 1. Пытаемся прочитать из кеша
-            cached = r.get(key)
-            if cached is not None:
-                print(f"[CACHE HIT] key={key}")
-                return cached  # здесь строка, если нужно — сериализация/десериализация (json, pickle и т.п.)
 
-            print(f"[CACHE MISS] key={key}, вычисляем...")
-            # 2. Вычисляем значение
-            result = func(*args, **kwargs)
-
-            # 3. Кладём в Redis с TTL
-            # если result не строка, нужно привести к строке или сериализовать
-            r.setex(key, ttl_seconds, str(result))
-
-            return str(result)
-        return wrapper
-    return decorator
-
-
-@redis_cache_ttl(ttl_seconds=5)
+@redis_cache_ttl(ttl_seconds=5, stale_ttl=30, early_refresh_beta=1.0)
 def slow_function(x: int) -> str:
     """Имитация тяжёлой функции."""
     time.sleep(2)
     return f"Результат для x={x}"
 
 
+@redis_cache_ttl(ttl_seconds=60)
+def slow_report(city: str, limit: int = 3) -> list[dict]:
+    """Структурированный результат (как у агрегаций OrdersRepository)."""
+    time.sleep(2)
+    return [{"_id": city, "total_revenue": 1000 * i, "orders_count": i} for i in range(limit)]
+
+
 if __name__ == "__main__":
     print(slow_function(10))  # первая попытка — MISS (2 секунды)
     print(slow_function(10))  # вторая — HIT (почти мгновенно)
     time.sleep(6)             # ждём, пока TTL истечёт
-    print(slow_function(10))  # снова MISS
+    print(slow_function(10))  # устарело: старое значение сразу, пересчёт в фоне
+
+    # 10 параллельных вызовов на холодный ключ — функция выполнится один раз
+    threads = [threading.Thread(target=slow_function, args=(20,)) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    pprint(slow_report("Москва"))           # MISS
+    pprint(slow_report(limit=3, city="Москва"))  # HIT: тот же канонический ключ
+    cache.invalidate()                      # новая версия namespace
+    pprint(slow_report("Москва"))           # снова MISS
+
+    pprint(cache.stats.snapshot())
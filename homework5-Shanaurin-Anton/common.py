@@ -1,9 +1,54 @@
+import threading
+
 import redis
 
-def get_redis() -> redis.Redis:
-    return redis.Redis(
-        host="localhost",
-        port=6379,
-        db=0,
-        decode_responses=True,
-    )
+REDIS_HOST = "localhost"
+REDIS_PORT = 6379
+REDIS_DB = 0
+# Предел соединений на пул: потоки сверх него ждут свободное соединение
+MAX_CONNECTIONS = 64
+
+_pools: dict[bool, redis.BlockingConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(decode_responses: bool = True) -> redis.BlockingConnectionPool:
+    """
+    Общий для процесса пул соединений (отдельный для bytes и str ответов).
+    BlockingConnectionPool не открывает больше MAX_CONNECTIONS соединений,
+    а ждёт освобождения до timeout секунд.
+    """
+    with _pools_lock:
+        pool = _pools.get(decode_responses)
+        if pool is None:
+            pool = redis.BlockingConnectionPool(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                decode_responses=decode_responses,
+                max_connections=MAX_CONNECTIONS,
+                timeout=5,
+                socket_connect_timeout=2,
+                socket_keepalive=True,
+                health_check_interval=30,
+            )
+            _pools[decode_responses] = pool
+        return pool
+
+
+def get_redis(decode_responses: bool = True) -> redis.Redis:
+    """
+    Клиент поверх общего пула: создание клиента дёшево, соединения
+    переиспользуются между вызовами и потоками.
+
+    decode_responses=False — ответы приходят как bytes; нужно для хранения
+    сериализованных (бинарных) значений, например в cache.RedisCache.
+    """
+    return redis.Redis(connection_pool=get_pool(decode_responses))
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.disconnect()
+        _pools.clear()
@@ -0,0 +1,189 @@
+"""
+Двухуровневый кеш: локальный LRU в памяти процесса (L1) перед Redis (L2).
+
+Попадание в L1 не требует сетевого запроса. Согласованность между
+процессами поддерживается рассылкой инвалидаций через pub/sub Redis
+(как в publisher.py / subscriber.py): при записи или удалении ключа
+и при смене версии namespace процесс публикует сообщение, остальные
+удаляют соответствующие записи из своего L1. Pub/sub не гарантирует
+доставку, поэтому время жизни записи в L1 дополнительно ограничено
+local_ttl.
+
+    cache = TwoTierCache(get_redis(decode_responses=False), namespace="orders")
+
+    @cache.cached(ttl_seconds=60)
+    def top_categories(limit): ...
+
+    cache.tier_stats.snapshot()   # доли попаданий в L1 и L2
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import redis
+
+from cache import KEY_PREFIX, RedisCache
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+
+class LocalLRU:
+    """Потокобезопасный LRU ограниченного размера с TTL записей."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 5.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl_seconds: float | None = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class TierStats:
+    """Счётчики попаданий по уровням кеша."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    def record(self, tier: str):
+        with self._lock:
+            setattr(self, tier, getattr(self, tier) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.l1_hits + self.l2_hits + self.misses
+            return {
+                "l1_hits": self.l1_hits,
+                "l2_hits": self.l2_hits,
+                "misses": self.misses,
+                "l1_hit_ratio": self.l1_hits / total if total else 0.0,
+                "l2_hit_ratio": self.l2_hits / total if total else 0.0,
+            }
+
+
+class TwoTierCache(RedisCache):
+    """
+    RedisCache с локальным LRU перед Redis.
+
+    local_max_size / local_ttl — размер L1 и максимальное время жизни записи;
+    channel — канал pub/sub для рассылки инвалидаций.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        namespace: str = "default",
+        serializer=None,
+        version_check_interval: float = 1.0,
+        local_max_size: int = 1024,
+        local_ttl: float = 5.0,
+        channel: str = INVALIDATION_CHANNEL,
+    ):
+        super().__init__(redis_client, namespace, serializer, version_check_interval)
+        self.local = LocalLRU(local_max_size, local_ttl)
+        self.tier_stats = TierStats()
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex
+
+        self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: self._on_message})
+        self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def close(self):
+        self._listener.stop()
+        self._pubsub.close()
+
+    # ---------------- Инвалидация ----------------
+
+    def _publish(self, kind: str, target: str):
+        try:
+            self.redis.publish(self.channel, f"{self.instance_id}|{kind}|{target}")
+        except redis.RedisError:
+            self.stats.record_error()
+
+    def _on_message(self, message):
+        try:
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode()
+            sender, kind, target = data.split("|", 2)
+        except (ValueError, AttributeError):
+            # чужое или битое сообщение не должно останавливать слушателя
+            self.stats.record_error()
+            return
+        if sender == self.instance_id:
+            return
+        if kind == "key":
+            self.local.delete(target)
+        elif kind == "namespace" and target == self.namespace:
+            self.local.clear_prefix(f"{KEY_PREFIX}:{target}:")
+            # перечитать версию при следующем обращении
+            self._version_checked_at = float("-inf")
+
+    def invalidate(self) -> int:
+        version = super().invalidate()
+        self.local.clear_prefix(f"{KEY_PREFIX}:{self.namespace}:")
+        self._publish("namespace", self.namespace)
+        return version
+
+    # ---------------- Хранилище ----------------
+
+    def _load(self, key: str):
+        data = self.local.get(key)
+        if data is not None:
+            self.tier_stats.record("l1_hits")
+            return data
+
+        data = super()._load(key)
+        if data is None:
+            self.tier_stats.record("misses")
+            return None
+        self.tier_stats.record("l2_hits")
+        self.local.set(key, data)
+        return data
+
+    def _store(self, key: str, data: bytes, ttl_seconds: float):
+        super()._store(key, data, ttl_seconds)
+        self.local.set(key, data, ttl_seconds)
+        self._publish("key", key)
+
+    def _delete(self, key: str):
+        super()._delete(key)
+        self.local.delete(key)
+        self._publish("key", key)
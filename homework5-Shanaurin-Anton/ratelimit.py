@@ -0,0 +1,190 @@
+"""
+Ограничение частоты запросов на Redis: решение принимает Lua-скрипт
+атомарно на сервере, поэтому лимит общий для всех процессов API и не
+ломается при одновременных запросах.
+
+  - SlidingWindowLimiter — не более limit запросов за любые window_seconds
+    (отметки запросов в сортированном множестве);
+  - TokenBucketLimiter   — ведро на capacity токенов, пополняемое со
+    скоростью rate токенов в секунду (допускает короткие всплески).
+
+Время берётся командой TIME на сервере Redis, так что расхождение часов
+между машинами клиентов на решение не влияет.
+
+    limiter = TokenBucketLimiter(get_redis(), "api", rate=100, capacity=200)
+    decision = limiter.allow(client_ip)
+    if not decision.allowed:
+        return 429, {"Retry-After": decision.retry_after}
+
+    limiter.check(client_ip)   # то же, но с исключением RateLimitExceeded
+"""
+
+import uuid
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+
+import redis
+
+KEY_PREFIX = "ratelimit"
+
+# KEYS[1] — zset отметок; ARGV: limit, window_ms, cost, уникальный id
+_SLIDING_WINDOW = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - window)
+local count = redis.call("ZCARD", KEYS[1])
+if count + cost <= limit then
+    for i = 1, cost do
+        redis.call("ZADD", KEYS[1], now, ARGV[4] .. ":" .. i)
+    end
+    redis.call("PEXPIRE", KEYS[1], window)
+    return {1, limit - count - cost, 0}
+end
+
+local retry = -1
+if cost <= limit then
+    -- место освободится, когда истечёт (count + cost - limit)-я отметка
+    local oldest = redis.call("ZRANGE", KEYS[1], count + cost - limit - 1, count + cost - limit - 1, "WITHSCORES")
+    retry = tonumber(oldest[2]) + window - now
+end
+return {0, limit - count, retry}
+"""
+
+# KEYS[1] — hash {tokens, ts}; ARGV: rate (токенов/с), capacity, cost
+_TOKEN_BUCKET = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = tonumber(ARGV[1]) / 1000
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+elseif cost <= capacity then
+    retry = math.ceil((cost - tokens) / rate)
+else
+    retry = -1
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", now)
+-- полное ведро неотличимо от отсутствующего ключа
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate))
+return {allowed, math.floor(tokens), retry}
+"""
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float  # секунды до возможного успеха (0 — разрешено)
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Превышен лимит запросов для {key!r}, повтор через {retry_after:.3f} с")
+        self.key = key
+        self.retry_after = retry_after
+
+
+class _Limiter(ABC):
+    """
+    Общая часть ограничителей. fail_open — при недоступности Redis
+    пропускать запросы (как кеш работает без Redis), иначе пробрасывать
+    ошибку Redis вызывающему коду.
+    """
+
+    script = None
+
+    def __init__(self, redis_client: redis.Redis, name: str, fail_open: bool = True):
+        self.redis = redis_client
+        self.name = name
+        self.fail_open = fail_open
+        self._script = redis_client.register_script(self.script)
+
+    def key(self, identity: str) -> str:
+        return f"{KEY_PREFIX}:{self.name}:{identity}"
+
+    @abstractmethod
+    def _args(self, cost: int) -> list:
+        """ARGV скрипта для запроса стоимостью cost"""
+
+    def allow(self, identity: str, cost: int = 1) -> Decision:
+        try:
+            allowed, remaining, retry_ms = self._script(
+                keys=[self.key(identity)], args=self._args(cost)
+            )
+        except redis.RedisError:
+            if self.fail_open:
+                return Decision(True, 0, 0.0)
+            raise
+        retry_after = float("inf") if retry_ms < 0 else retry_ms / 1000
+        return Decision(bool(allowed), int(remaining), retry_after)
+
+    def check(self, identity: str, cost: int = 1) -> Decision:
+        decision = self.allow(identity, cost)
+        if not decision.allowed:
+            raise RateLimitExceeded(identity, decision.retry_after)
+        return decision
+
+    def reset(self, identity: str):
+        self.redis.delete(self.key(identity))
+
+
+class SlidingWindowLimiter(_Limiter):
+    """Не более limit запросов за скользящее окно window_seconds."""
+
+    script = _SLIDING_WINDOW
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        name: str,
+        limit: int,
+        window_seconds: float,
+        fail_open: bool = True,
+    ):
+        super().__init__(redis_client, name, fail_open)
+        self.limit = limit
+        self.window_ms = int(window_seconds * 1000)
+
+    def _args(self, cost: int) -> list:
+        return [self.limit, self.window_ms, cost, uuid.uuid4().hex]
+
+
+class TokenBucketLimiter(_Limiter):
+    """Ведро на capacity токенов, пополнение rate токенов в секунду."""
+
+    script = _TOKEN_BUCKET
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        name: str,
+        rate: float,
+        capacity: int,
+        fail_open: bool = True,
+    ):
+        super().__init__(redis_client, name, fail_open)
+        self.rate = rate
+        self.capacity = capacity
+
+    def _args(self, cost: int) -> list:
+        return [self.rate, self.capacity, cost]
+
+
+LIMITERS = {
+    "sliding": SlidingWindowLimiter,
+    "bucket": TokenBucketLimiter,
+}
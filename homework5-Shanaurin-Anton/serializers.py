@@ -0,0 +1,57 @@
+"""Сериализаторы значений для Redis: объект <-> bytes."""
+
+import json
+import pickle
+
+
+class PickleSerializer:
+    """Любые picklable-объекты. Только для доверенных данных в своём Redis."""
+
+    def dumps(self, value) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes):
+        return pickle.loads(data)
+
+
+class JsonSerializer:
+    """JSON: переносимо между языками, но теряет типы (tuple, datetime и т.п.)."""
+
+    def dumps(self, value) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=str).encode()
+
+    def loads(self, data: bytes):
+        return json.loads(data)
+
+
+class MsgpackSerializer:
+    """msgpack: компактнее и быстрее JSON. Требует пакет msgpack."""
+
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError as e:
+            raise RuntimeError("Для MsgpackSerializer установите пакет msgpack") from e
+        self._msgpack = msgpack
+
+    def dumps(self, value) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True, default=str)
+
+    def loads(self, data: bytes):
+        return self._msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS = {
+    "pickle": PickleSerializer,
+    "json": JsonSerializer,
+    "msgpack": MsgpackSerializer,
+}
+
+
+def get_serializer(name: str):
+    try:
+        return SERIALIZERS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный сериализатор: {name!r}, допустимые: {', '.join(SERIALIZERS)}"
+        ) from None
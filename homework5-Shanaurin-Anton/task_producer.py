@@ -1,19 +1,37 @@
+import argparse
 import time
-from common import get_redis
+from itertools import count
 
-QUEUE_NAME = "task_queue"
+from common import get_redis
+from task_queue import (
+    QUEUE_BACKENDS,
+    QUEUE_NAME,
+    STANDARD_PRIORITIES,
+    TaskProducer,
+    make_queue,
+)
 
 if __name__ == "__main__":
-    r = get_redis()
-    i = 0
-    print(f"Отправляю задачи в очередь '{QUEUE_NAME}' (Ctrl+C для выхода)")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--batch", type=int, default=1,
+        help="сколько задач отправлять за раз (1 — по одной в секунду)",
+    )
+    parser.add_argument("--backend", choices=list(QUEUE_BACKENDS), default="list")
+    parser.add_argument("--priority", choices=STANDARD_PRIORITIES, default="default")
+    parser.add_argument("--delay", type=float, default=0.0, help="отложить задачи на N секунд")
+    args = parser.parse_args()
+
+    queue = make_queue(args.backend, get_redis(decode_responses=False), priorities=STANDARD_PRIORITIES)
+    producer = TaskProducer(queue, batch_size=args.batch)
+    numbers = count()
+    print(f"Отправляю задачи в очередь '{QUEUE_NAME}' ({args.backend}) (Ctrl+C для выхода)")
     try:
         while True:
-            task = f"task-{i}"
-            # LPUSH кладёт в начало списка
-            r.lpush(QUEUE_NAME, task)
-            print(f"[ENQUEUE] {task}")
-            i += 1
+            tasks = [f"task-{next(numbers)}" for _ in range(args.batch)]
+            # LPUSH кладёт в начало списка, пачкой — одной командой
+            producer.enqueue_many(tasks, priority=args.priority, delay=args.delay)
+            print(f"[ENQUEUE] {tasks[0]}" + (f" .. {tasks[-1]}" if len(tasks) > 1 else ""))
             time.sleep(1)
     except KeyboardInterrupt:
         print("Остановка продюсера")
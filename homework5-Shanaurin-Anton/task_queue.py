@@ -0,0 +1,802 @@
+"""
+Очередь задач на Redis с двумя реализациями хранения:
+
+  - ListQueue   — списки (LPUSH / LMOVE в Lua-скрипте);
+  - StreamQueue — потоки (XADD / XREADGROUP / XACK) с группами потребителей.
+
+Задача — словарь {"id", "enqueued_at", "payload"}, сериализованный
+выбранным сериализатором (JSON по умолчанию, см. serializers.py).
+Клиент Redis нужен с decode_responses=False.
+
+    queue = make_queue("stream", get_redis(decode_responses=False))
+    TaskProducer(queue, batch_size=500).enqueue_many({"n": i} for i in range(100_000))
+    WorkerPool(queue, process_task, concurrency=8).run_forever()
+
+Обе реализации дают доставку «хотя бы один раз» и одинаковый интерфейс
+push / fetch / ack / fail / reap, поэтому продюсер и пул воркеров
+переключаются между ними одним параметром.
+
+Приоритеты и отложенный запуск (обе реализации): очередь может состоять
+из нескольких очередей приоритетов, читаемых от высшего к низшему;
+задачи с задержкой (в том числе повторы с экспоненциальной паузой)
+ждут в сортированном множестве <queue>:delayed и переносятся в очереди
+Lua-скриптом, поэтому отдельный cron не нужен.
+
+ListQueue: воркер забирает задачу в свой список обработки
+<queue>:processing:<worker> и удаляет её оттуда только после выполнения.
+Перенос, срок аренды в <queue>:leases и запись воркера в <queue>:workers
+делает один Lua-скрипт, поэтому взятая задача всегда видна чистке: задачи
+с истёкшей арендой (воркер упал или завис) возвращаются в очередь
+периодической чисткой (reap).
+
+StreamQueue: задачи читаются группой потребителей пачками (COUNT), взятые,
+но не подтверждённые задачи остаются в PEL группы; reap забирает
+зависшие записи командой XAUTOCLAIM и возвращает их в поток. Независимые
+сервисы читают один поток своими группами; поток обрезается (XTRIM MINID)
+только до записей, уже доставленных и подтверждённых всеми группами.
+"""
+
+import logging
+import signal
+import threading
+import time
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Callable, Iterable
+
+import redis
+
+from serializers import JsonSerializer
+
+QUEUE_NAME = "task_queue"
+DEFAULT_PRIORITY = "default"
+# Типовой набор очередей приоритетов для скриптов task_producer / task_worker
+STANDARD_PRIORITIES = ("high", DEFAULT_PRIORITY, "low")
+
+logger = logging.getLogger(__name__)
+
+
+def make_task(payload, priority: str = DEFAULT_PRIORITY) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "enqueued_at": time.time(),
+        "priority": priority,
+        "attempt": 0,
+        "payload": payload,
+    }
+
+
+class TaskProducer:
+    """
+    Отправка задач в очередь (ListQueue или StreamQueue).
+
+    batch_size       — сколько задач кладётся одной командой
+                       (LPUSH с несколькими значениями или серия XADD);
+    pipeline_batches — сколько пачек отправляется за один сетевой обмен
+                       (pipeline без MULTI).
+    """
+
+    def __init__(self, queue, batch_size: int = 500, pipeline_batches: int = 10):
+        self.queue = queue
+        self.redis = queue.redis
+        self.serializer = queue.serializer
+        self.batch_size = batch_size
+        self.pipeline_batches = pipeline_batches
+
+    def _send(self, client, items: list[bytes], priority: str, delay: float):
+        if delay > 0:
+            self.queue.schedule(client, items, time.time() + delay, priority)
+        else:
+            self.queue.push(client, items, priority)
+
+    def enqueue(self, payload, priority: str = DEFAULT_PRIORITY, delay: float = 0.0) -> str:
+        """
+        Одна задача — один сетевой обмен. Возвращает id задачи.
+        delay > 0 — задача попадёт в очередь не раньше чем через delay секунд.
+        """
+        task = make_task(payload, priority)
+        self._send(self.redis, [self.serializer.dumps(task)], priority, delay)
+        return task["id"]
+
+    def enqueue_many(
+        self, payloads: Iterable, priority: str = DEFAULT_PRIORITY, delay: float = 0.0
+    ) -> int:
+        """
+        Пакетная отправка с сохранением порядка задач.
+        Возвращает число отправленных задач.
+        """
+        payloads = iter(payloads)
+        pipe = self.redis.pipeline(transaction=False)
+        sent = pending = 0
+        while batch := list(islice(payloads, self.batch_size)):
+            items = [self.serializer.dumps(make_task(p, priority)) for p in batch]
+            self._send(pipe, items, priority, delay)
+            sent += len(batch)
+            pending += 1
+            if pending >= self.pipeline_batches:
+                pipe.execute()
+                pending = 0
+        if pending:
+            pipe.execute()
+        return sent
+
+
+def decode_task(data: bytes, serializer=None) -> dict:
+    return (serializer or JsonSerializer()).loads(data)
+
+
+# Перенос наступивших отложенных задач в очереди приоритетов.
+# Элемент множества: "<номер очереди приоритета>:<данные задачи>".
+# KEYS[1] — отложенные задачи, KEYS[2..] — очереди по приоритетам;
+# ARGV[1] — текущее время, ARGV[2] — максимальное число задач за вызов.
+_PROMOTE_DUE = """
+local due = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, tonumber(ARGV[2]))
+for _, member in ipairs(due) do
+    local sep = string.find(member, ":", 1, true)
+    local lane = KEYS[tonumber(string.sub(member, 1, sep - 1)) + 2]
+    local data = string.sub(member, sep + 1)
+    %s
+end
+if #due > 0 then
+    redis.call("ZREM", KEYS[1], unpack(due))
+end
+return #due
+"""
+
+
+class _QueueBase:
+    """
+    Общая часть очередей: приоритеты и отложенные задачи.
+
+    priorities — имена очередей приоритетов от высшего к низшему,
+    например ("high", "default", "low"). Отложенные задачи хранятся
+    в сортированном множестве <queue>:delayed с оценкой — временем
+    запуска; promote_due() пачками переносит наступившие задачи
+    в их очереди приоритетов Lua-скриптом.
+    """
+
+    _PUSH_DUE = ""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        key: str,
+        serializer,
+        visibility_timeout: float,
+        priorities: tuple[str, ...],
+    ):
+        if DEFAULT_PRIORITY not in priorities:
+            raise ValueError(f"priorities должны включать {DEFAULT_PRIORITY!r}")
+        self.redis = redis_client
+        self.serializer = serializer or JsonSerializer()
+        self.visibility_timeout = visibility_timeout
+        self.priorities = tuple(priorities)
+        # основная очередь сохраняет прежнее имя ключа
+        self.lanes = [
+            key if name == DEFAULT_PRIORITY else f"{key}:{name}" for name in priorities
+        ]
+        self.delayed_key = f"{key}:delayed"
+        self._promote_due = redis_client.register_script(_PROMOTE_DUE % self._PUSH_DUE)
+
+    def _lane_index(self, priority: str) -> int:
+        try:
+            return self.priorities.index(priority)
+        except ValueError:
+            raise ValueError(
+                f"Неизвестный приоритет: {priority!r}, допустимые: {', '.join(self.priorities)}"
+            ) from None
+
+    def lane_key(self, priority: str) -> str:
+        return self.lanes[self._lane_index(priority)]
+
+    def schedule(
+        self, client, items: list[bytes], due_at: float, priority: str = DEFAULT_PRIORITY
+    ):
+        """Отложить задачи до момента due_at (unix time). client — Redis или pipeline."""
+        prefix = f"{self._lane_index(priority)}:".encode()
+        client.zadd(self.delayed_key, {prefix + data: due_at for data in items})
+
+    def promote_due(self, batch: int = 500) -> int:
+        """Перенести наступившие отложенные задачи в очереди. Возвращает их число."""
+        moved = 0
+        while True:
+            n = self._promote_due(
+                keys=[self.delayed_key, *self.lanes], args=[time.time(), batch]
+            )
+            moved += n
+            if n < batch:
+                return moved
+
+    def delayed_count(self) -> int:
+        return self.redis.zcard(self.delayed_key)
+
+    def retry(self, worker_id: str, receipt, task: dict, delay: float):
+        """
+        Повторить задачу через delay секунд: копия с увеличенным attempt
+        откладывается, исходная подтверждается (повтор возможен и при сбое
+        между этими шагами — доставка «хотя бы один раз»).
+        """
+        task = {**task, "attempt": task.get("attempt", 0) + 1}
+        self.schedule(
+            self.redis,
+            [self.serializer.dumps(task)],
+            time.time() + delay,
+            task.get("priority", DEFAULT_PRIORITY),
+        )
+        self.ack(worker_id, receipt)
+
+
+# Возврат в очередь задачи с истёкшей арендой. fetch ставит аренду вместе
+# с переносом, но задаче без аренды (взята прежней версией fetch) она
+# назначается, чтобы вернуть задачу позже.
+_REQUEUE_EXPIRED = """
+local score = redis.call("ZSCORE", KEYS[3], ARGV[1])
+if not score then
+    redis.call("ZADD", KEYS[3], "NX", tonumber(ARGV[2]) + tonumber(ARGV[3]), ARGV[1])
+    return 0
+end
+if tonumber(score) > tonumber(ARGV[2]) then
+    return 0
+end
+if redis.call("LREM", KEYS[1], 1, ARGV[1]) == 1 then
+    redis.call("RPUSH", KEYS[2], ARGV[1])
+end
+redis.call("ZREM", KEYS[3], ARGV[1])
+return 1
+"""
+
+# Снять воркера с учёта, только если его список обработки пуст. Проверка и
+# SREM атомарны, а fetch добавляет воркера в множество в том же скрипте, что
+# и LMOVE, поэтому взятая задача не окажется в списке, который reap больше
+# не просматривает, — даже если воркер упадёт сразу после fetch.
+_FORGET_IDLE_WORKER = """
+if redis.call("LLEN", KEYS[1]) == 0 then
+    return redis.call("SREM", KEYS[2], ARGV[1])
+end
+return 0
+"""
+
+# Атомарно забрать до ARGV[1] задач из очередей в порядке приоритета,
+# назначить им аренду до ARGV[2] и записать воркера ARGV[3] в множество.
+# KEYS[1..n-3] — очереди от высшего приоритета, KEYS[n-2] — список
+# обработки, KEYS[n-1] — аренды, KEYS[n] — воркеры.
+_TAKE_BY_PRIORITY = """
+local items = {}
+local limit = tonumber(ARGV[1])
+local n = #KEYS
+local processing = KEYS[n - 2]
+for i = 1, n - 3 do
+    while #items < limit do
+        local item = redis.call("LMOVE", KEYS[i], processing, "RIGHT", "LEFT")
+        if not item then
+            break
+        end
+        redis.call("ZADD", KEYS[n - 1], ARGV[2], item)
+        items[#items + 1] = item
+    end
+end
+if #items > 0 then
+    redis.call("SADD", KEYS[n], ARGV[3])
+end
+return items
+"""
+
+
+class ListQueue(_QueueBase):
+    """
+    Надёжное чтение очереди на списках Redis.
+
+    visibility_timeout — срок аренды задачи воркером в секундах; задача,
+                         не подтверждённая за это время, будет выдана повторно;
+    priorities         — очереди приоритетов (см. _QueueBase);
+    poll_interval      — при нескольких приоритетах: пауза между опросами
+                         пустых очередей.
+
+    Задача забирается Lua-скриптом по очередям в порядке приоритета вместе
+    с арендой. С одной очередью воркер между попытками ждёт появления задачи
+    блокирующим BLMOVE очереди самой в себя (RIGHT -> RIGHT ничего не
+    меняет), с несколькими — опрашивает их раз в poll_interval: блокирующий
+    перенос в список обработки прошёл бы вне скрипта, и задача, взятая
+    воркером, упавшим до назначения аренды, потерялась бы.
+    """
+
+    _PUSH_DUE = 'redis.call("RPUSH", lane, data)'
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        queue: str = QUEUE_NAME,
+        serializer=None,
+        visibility_timeout: float = 60.0,
+        priorities: tuple[str, ...] = (DEFAULT_PRIORITY,),
+        poll_interval: float = 0.05,
+    ):
+        super().__init__(redis_client, queue, serializer, visibility_timeout, priorities)
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.leases_key = f"{queue}:leases"
+        self.workers_key = f"{queue}:workers"
+        self.failed_key = f"{queue}:failed"
+        self._requeue_expired = redis_client.register_script(_REQUEUE_EXPIRED)
+        self._take_by_priority = redis_client.register_script(_TAKE_BY_PRIORITY)
+        self._forget_idle_worker = redis_client.register_script(_FORGET_IDLE_WORKER)
+
+    def push(self, client, items: list[bytes], priority: str = DEFAULT_PRIORITY):
+        """
+        client — Redis или pipeline. LPUSH с несколькими значениями
+        кладёт их слева по очереди, воркер читает справа — порядок сохраняется.
+        """
+        client.lpush(self.lane_key(priority), *items)
+
+    def length(self) -> int:
+        return sum(self.redis.llen(lane) for lane in self.lanes)
+
+    def clear(self):
+        self.redis.delete(*self.lanes, self.delayed_key)
+
+    def processing_key(self, worker_id: str) -> str:
+        return f"{self.queue}:processing:{worker_id}"
+
+    def register(self, worker_id: str):
+        self.redis.sadd(self.workers_key, worker_id)
+
+    def unregister(self, worker_id: str):
+        # незавершённые задачи воркера остаются в его списке и будут возвращены reap
+        self._forget_idle(worker_id)
+
+    def _forget_idle(self, worker_id: str):
+        self._forget_idle_worker(
+            keys=[self.processing_key(worker_id), self.workers_key], args=[worker_id]
+        )
+
+    def _take(self, worker_id: str, count: int) -> list[bytes]:
+        return self._take_by_priority(
+            keys=[*self.lanes, self.processing_key(worker_id), self.leases_key, self.workers_key],
+            args=[count, time.time() + self.visibility_timeout, worker_id],
+        )
+
+    def _wait(self, timeout: float):
+        """Подождать появления задачи, не забирая её"""
+        if len(self.lanes) == 1:
+            # timeout 0 у BLMOVE означает «ждать бесконечно»
+            self.redis.blmove(self.lanes[0], self.lanes[0], max(timeout, 0.01), "RIGHT", "RIGHT")
+        else:
+            time.sleep(min(self.poll_interval, timeout))
+
+    def fetch(self, worker_id: str, timeout: float, count: int = 1) -> list[tuple]:
+        """
+        Взять до count задач в обработку, ожидая первую до timeout секунд.
+        Возвращает список (квитанция для ack/fail, задача).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            items = self._take(worker_id, count)
+            remaining = deadline - time.monotonic()
+            if items or remaining <= 0:
+                break
+            self._wait(remaining)
+        return [(data, self.serializer.loads(data)) for data in items]
+
+    def ack(self, worker_id: str, data: bytes):
+        """Подтвердить выполнение; data — квитанция из fetch (сырые данные задачи)."""
+        pipe = self.redis.pipeline()
+        pipe.lrem(self.processing_key(worker_id), 1, data)
+        pipe.zrem(self.leases_key, data)
+        pipe.execute()
+
+    def fail(self, worker_id: str, data: bytes):
+        """Задача завершилась ошибкой — переносим в список <queue>:failed."""
+        pipe = self.redis.pipeline()
+        pipe.lpush(self.failed_key, data)
+        pipe.lrem(self.processing_key(worker_id), 1, data)
+        pipe.zrem(self.leases_key, data)
+        pipe.execute()
+
+    def reap(self) -> int:
+        """Вернуть в очередь задачи с истёкшей арендой. Возвращает их число."""
+        now = time.time()
+        requeued = 0
+        for worker_id in self.redis.smembers(self.workers_key):
+            worker_id = worker_id.decode() if isinstance(worker_id, bytes) else worker_id
+            processing = self.processing_key(worker_id)
+            items = self.redis.lrange(processing, 0, -1)
+            for data in items:
+                priority = self.serializer.loads(data).get("priority", DEFAULT_PRIORITY)
+                requeued += self._requeue_expired(
+                    keys=[processing, self.lane_key(priority), self.leases_key],
+                    args=[data, now, self.visibility_timeout],
+                )
+            if not items:
+                self._forget_idle(worker_id)
+        return requeued
+
+
+# Удалить потребителя из группы, только если у него нет неподтверждённых
+# записей: DELCONSUMER удаляет и его записи из PEL, и они больше не
+# вернулись бы в поток. ARGV[1] — группа, ARGV[2] — потребитель.
+_DELETE_IDLE_CONSUMER = """
+if #redis.call("XPENDING", KEYS[1], ARGV[1], "-", "+", 1, ARGV[2]) == 0 then
+    return redis.call("XGROUP", "DELCONSUMER", KEYS[1], ARGV[1], ARGV[2])
+end
+return -1
+"""
+
+
+class StreamQueue(_QueueBase):
+    """
+    Очередь на потоке Redis с группой потребителей.
+
+    group              — группа потребителей; разные сервисы используют
+                         разные группы и получают все задачи независимо;
+    visibility_timeout — через сколько секунд неподтверждённая задача
+                         забирается у потребителя и возвращается в поток;
+    priorities         — по потоку на приоритет (см. _QueueBase);
+    maxlen             — необязательный приблизительный предел длины потока
+                         при XADD (может удалить ещё не прочитанные задачи,
+                         безопасная обрезка — trim()).
+
+    Квитанция задачи для ack/fail — пара (поток, id записи).
+
+    Имена потребителей у WorkerPool случайные, поэтому потребитель
+    удаляется из группы при unregister, а потребители упавших воркеров —
+    в reap, когда их записи уже переданы XAUTOCLAIM.
+    """
+
+    TASK_FIELD = b"task"
+    REAPER = "reaper"
+    _PUSH_DUE = 'redis.call("XADD", lane, "*", "task", data)'
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        stream: str = f"{QUEUE_NAME}:stream",
+        group: str = "workers",
+        serializer=None,
+        visibility_timeout: float = 60.0,
+        priorities: tuple[str, ...] = (DEFAULT_PRIORITY,),
+        maxlen: int | None = None,
+    ):
+        super().__init__(redis_client, stream, serializer, visibility_timeout, priorities)
+        self.stream = stream
+        self.group = group
+        self.maxlen = maxlen
+        self.failed_key = f"{stream}:failed"
+        self._delete_idle_consumer = redis_client.register_script(_DELETE_IDLE_CONSUMER)
+        self._ensure_group()
+
+    def _ensure_group(self):
+        for lane in self.lanes:
+            try:
+                # "0" — группа читает и записи, добавленные до её создания
+                self.redis.xgroup_create(lane, self.group, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def push(self, client, items: list[bytes], priority: str = DEFAULT_PRIORITY):
+        """client — Redis или pipeline."""
+        lane = self.lane_key(priority)
+        for data in items:
+            client.xadd(lane, {self.TASK_FIELD: data}, maxlen=self.maxlen, approximate=True)
+
+    def length(self) -> int:
+        return sum(self.redis.xlen(lane) for lane in self.lanes)
+
+    def clear(self):
+        self.redis.delete(*self.lanes, self.delayed_key)
+        self._ensure_group()
+
+    def register(self, worker_id: str):
+        # потребитель создаётся в группе при первом XREADGROUP
+        pass
+
+    def unregister(self, worker_id: str):
+        # с неподтверждёнными задачами потребитель остаётся до reap
+        for lane in self.lanes:
+            self._delete_idle_consumer(keys=[lane], args=[self.group, worker_id])
+
+    def fetch(self, worker_id: str, timeout: float, count: int = 1) -> list[tuple]:
+        """
+        Прочитать до count новых задач из каждого потока приоритетов одним
+        XREADGROUP (блокируется, только если пусты все потоки). Задачи
+        возвращаются в порядке приоритета: список ((поток, id записи), задача).
+        """
+        response = self.redis.xreadgroup(
+            self.group,
+            worker_id,
+            {lane: ">" for lane in self.lanes},
+            count=count,
+            block=max(int(timeout * 1000), 1),
+        )
+        by_lane = {}
+        for lane, entries in response or []:
+            by_lane[lane.decode() if isinstance(lane, bytes) else lane] = entries
+        items = []
+        for lane in self.lanes:
+            for entry_id, fields in by_lane.get(lane, []):
+                items.append(((lane, entry_id), self.serializer.loads(fields[self.TASK_FIELD])))
+        return items
+
+    def ack(self, worker_id: str, receipt):
+        lane, entry_id = receipt
+        self.redis.xack(lane, self.group, entry_id)
+
+    def fail(self, worker_id: str, receipt):
+        """Задача завершилась ошибкой — копия в поток <stream>:failed, запись подтверждается."""
+        lane, entry_id = receipt
+        entries = self.redis.xrange(lane, entry_id, entry_id)
+        pipe = self.redis.pipeline()
+        if entries:
+            pipe.xadd(self.failed_key, entries[0][1])
+        pipe.xack(lane, self.group, entry_id)
+        pipe.execute()
+
+    def reap(self, batch: int = 100) -> int:
+        """
+        Вернуть в поток задачи, не подтверждённые дольше visibility_timeout:
+        XAUTOCLAIM забирает их из PEL, копия добавляется в конец потока,
+        исходная запись подтверждается. Заодно потоки обрезаются (trim).
+        """
+        requeued = 0
+        min_idle = int(self.visibility_timeout * 1000)
+        for lane in self.lanes:
+            start = "0-0"
+            while True:
+                next_start, claimed, *_ = self.redis.xautoclaim(
+                    lane, self.group, self.REAPER, min_idle, start_id=start, count=batch
+                )
+                pipe = self.redis.pipeline()
+                for entry_id, fields in claimed:
+                    if fields:  # запись могла быть удалена обрезкой
+                        pipe.xadd(lane, fields)
+                    pipe.xack(lane, self.group, entry_id)
+                pipe.execute()
+                requeued += sum(1 for _, fields in claimed if fields)
+                if next_start in (b"0-0", "0-0"):
+                    break
+                start = next_start
+            self._forget_dead_consumers(lane, min_idle)
+        self.trim()
+        return requeued
+
+    def _forget_dead_consumers(self, lane: str, min_idle: int):
+        """Удалить потребителей без записей в PEL, молчащих дольше min_idle мс."""
+        for consumer in self.redis.xinfo_consumers(lane, self.group):
+            name = consumer["name"]
+            name = name.decode() if isinstance(name, bytes) else name
+            if consumer["pending"] == 0 and consumer["idle"] >= min_idle:
+                # живой воркер будет создан заново при следующем XREADGROUP
+                self._delete_idle_consumer(keys=[lane], args=[self.group, name])
+
+    def trim(self) -> int:
+        """
+        Удалить из потоков записи, которые уже доставлены и подтверждены
+        всеми группами: граница — минимум из last-delivered-id групп
+        и самых старых неподтверждённых записей.
+        """
+        trimmed = 0
+        for lane in self.lanes:
+            bounds = []
+            for group in self.redis.xinfo_groups(lane):
+                bounds.append(_stream_id(group["last-delivered-id"]))
+                pending = self.redis.xpending(lane, group["name"])
+                if pending["pending"]:
+                    bounds.append(_stream_id(pending["min"]))
+            if bounds:
+                min_id = min(bounds)
+                trimmed += self.redis.xtrim(
+                    lane, minid=f"{min_id[0]}-{min_id[1]}", approximate=True
+                )
+        return trimmed
+
+
+def _stream_id(value) -> tuple[int, int]:
+    if isinstance(value, bytes):
+        value = value.decode()
+    ms, seq = value.split("-")
+    return int(ms), int(seq)
+
+
+QUEUE_BACKENDS = {"list": ListQueue, "stream": StreamQueue}
+
+
+def make_queue(backend: str, redis_client: redis.Redis, **kwargs):
+    """Создать очередь по имени реализации: "list" или "stream"."""
+    try:
+        queue_class = QUEUE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестная реализация очереди: {backend!r}, "
+            f"допустимые: {', '.join(QUEUE_BACKENDS)}"
+        ) from None
+    return queue_class(redis_client, **kwargs)
+
+
+class TaskMetrics:
+    """
+    Метрики обработки: количество задач, ожидание в очереди
+    (от enqueued_at до начала обработки) и время обработки.
+    Перцентили считаются по последним window задачам.
+    """
+
+    def __init__(self, window: int = 10_000):
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.requeued = 0
+        self.retried = 0
+        self.redis_errors = 0
+        self._wait = deque(maxlen=window)
+        self._run = deque(maxlen=window)
+
+    def record(self, wait_seconds: float, run_seconds: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+            self._wait.append(wait_seconds)
+            self._run.append(run_seconds)
+
+    def record_requeued(self, n: int):
+        with self._lock:
+            self.requeued += n
+
+    def record_retried(self):
+        with self._lock:
+            self.retried += 1
+
+    def record_redis_error(self):
+        with self._lock:
+            self.redis_errors += 1
+
+    @staticmethod
+    def _percentiles(samples) -> dict:
+        if not samples:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+        ordered = sorted(samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+        return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "processed": self.processed,
+                "failed": self.failed,
+                "requeued": self.requeued,
+                "retried": self.retried,
+                "redis_errors": self.redis_errors,
+                "wait": self._percentiles(self._wait),
+                "run": self._percentiles(self._run),
+            }
+
+
+class WorkerPool:
+    """
+    Пул потоков-воркеров поверх очереди (ListQueue или StreamQueue).
+
+    handler         — функция обработки, получает payload задачи;
+    concurrency     — число потоков;
+    batch_size      — сколько задач воркер забирает за одно чтение;
+    poll_timeout    — таймаут блокирующего чтения, он же максимальная
+                      задержка реакции на остановку;
+    reap_interval   — период возврата задач с истёкшей арендой;
+    schedule_interval — период переноса наступивших отложенных задач;
+    max_attempts    — сколько раз выполнять задачу, завершающуюся ошибкой,
+                      прежде чем отправить её в failed;
+    retry_backoff   — задержка первого повтора в секундах, далее удваивается.
+    """
+
+    def __init__(
+        self,
+        queue,
+        handler: Callable,
+        concurrency: int = 4,
+        batch_size: int = 1,
+        poll_timeout: float = 1.0,
+        reap_interval: float = 5.0,
+        schedule_interval: float = 0.5,
+        max_attempts: int = 1,
+        retry_backoff: float = 1.0,
+        name: str | None = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_timeout = poll_timeout
+        self.reap_interval = reap_interval
+        self.schedule_interval = schedule_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.name = name or uuid.uuid4().hex[:8]
+        self.metrics = TaskMetrics()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _work(self, worker_id: str):
+        self.queue.register(worker_id)
+        try:
+            while not self._stop.is_set():
+                try:
+                    items = self.queue.fetch(worker_id, self.poll_timeout, self.batch_size)
+                except redis.RedisError:
+                    logger.exception("Ошибка чтения очереди, повтор")
+                    self._stop.wait(self.poll_timeout)
+                    continue
+
+                # взятые задачи дорабатываются и при остановке
+                for receipt, task in items:
+                    self._process(worker_id, receipt, task)
+        finally:
+            self.queue.unregister(worker_id)
+
+    def _process(self, worker_id: str, receipt, task: dict):
+        started = time.time()
+        try:
+            self.handler(task["payload"])
+        except Exception:
+            logger.exception("Задача %s завершилась ошибкой", task["id"])
+            ok = False
+        else:
+            ok = True
+        self.metrics.record(started - task["enqueued_at"], time.time() - started, ok)
+
+        # ошибка Redis не должна останавливать поток: неподтверждённая
+        # задача останется в обработке и вернётся в очередь через reap
+        try:
+            if ok:
+                self.queue.ack(worker_id, receipt)
+            else:
+                attempt = task.get("attempt", 0)
+                if attempt + 1 < self.max_attempts:
+                    self.queue.retry(worker_id, receipt, task, self.retry_backoff * 2**attempt)
+                    self.metrics.record_retried()
+                else:
+                    self.queue.fail(worker_id, receipt)
+        except redis.RedisError:
+            logger.exception("Ошибка Redis при завершении задачи %s", task["id"])
+            self.metrics.record_redis_error()
+
+    def _reap(self):
+        while not self._stop.wait(self.reap_interval):
+            try:
+                self.metrics.record_requeued(self.queue.reap())
+            except redis.RedisError:
+                logger.exception("Ошибка возврата задач с истёкшей арендой")
+
+    def _schedule(self):
+        while not self._stop.wait(self.schedule_interval):
+            try:
+                self.queue.promote_due()
+            except redis.RedisError:
+                logger.exception("Ошибка переноса отложенных задач")
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._work, args=(f"{self.name}-{i}",), name=f"worker-{i}"
+            )
+            for i in range(self.concurrency)
+        ]
+        self._threads.append(threading.Thread(target=self._reap, name="reaper"))
+        self._threads.append(threading.Thread(target=self._schedule, name="scheduler"))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """Мягкая остановка: новые задачи не берутся, текущие дорабатываются."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_forever(self):
+        """Запуск до SIGINT/SIGTERM (только из главного потока)."""
+        stopped = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopped.set())
+        self.start()
+        stopped.wait()
+        self.stop()
@@ -1,7 +1,16 @@
+import argparse
+import logging
 import time
-from common import get_redis
+from pprint import pprint
 
-QUEUE_NAME = "task_queue"
+from common import get_redis
+from task_queue import (
+    QUEUE_BACKENDS,
+    QUEUE_NAME,
+    STANDARD_PRIORITIES,
+    WorkerPool,
+    make_queue,
+)
 
 def process_task(task: str):
     """Простой обработчик задачи."""
@@ -12,19 +21,39 @@ def process_task(task: str):
 
 
 if __name__ == "__main__":
-    r = get_redis()
-    print(f"Воркер запущен, слушаю очередь '{QUEUE_NAME}' (Ctrl+C для выхода)")
-    try:
-        while True:
-            # BRPOP: блокирующее чтение с конца списка
-            # Возвращает (queue_name, task) или None по таймауту
-            item = r.brpop(QUEUE_NAME, timeout=5)
-            if item is None:
-                # за 5 секунд задач не появилось — можно что-то логировать или просто продолжать
-                continue
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=4, help="число потоков-воркеров")
+    parser.add_argument(
+        "--visibility-timeout", type=float, default=60,
+        help="через сколько секунд незавершённая задача возвращается в очередь",
+    )
+    parser.add_argument("--backend", choices=list(QUEUE_BACKENDS), default="list")
+    parser.add_argument("--batch", type=int, default=1, help="сколько задач забирать за одно чтение")
+    parser.add_argument(
+        "--max-attempts", type=int, default=3,
+        help="число попыток для задачи с ошибкой (повторы с экспоненциальной паузой)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
 
-            queue_name, task = item
-            print(f"[DEQUEUE] Получена задача из {queue_name}: {task}")
-            process_task(task)
-    except KeyboardInterrupt:
-        print("Остановка воркера")
+    queue = make_queue(
+        args.backend,
+        get_redis(decode_responses=False),
+        visibility_timeout=args.visibility_timeout,
+        priorities=STANDARD_PRIORITIES,
+    )
+    pool = WorkerPool(
+        queue,
+        process_task,
+        concurrency=args.concurrency,
+        batch_size=args.batch,
+        max_attempts=args.max_attempts,
+    )
+    print(
+        f"Воркеры ({args.concurrency}) запущены, слушаю очередь '{QUEUE_NAME}' "
+        f"({args.backend}) (Ctrl+C для выхода)"
+    )
+    # Ctrl+C / SIGTERM: дожидаемся завершения текущих задач
+    pool.run_forever()
+    print("Остановка воркера")
+    pprint(pool.metrics.snapshot())
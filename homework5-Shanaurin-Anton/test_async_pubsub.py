@@ -0,0 +1,101 @@
+"""Тесты асинхронного pub/sub на fakeredis"""
+
+import asyncio
+
+import fakeredis
+import redis
+
+from async_pubsub import AsyncPubSub, Subscription
+
+
+async def wait_until(condition, timeout=3.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if condition():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+def collector(batches):
+    async def handle(batch):
+        batches.append([message["data"] for message in batch])
+    return handle
+
+
+def test_message_fanned_out_to_matching_subscribers():
+    async def scenario():
+        bus = AsyncPubSub(fakeredis.FakeAsyncRedis())
+        first, second, other = [], [], []
+        bus.subscribe("orders:*", collector(first))
+        bus.subscribe("orders:*", collector(second))
+        bus.subscribe("users:*", collector(other))
+        await bus.start()
+        try:
+            await bus.publish("orders:new", b"1")
+            await bus.publish("users:new", b"2")
+            assert await wait_until(lambda: first and second and other)
+        finally:
+            await bus.close()
+        return first, second, other
+
+    first, second, other = asyncio.run(scenario())
+    assert first == second == [[b"1"]]
+    assert other == [[b"2"]]
+
+
+def test_bounded_queue_drops_by_policy():
+    async def scenario():
+        drop_new = Subscription("p", collector([]), 2, "drop_new", 10, 0.01)
+        drop_oldest = Subscription("p", collector([]), 2, "drop_oldest", 10, 0.01)
+        for n in range(4):
+            await drop_new.offer({"data": n})
+            await drop_oldest.offer({"data": n})
+        return drop_new, drop_oldest
+
+    drop_new, drop_oldest = asyncio.run(scenario())
+    assert drop_new.stats()["dropped"] == drop_oldest.stats()["dropped"] == 2
+    assert [m["data"] for m in drop_new.queue._queue] == [0, 1]
+    assert [m["data"] for m in drop_oldest.queue._queue] == [2, 3]
+
+
+def test_handler_receives_batches():
+    async def scenario():
+        bus = AsyncPubSub(fakeredis.FakeAsyncRedis())
+        batches = []
+        subscription = bus.subscribe("orders:*", collector(batches), batch_size=4, batch_timeout=0.2)
+        await bus.start()
+        try:
+            await bus.publish_many("orders:new", [str(n).encode() for n in range(10)], batch_size=5)
+            assert await wait_until(lambda: subscription.delivered == 10)
+        finally:
+            await bus.close()
+        return batches, subscription
+
+    batches, subscription = asyncio.run(scenario())
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert subscription.stats()["batches"] == 3
+
+
+def test_reader_resubscribes_after_connection_error():
+    async def scenario():
+        bus = AsyncPubSub(fakeredis.FakeAsyncRedis(), reconnect_delay=0.01)
+        batches = []
+        bus.subscribe("orders:*", collector(batches))
+        await bus.start()
+
+        async def broken_listen():
+            raise redis.ConnectionError("соединение разорвано")
+            yield
+
+        bus._pubsub.listen = broken_listen  # читатель ещё не запущен
+        try:
+            assert await wait_until(lambda: bus.reconnects == 1)
+            await bus.publish("orders:new", b"after")
+            assert await wait_until(lambda: batches)
+        finally:
+            await bus.close()
+        return batches
+
+    assert asyncio.run(scenario()) == [[b"after"]]
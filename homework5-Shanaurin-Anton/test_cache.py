@@ -0,0 +1,143 @@
+"""Тесты кеша результатов функций на fakeredis"""
+
+import threading
+import time
+
+import fakeredis
+import redis
+import pytest
+
+from cache import RedisCache, make_key
+
+
+@pytest.fixture
+def cache():
+    return RedisCache(fakeredis.FakeRedis(), namespace="test")
+
+
+def test_key_ignores_argument_order():
+    def f(a, b=2):
+        pass
+
+    assert make_key("ns", 0, f, (1,), {"b": 2}) == make_key("ns", 0, f, (), {"b": 2, "a": 1})
+
+
+def test_methods_share_entries_across_instances(cache):
+    calls = []
+
+    class Repository:
+        @cache.cached(ttl_seconds=60)
+        def revenue(self, city):
+            calls.append(city)
+            return len(calls)
+
+    assert Repository().revenue("Тюмень") == 1
+    assert Repository().revenue("Тюмень") == 1
+    assert calls == ["Тюмень"]
+
+
+def test_key_func_separates_instances(cache):
+    class Repository:
+        def __init__(self, db):
+            self.db = db
+
+        @cache.cached(ttl_seconds=60, key_func=lambda self, city: (self.db, city))
+        def revenue(self, city):
+            return self.db
+
+    assert Repository("a").revenue("x") == "a"
+    assert Repository("b").revenue("x") == "b"
+
+
+def test_object_without_stable_representation_rejected(cache):
+    @cache.cached(ttl_seconds=60)
+    def f(value):
+        return value
+
+    with pytest.raises(TypeError):
+        f(object())
+
+
+class FlakyRedis(fakeredis.FakeRedis):
+    """Redis, который ломается посреди вызова"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gets_left = None  # сколько ещё GET пройдёт, None — без ограничений
+        self.fail_set = False
+
+    def set(self, *args, **kwargs):
+        if self.fail_set:
+            raise redis.ConnectionError("down")
+        return super().set(*args, **kwargs)
+
+    def get(self, name):
+        if self.gets_left is not None:
+            if self.gets_left == 0:
+                raise redis.ConnectionError("down")
+            self.gets_left -= 1
+        return super().get(name)
+
+
+def test_lock_error_falls_back_to_function():
+    client = FlakyRedis()
+    cache = RedisCache(client, namespace="test")
+
+    @cache.cached(ttl_seconds=60)
+    def f(x):
+        return x * 2
+
+    f.cache_key(21)  # версия namespace прочитана и закеширована
+    client.fail_set = True
+    assert f(21) == 42
+    assert cache.stats.snapshot()["errors"] >= 1
+
+
+def test_poll_error_falls_back_to_function():
+    client = FlakyRedis()
+    cache = RedisCache(client, namespace="test")
+
+    @cache.cached(ttl_seconds=60, wait_timeout=1, poll_interval=0.01)
+    def f(x):
+        return x * 2
+
+    # блокировку держит «другой процесс», ожидание натыкается на ошибку Redis
+    client.set(f"{f.cache_key(21)}:lock", "other", px=60_000)
+    client.gets_left = 1  # первое чтение проходит, опрос — нет
+    assert f(21) == 42
+
+
+def test_entry_shorter_than_header_is_a_miss(cache):
+    @cache.cached(ttl_seconds=60)
+    def f(x):
+        return x * 2
+
+    cache.redis.set(f.cache_key(21), b"\x80")
+    assert f(21) == 42
+
+
+def test_waiters_stop_when_lock_holder_fails(cache):
+    holding = threading.Event()
+    calls = []
+
+    @cache.cached(ttl_seconds=60, wait_timeout=10, poll_interval=0.01)
+    def f(x):
+        calls.append(x)
+        if len(calls) == 1:
+            holding.set()
+            time.sleep(0.1)
+            raise RuntimeError("backend down")
+        return x * 2
+
+    def holder():
+        with pytest.raises(RuntimeError):
+            f(21)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    holding.wait(timeout=5)
+
+    started = time.monotonic()
+    assert f(21) == 42
+    assert time.monotonic() - started < 2
+    thread.join()
@@ -0,0 +1,91 @@
+"""Тесты двухуровневого кеша на fakeredis"""
+
+import time
+
+import fakeredis
+import pytest
+
+from near_cache import TwoTierCache
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def make_cache(server):
+    caches = []
+
+    def make(**kwargs):
+        cache = TwoTierCache(fakeredis.FakeRedis(server=server), namespace="test", **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_second_call_served_from_l1(make_cache):
+    cache = make_cache()
+
+    @cache.cached(ttl_seconds=60)
+    def f(x):
+        return x * 2
+
+    assert f(21) == 42
+    assert f(21) == 42
+    assert cache.tier_stats.snapshot()["l1_hits"] == 1
+
+
+def test_store_invalidates_other_instances(make_cache):
+    first, second = make_cache(), make_cache()
+    results = iter([1, 2])
+
+    def compute():
+        return next(results)
+
+    read_first = first.cached(ttl_seconds=60)(compute)
+    read_second = second.cached(ttl_seconds=60)(compute)
+
+    assert read_first() == 1
+    assert read_second() == 1  # L2, затем L1 второго экземпляра
+    read_first.invalidate()
+
+    key = read_second.cache_key()
+    assert wait_until(lambda: second.local.get(key) is None)
+    assert read_second() == 2
+
+
+def test_malformed_message_does_not_stop_listener(make_cache):
+    first, second = make_cache(), make_cache()
+    second.local.set("cache:test:k", b"value")
+
+    first.redis.publish(first.channel, "garbage")
+    first.redis.publish(first.channel, b"\xff\xfe")
+    first._publish("key", "cache:test:k")
+
+    assert wait_until(lambda: second.local.get("cache:test:k") is None)
+    assert second.stats.snapshot()["errors"] == 2
+
+
+def test_waiting_for_lock_does_not_count_misses(make_cache):
+    cache = make_cache()
+
+    @cache.cached(ttl_seconds=60, wait_timeout=0.2, poll_interval=0.01)
+    def f(x):
+        return x * 2
+
+    cache.redis.set(f"{f.cache_key(21)}:lock", "other", px=60_000)
+    assert f(21) == 42
+    assert cache.tier_stats.snapshot()["misses"] == 1
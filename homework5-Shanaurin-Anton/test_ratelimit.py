@@ -0,0 +1,149 @@
+"""
+Тесты ограничителей частоты запросов: Redis на localhost:6379,
+без него — fakeredis (Lua-скрипты выполняются через lupa)
+"""
+
+import threading
+import time
+import uuid
+
+import fakeredis
+import pytest
+import redis
+
+from common import get_redis
+from ratelimit import (
+    RateLimitExceeded,
+    SlidingWindowLimiter,
+    TokenBucketLimiter,
+)
+
+
+@pytest.fixture(scope='module')
+def redis_client():
+    """Соединение с Redis; без сервера — fakeredis"""
+    client = get_redis()
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        return fakeredis.FakeRedis(decode_responses=True)
+    return client
+
+
+@pytest.fixture
+def name():
+    """Уникальное имя ограничителя, чтобы тесты не делили ключи"""
+    return f"test_{uuid.uuid4().hex}"
+
+
+def run_concurrently(func, n_threads, calls_per_thread):
+    """Вызвать func из n_threads потоков и вернуть все результаты"""
+    results = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(n_threads)
+
+    def worker():
+        barrier.wait()
+        local = [func() for _ in range(calls_per_thread)]
+        with lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSlidingWindow:
+    """Тесты скользящего окна"""
+
+    def test_allows_up_to_limit(self, redis_client, name):
+        limiter = SlidingWindowLimiter(redis_client, name, limit=5, window_seconds=10)
+
+        decisions = [limiter.allow("client") for _ in range(6)]
+
+        assert [d.allowed for d in decisions] == [True] * 5 + [False]
+        assert decisions[4].remaining == 0
+        assert 0 < decisions[5].retry_after <= 10
+
+    def test_identities_are_independent(self, redis_client, name):
+        limiter = SlidingWindowLimiter(redis_client, name, limit=1, window_seconds=10)
+
+        assert limiter.allow("a").allowed
+        assert limiter.allow("b").allowed
+        assert not limiter.allow("a").allowed
+
+    def test_window_slides(self, redis_client, name):
+        limiter = SlidingWindowLimiter(redis_client, name, limit=2, window_seconds=0.2)
+        limiter.allow("client")
+        limiter.allow("client")
+        assert not limiter.allow("client").allowed
+
+        time.sleep(0.25)
+
+        assert limiter.allow("client").allowed
+
+    def test_cost_above_limit_never_allowed(self, redis_client, name):
+        limiter = SlidingWindowLimiter(redis_client, name, limit=3, window_seconds=10)
+
+        decision = limiter.allow("client", cost=4)
+
+        assert not decision.allowed
+        assert decision.retry_after == float("inf")
+
+    def test_concurrent_clients_do_not_exceed_limit(self, redis_client, name):
+        limiter = SlidingWindowLimiter(redis_client, name, limit=100, window_seconds=30)
+
+        results = run_concurrently(lambda: limiter.allow("shared").allowed, 16, 25)
+
+        assert len(results) == 400
+        assert sum(results) == 100
+
+
+class TestTokenBucket:
+    """Тесты ведра токенов"""
+
+    def test_burst_up_to_capacity(self, redis_client, name):
+        limiter = TokenBucketLimiter(redis_client, name, rate=1, capacity=3)
+
+        decisions = [limiter.allow("client") for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert 0 < decisions[3].retry_after <= 1
+
+    def test_refill(self, redis_client, name):
+        limiter = TokenBucketLimiter(redis_client, name, rate=20, capacity=1)
+        assert limiter.allow("client").allowed
+        assert not limiter.allow("client").allowed
+
+        time.sleep(0.1)
+
+        assert limiter.allow("client").allowed
+
+    def test_check_raises(self, redis_client, name):
+        limiter = TokenBucketLimiter(redis_client, name, rate=1, capacity=1)
+        limiter.check("client")
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.check("client")
+        assert exc_info.value.retry_after > 0
+
+    def test_concurrent_clients_do_not_exceed_capacity(self, redis_client, name):
+        # пополнение за время теста пренебрежимо мало: 0.01 токена в секунду
+        limiter = TokenBucketLimiter(redis_client, name, rate=0.01, capacity=50)
+
+        results = run_concurrently(lambda: limiter.allow("shared").allowed, 16, 20)
+
+        assert len(results) == 320
+        assert sum(results) == 50
+
+
+def test_fail_open_when_redis_unavailable(name):
+    """При недоступном Redis запрос пропускается либо ошибка пробрасывается"""
+    broken = redis.Redis(host="localhost", port=1, socket_connect_timeout=0.1)
+
+    assert SlidingWindowLimiter(broken, name, limit=1, window_seconds=1).allow("c").allowed
+    with pytest.raises(redis.ConnectionError):
+        TokenBucketLimiter(broken, name, rate=1, capacity=1, fail_open=False).allow("c")
@@ -0,0 +1,216 @@
+"""Тесты очереди задач на fakeredis"""
+
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from task_queue import (
+    STANDARD_PRIORITIES,
+    ListQueue,
+    StreamQueue,
+    TaskProducer,
+    WorkerPool,
+    make_task,
+)
+
+
+@pytest.fixture
+def queue():
+    return ListQueue(fakeredis.FakeRedis(), visibility_timeout=0.1)
+
+
+def test_reap_returns_task_of_worker_idle_during_previous_reap(queue):
+    queue.register("w1")
+    assert queue.reap() == 0          # w1 простаивает и снимается с учёта
+
+    TaskProducer(queue).enqueue({"n": 1})
+    assert len(queue.fetch("w1", timeout=1)) == 1
+    # воркер «упал», не подтвердив задачу
+    time.sleep(0.15)
+
+    assert queue.reap() == 1
+    assert queue.length() == 1
+    assert queue.redis.llen(queue.processing_key("w1")) == 0
+
+
+def test_busy_worker_is_not_forgotten(queue):
+    TaskProducer(queue).enqueue({"n": 1})
+    queue.fetch("w1", timeout=1)
+
+    queue.unregister("w1")
+
+    assert queue.redis.sismember(queue.workers_key, "w1")
+
+
+class FlakyAckQueue(ListQueue):
+    def ack(self, worker_id, data):
+        raise redis.ConnectionError("Redis недоступен")
+
+
+def test_redis_error_on_ack_does_not_stop_worker():
+    queue = FlakyAckQueue(fakeredis.FakeRedis())
+    pool = WorkerPool(queue, handler=lambda payload: None)
+    task = make_task({"n": 1})
+
+    pool._process("w1", b"receipt", task)
+    pool._process("w1", b"receipt", task)
+
+    snapshot = pool.metrics.snapshot()
+    assert snapshot["processed"] == 2
+    assert snapshot["redis_errors"] == 2
+
+
+def test_task_recovered_if_worker_dies_right_after_fetch(queue, monkeypatch):
+    queue.register("w1")
+    assert queue.reap() == 0          # w1 простаивает и снимается с учёта
+    TaskProducer(queue).enqueue({"n": 1})
+
+    def crash(*args, **kwargs):
+        raise SystemExit("воркер упал")
+
+    # любой отдельный шаг после переноса задачи завершает процесс
+    monkeypatch.setattr(queue.redis, "pipeline", crash)
+    try:
+        queue.fetch("w1", timeout=1)
+    except SystemExit:
+        pass
+    monkeypatch.undo()
+    time.sleep(0.15)
+
+    assert queue.reap() == 1
+    assert queue.length() == 1
+
+
+@pytest.fixture
+def stream_queue():
+    return StreamQueue(fakeredis.FakeRedis(), visibility_timeout=0.1)
+
+
+def consumers(queue):
+    return {c["name"] for c in queue.redis.xinfo_consumers(queue.stream, queue.group)}
+
+
+def test_stream_consumer_removed_on_unregister(stream_queue):
+    TaskProducer(stream_queue).enqueue({"n": 1})
+    (receipt, _), = stream_queue.fetch("w1", timeout=1)
+
+    stream_queue.unregister("w1")
+    assert consumers(stream_queue) == {b"w1"}   # задача ещё не подтверждена
+
+    stream_queue.ack("w1", receipt)
+    stream_queue.unregister("w1")
+    assert consumers(stream_queue) == set()
+
+
+def test_dead_stream_consumer_removed_after_reap(stream_queue):
+    TaskProducer(stream_queue).enqueue({"n": 1})
+    stream_queue.fetch("w1", timeout=1)
+    time.sleep(0.15)
+
+    assert stream_queue.reap() == 1
+    assert b"w1" not in consumers(stream_queue)
+    assert len(stream_queue.fetch("w2", timeout=1)) == 1
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """Считает сетевые обмены pipeline (вызовы execute) и команды в них"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executes = []
+
+    def pipeline(self, *args, **kwargs):
+        pipe = super().pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted(*a, **kw):
+            self.executes.append(len(pipe.command_stack))
+            return execute(*a, **kw)
+
+        pipe.execute = counted
+        return pipe
+
+
+@pytest.mark.parametrize("queue_class", [ListQueue, StreamQueue])
+def test_enqueue_many_batches_into_pipelines_in_order(queue_class):
+    queue = queue_class(CountingRedis())
+    producer = TaskProducer(queue, batch_size=3, pipeline_batches=2)
+
+    assert producer.enqueue_many(range(10)) == 10
+
+    # пачки 3+3+3+1 уходят двумя обменами по две пачки; у списка пачка —
+    # одна команда LPUSH, у потока — XADD на каждую задачу
+    commands = [2, 2] if queue_class is ListQueue else [6, 4]
+    assert queue.redis.executes == commands
+    tasks = [task["payload"] for _, task in queue.fetch("w1", timeout=1, count=10)]
+    assert tasks == list(range(10))
+
+
+def test_acked_stream_task_is_not_requeued(stream_queue):
+    TaskProducer(stream_queue).enqueue({"n": 1})
+    (receipt, _), = stream_queue.fetch("w1", timeout=1)
+    stream_queue.ack("w1", receipt)
+    time.sleep(0.15)
+
+    assert stream_queue.reap() == 0
+    assert stream_queue.redis.xpending(stream_queue.stream, stream_queue.group)["pending"] == 0
+
+
+def test_stream_retry_redelivers_with_next_attempt(stream_queue):
+    TaskProducer(stream_queue).enqueue({"n": 1})
+    (receipt, task), = stream_queue.fetch("w1", timeout=1)
+
+    stream_queue.retry("w1", receipt, task, delay=0)
+    assert stream_queue.promote_due() == 1
+
+    (_, retried), = stream_queue.fetch("w1", timeout=1)
+    assert retried["id"] == task["id"]
+    assert retried["attempt"] == 1
+    assert stream_queue.redis.xpending(stream_queue.stream, stream_queue.group)["pending"] == 1
+
+
+def test_stream_unacked_task_reclaimed_by_another_worker(stream_queue):
+    producer = TaskProducer(stream_queue)
+    producer.enqueue({"n": 1})
+    producer.enqueue({"n": 2})
+    (receipt, _), (_, lost) = stream_queue.fetch("w1", timeout=1, count=2)
+    stream_queue.ack("w1", receipt)
+
+    assert stream_queue.reap() == 0          # таймаут видимости ещё не истёк
+    time.sleep(0.15)
+    assert stream_queue.reap() == 1
+
+    (_, task), = stream_queue.fetch("w2", timeout=1)
+    assert task == lost
+
+
+@pytest.mark.parametrize("queue_class", [ListQueue, StreamQueue])
+def test_fetch_returns_higher_priority_first(queue_class):
+    queue = queue_class(fakeredis.FakeRedis(), priorities=STANDARD_PRIORITIES)
+    producer = TaskProducer(queue)
+    for priority in ("low", "default", "high", "default"):
+        producer.enqueue(priority, priority=priority)
+
+    tasks = [task["payload"] for _, task in queue.fetch("w1", timeout=1, count=4)]
+
+    assert tasks == ["high", "default", "default", "low"]
+
+
+@pytest.mark.parametrize("queue_class", [ListQueue, StreamQueue])
+def test_delayed_task_promoted_to_its_lane_when_due(queue_class):
+    queue = queue_class(fakeredis.FakeRedis(), priorities=STANDARD_PRIORITIES)
+    producer = TaskProducer(queue)
+    producer.enqueue("later", priority="high", delay=0.1)
+    producer.enqueue("now", priority="low")
+
+    assert queue.promote_due() == 0
+    assert queue.delayed_count() == 1
+    time.sleep(0.15)
+    assert queue.promote_due() == 1
+
+    assert queue.delayed_count() == 0
+    assert queue.redis.exists(queue.lane_key("high"))
+    tasks = [task["payload"] for _, task in queue.fetch("w1", timeout=1, count=2)]
+    assert tasks == ["later", "now"]
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Резервное копирование MongoDB: полные дампы + непрерывный захват oplog.
+
+В отличие от backup_mongo.sh (каждый раз полный mongodump, старые копии
+не удаляются):
+
+  - full   — полный дамп mongodump --gzip --oplog --numParallelCollections N;
+             --oplog делает дамп согласованным на момент окончания, этот
+             момент (ts последней операции) записывается в manifest.json;
+  - tail   — чтение local.oplog.rs tailable-курсором и запись операций
+             в сжатые сегменты oplog/<начало>_<конец>.bson.gz; сегмент
+             закрывается по времени или числу записей, позиция сохраняется
+             в oplog/state.json, после перезапуска чтение продолжается с неё;
+  - run    — tail в фоне + полный дамп раз в --full-interval часов
+             с последующей чисткой;
+  - restore — восстановление на момент времени: последний полный дамп до
+             этого момента, затем mongorestore --oplogReplay --oplogLimit
+             по операциям из сегментов;
+  - prune  — хранить --keep-fulls последних полных дампов и только те
+             сегменты oplog, которые нужны для восстановления от них.
+
+Oplog есть только у replica set, поэтому сервер должен быть запущен как
+replica set (подойдёт и одноузловой, см. docker-compose.replset.yaml).
+Захват идёт именно по oplog, а не через change streams: сегменты в формате
+oplog mongorestore воспроизводит сам (--oplogReplay).
+
+Параметры подключения — те же переменные окружения, что в backup_mongo.sh,
+плюс MONGO_DIRECT=1 (directConnection=true: не переключаться на адреса
+из конфигурации replica set, нужно для docker-compose.replset.yaml, где
+узел объявлен как localhost:27017, а опубликован на 27018) или MONGO_URI —
+готовая строка подключения вместо всех остальных переменных.
+
+    python backup_mongo.py full --jobs 4
+    python backup_mongo.py run --full-interval 24 --keep-fulls 7
+    python backup_mongo.py restore --to 2024-05-01T12:30:00
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote_plus
+
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from bson.timestamp import Timestamp
+from pymongo import DESCENDING, MongoClient
+from pymongo.cursor import CursorType
+
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "/backups/mongo")
+RAW = CodecOptions(document_class=RawBSONDocument)
+
+logger = logging.getLogger("backup_mongo")
+
+
+class OplogGapError(RuntimeError):
+    """Позиция чтения вытеснена из oplog: нужен новый полный дамп."""
+
+
+def mongo_uri() -> str:
+    if os.environ.get("MONGO_URI"):
+        return os.environ["MONGO_URI"]
+    host = os.environ.get("MONGO_HOST", "localhost")
+    port = os.environ.get("MONGO_PORT", "27017")
+    user = os.environ.get("MONGO_USER", "")
+    password = os.environ.get("MONGO_PASSWORD", "")
+    params = []
+    credentials = ""
+    if user and password:
+        credentials = f"{quote_plus(user)}:{quote_plus(password)}@"
+        params.append("authSource=admin")
+    if os.environ.get("MONGO_DIRECT", "").lower() in ("1", "true", "yes"):
+        params.append("directConnection=true")
+    query = f"?{'&'.join(params)}" if params else ""
+    return f"mongodb://{credentials}{host}:{port}/{query}"
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("нужно целое число не меньше 1")
+    return number
+
+
+def ts_name(ts: Timestamp) -> str:
+    return f"{ts.time}-{ts.inc}"
+
+
+def parse_ts(name: str) -> Timestamp:
+    seconds, inc = name.split("-")
+    return Timestamp(int(seconds), int(inc))
+
+
+def latest_oplog_ts(client: MongoClient) -> Timestamp:
+    entry = client.local["oplog.rs"].find_one({}, sort=[("$natural", DESCENDING)])
+    if entry is None:
+        raise RuntimeError("local.oplog.rs пуст или недоступен: сервер не в replica set?")
+    return entry["ts"]
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def read_oplog_file(path: Path):
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        yield from bson.decode_file_iter(f, RAW)
+
+
+# ---------------- Полные дампы ----------------
+
+
+def fulls_dir(backup_dir: str) -> Path:
+    return Path(backup_dir) / "full"
+
+
+def list_fulls(backup_dir: str) -> list[tuple[Path, dict]]:
+    """Полные дампы с манифестами, от старых к новым."""
+    result = []
+    for path in sorted(fulls_dir(backup_dir).glob("*/manifest.json")):
+        result.append((path.parent, json.loads(path.read_text())))
+    return result
+
+
+def full_backup(uri: str, backup_dir: str, jobs: int) -> dict:
+    client = MongoClient(uri)
+    start_ts = latest_oplog_ts(client)
+    date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    target = fulls_dir(backup_dir) / date
+    partial = target.with_name(f".{date}.partial")
+    partial.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"Начинаю полный дамп MongoDB ({jobs} коллекций параллельно)...")
+    started = time.perf_counter()
+    subprocess.run(
+        [
+            "mongodump",
+            f"--uri={uri}",
+            "--gzip",
+            "--oplog",
+            f"--numParallelCollections={jobs}",
+            f"--out={partial}",
+        ],
+        check=True,
+    )
+    seconds = time.perf_counter() - started
+
+    # дамп согласован на момент последней операции в его oplog.bson;
+    # если за время дампа записей не было — на момент начала
+    end_ts = start_ts
+    for name in ("oplog.bson.gz", "oplog.bson"):
+        if (partial / name).exists():
+            for entry in read_oplog_file(partial / name):
+                end_ts = max(end_ts, entry["ts"])
+
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "start_ts": ts_name(start_ts),
+        "end_ts": ts_name(end_ts),
+        "end_time": datetime.fromtimestamp(end_ts.time, timezone.utc).isoformat(),
+        "jobs": jobs,
+        "bytes": dir_size(partial),
+        "seconds": round(seconds, 3),
+    }
+    (partial / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    partial.rename(target)
+    print(f"Бэкап MongoDB сохранён: {target} ({manifest['bytes'] / 2**20:.1f} МиБ, {seconds:.1f} с)")
+    return manifest
+
+
+# ---------------- Сегменты oplog ----------------
+
+
+def oplog_dir(backup_dir: str) -> Path:
+    return Path(backup_dir) / "oplog"
+
+
+def read_state(backup_dir: str) -> dict | None:
+    path = oplog_dir(backup_dir) / "state.json"
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def list_segments(backup_dir: str) -> list[tuple[Timestamp, Timestamp, Path]]:
+    """Закрытые сегменты (первая операция, последняя операция, путь) по порядку."""
+    result = []
+    for path in oplog_dir(backup_dir).glob("*.bson.gz"):
+        first, last = path.name.removesuffix(".bson.gz").split("_")
+        result.append((parse_ts(first), parse_ts(last), path))
+    return sorted(result, key=lambda item: item[0])
+
+
+class OplogSegment:
+    """Сегмент, в который идёт запись; виден под итоговым именем только после close()."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.partial = directory / f".segment_{os.getpid()}.partial"
+        self.file = gzip.open(self.partial, "wb")
+        self.first = None
+        self.last = None
+        self.count = 0
+        self.opened_at = time.monotonic()
+
+    def write(self, entry: RawBSONDocument):
+        ts = entry["ts"]
+        self.first = self.first or ts
+        self.last = ts
+        self.count += 1
+        self.file.write(entry.raw)
+
+    def close(self) -> Path | None:
+        self.file.close()
+        if not self.count:
+            self.partial.unlink()
+            return None
+        path = self.directory / f"{ts_name(self.first)}_{ts_name(self.last)}.bson.gz"
+        self.partial.rename(path)
+        return path
+
+
+class OplogTailer:
+    """
+    Непрерывное чтение oplog в сегменты.
+    segment_seconds / segment_entries — когда закрывать текущий сегмент.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        backup_dir: str,
+        segment_seconds: float = 300,
+        segment_entries: int = 100_000,
+    ):
+        self.client = MongoClient(uri)
+        self.directory = oplog_dir(backup_dir)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.directory / "state.json"
+        self.segment_seconds = segment_seconds
+        self.segment_entries = segment_entries
+        self.stop_event = threading.Event()
+        self.chain_start = None
+
+    def load_position(self) -> Timestamp:
+        """
+        Позиция, с которой продолжать чтение. chain_start — начало
+        непрерывной цепочки сегментов: восстановление от полного дампа
+        возможно, только если дамп закончился не раньше неё.
+        """
+        state = read_state(str(self.directory.parent))
+        if state is not None:
+            self.chain_start = parse_ts(state["chain_start"])
+            return parse_ts(state["last_ts"])
+        self.chain_start = latest_oplog_ts(self.client)
+        self.save_position(self.chain_start)
+        return self.chain_start
+
+    def save_position(self, ts: Timestamp):
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"chain_start": ts_name(self.chain_start), "last_ts": ts_name(ts)})
+        )
+        tmp.replace(self.state_path)
+
+    def _rotate(self, segment: OplogSegment) -> OplogSegment:
+        path = segment.close()
+        if path is not None:
+            self.save_position(segment.last)
+            logger.info("Сегмент %s: %d операций", path.name, segment.count)
+        return OplogSegment(self.directory)
+
+    def run(self):
+        # недописанные сегменты прошлого запуска перечитаются из oplog
+        for partial in self.directory.glob(".segment_*.partial"):
+            partial.unlink()
+
+        position = self.load_position()
+        oplog = self.client.local.get_collection("oplog.rs", codec_options=RAW)
+        cursor = oplog.find(
+            {"ts": {"$gte": position}},
+            cursor_type=CursorType.TAILABLE_AWAIT,
+            max_await_time_ms=1000,
+        )
+        first = cursor.next()
+        if first["ts"] != position:
+            # операция, на которой остановились, уже вытеснена из oplog
+            raise OplogGapError(
+                f"oplog начинается с {ts_name(first['ts'])}, позиция {ts_name(position)} "
+                f"потеряна; удалите {self.state_path} и снимите полный дамп"
+            )
+
+        logger.info("Чтение oplog с %s", ts_name(position))
+        segment = OplogSegment(self.directory)
+        try:
+            while cursor.alive and not self.stop_event.is_set():
+                entry = cursor.try_next()
+                if entry is not None:
+                    segment.write(entry)
+                if segment.count >= self.segment_entries or (
+                    time.monotonic() - segment.opened_at >= self.segment_seconds
+                ):
+                    segment = self._rotate(segment)
+        finally:
+            self._rotate(segment).close()
+            cursor.close()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+# ---------------- Восстановление ----------------
+
+
+def restore(uri: str, backup_dir: str, target: datetime | None = None, drop: bool = True):
+    """
+    Восстановить состояние на момент target (по умолчанию — последний
+    сохранённый). Точность — секунда: воспроизводятся операции с ts <= target.
+    """
+    limit_seconds = int(target.timestamp()) if target else None
+    fulls = [
+        (path, manifest)
+        for path, manifest in list_fulls(backup_dir)
+        if limit_seconds is None or parse_ts(manifest["end_ts"]).time <= limit_seconds
+    ]
+    if not fulls:
+        raise RuntimeError("Нет полного дампа, снятого до указанного момента")
+    full_path, manifest = fulls[-1]
+    full_end = parse_ts(manifest["end_ts"])
+
+    segments = [s for s in list_segments(backup_dir) if s[1] > full_end]
+    if limit_seconds is not None:
+        segments = [s for s in segments if s[0].time <= limit_seconds]
+    state = read_state(backup_dir)
+    if segments and state is not None and parse_ts(state["chain_start"]) > full_end:
+        # захват oplog начался уже после дампа — операции между ними потеряны
+        raise RuntimeError(f"Между дампом {full_path.name} и сегментами oplog есть пропуск")
+
+    print(f"Восстанавливаю полный дамп {full_path.name}...")
+    command = ["mongorestore", f"--uri={uri}", "--gzip", "--oplogReplay"]
+    if drop:
+        command.append("--drop")
+    subprocess.run([*command, str(full_path)], check=True)
+
+    if not segments:
+        print(f"Восстановлено на {manifest['end_time']}")
+        return
+
+    with tempfile.TemporaryDirectory(dir=backup_dir, prefix=".pitr_") as staging:
+        replayed = 0
+        last = full_end
+        with open(Path(staging) / "oplog.bson", "wb") as out:
+            for _, _, path in segments:
+                for entry in read_oplog_file(path):
+                    ts = entry["ts"]
+                    if ts <= full_end:
+                        continue
+                    if limit_seconds is not None and ts.time > limit_seconds:
+                        break
+                    out.write(entry.raw)
+                    replayed += 1
+                    last = ts
+
+        print(f"Воспроизвожу {replayed} операций oplog...")
+        command = ["mongorestore", f"--uri={uri}", "--oplogReplay"]
+        if limit_seconds is not None:
+            # --oplogLimit исключающий: операции строго раньше limit_seconds + 1
+            command.append(f"--oplogLimit={limit_seconds + 1}:0")
+        subprocess.run([*command, staging], check=True)
+
+    restored_at = datetime.fromtimestamp(last.time, timezone.utc).isoformat()
+    print(f"Восстановлено на {restored_at}")
+
+
+# ---------------- Хранение ----------------
+
+
+def prune(backup_dir: str, keep_fulls: int):
+    """
+    Оставить keep_fulls последних полных дампов; удалить сегменты oplog,
+    целиком предшествующие самому старому из оставшихся дампов.
+    """
+    if keep_fulls < 1:
+        # fulls[:-0] ничего не удаляет, а fulls[-0] — самый старый дамп
+        raise ValueError("keep_fulls должно быть не меньше 1")
+    fulls = list_fulls(backup_dir)
+    if len(fulls) <= keep_fulls:
+        return
+    for path, _ in fulls[:-keep_fulls]:
+        shutil.rmtree(path)
+        print(f"Удалён полный дамп {path.name}")
+
+    oldest_end = parse_ts(fulls[-keep_fulls][1]["end_ts"])
+    for _, last, path in list_segments(backup_dir):
+        if last <= oldest_end:
+            path.unlink()
+            print(f"Удалён сегмент oplog {path.name}")
+
+
+def run(uri: str, backup_dir: str, args):
+    """tail в фоновом потоке, полный дамп и чистка по расписанию."""
+    tailer = OplogTailer(uri, backup_dir, args.segment_seconds, args.segment_entries)
+    thread = threading.Thread(target=tailer.run, name="oplog-tailer", daemon=True)
+    thread.start()
+    try:
+        while thread.is_alive():
+            fulls = list_fulls(backup_dir)
+            last_full = (
+                datetime.fromisoformat(fulls[-1][1]["created_at"]) if fulls else None
+            )
+            if last_full is None or (
+                (datetime.now() - last_full).total_seconds() >= args.full_interval * 3600
+            ):
+                full_backup(uri, backup_dir, args.jobs)
+                prune(backup_dir, args.keep_fulls)
+            thread.join(timeout=60)
+    except KeyboardInterrupt:
+        print("Остановка")
+    finally:
+        tailer.stop()
+        thread.join()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backup-dir", default=BACKUP_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    full_cmd = commands.add_parser("full", help="полный дамп")
+    full_cmd.add_argument("--jobs", type=int, default=4, help="--numParallelCollections")
+
+    for name, help_text in (("tail", "захват oplog"), ("run", "захват oplog + полные дампы")):
+        cmd = commands.add_parser(name, help=help_text)
+        cmd.add_argument("--segment-seconds", type=float, default=300)
+        cmd.add_argument("--segment-entries", type=int, default=100_000)
+        if name == "run":
+            cmd.add_argument("--jobs", type=int, default=4)
+            cmd.add_argument("--full-interval", type=float, default=24, help="часов")
+            cmd.add_argument("--keep-fulls", type=positive_int, default=7)
+
+    restore_cmd = commands.add_parser("restore", help="восстановление на момент времени")
+    restore_cmd.add_argument(
+        "--to", type=datetime.fromisoformat, help="момент (ISO 8601), по умолчанию последний"
+    )
+    restore_cmd.add_argument("--no-drop", action="store_true")
+
+    prune_cmd = commands.add_parser("prune", help="удалить старые копии")
+    prune_cmd.add_argument("--keep-fulls", type=positive_int, default=7)
+
+    args = parser.parse_args()
+    uri = mongo_uri()
+
+    if args.command == "full":
+        full_backup(uri, args.backup_dir, args.jobs)
+    elif args.command == "tail":
+        tailer = OplogTailer(uri, args.backup_dir, args.segment_seconds, args.segment_entries)
+        try:
+            tailer.run()
+        except KeyboardInterrupt:
+            print("Остановка")
+    elif args.command == "run":
+        run(uri, args.backup_dir, args)
+    elif args.command == "restore":
+        restore(uri, args.backup_dir, args.to, drop=not args.no_drop)
+    else:
+        prune(args.backup_dir, args.keep_fulls)
+
+
+if __name__ == "__main__":
+    main()
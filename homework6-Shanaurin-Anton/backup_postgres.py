@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Параллельное резервное копирование PostgreSQL.
+
+В отличие от backup_postgres.sh (pg_dump --format=plain | gzip, один поток
+и восстановление только последовательным psql), здесь:
+
+  - pg_dump --format=directory --jobs N --compress=zstd — таблицы
+    выгружаются параллельно, каждая в свой файл каталога, и каждый
+    воркер сам сжимает свой файл (нужен pg_dump 16+, собранный с zstd;
+    --method gzip или lz4 — для сборок без него);
+  - рядом с каталогом пишется манифест <каталог>.manifest.json: размеры,
+    SHA-256 каждого файла, длительности этапов, версия pg_dump;
+  - восстановление: проверка контрольных сумм и pg_restore --jobs N прямо
+    из каталога. Существующая целевая база пересоздаётся только с флагом
+    --drop, иначе восстановление отказывает.
+
+Несжатая копия дампа нигде не создаётся ни при бэкапе, ни при
+восстановлении: места нужно только под сжатый каталог, данные
+записываются и читаются по одному разу. Каталог дампа пишется под
+временным именем .<имя>.partial и переименовывается, когда готов манифест.
+
+Параметры подключения берутся из тех же переменных окружения, что и в
+backup_postgres.sh (PGHOST, PGPORT, PGUSER, PGPASSWORD, PGDATABASE) —
+их же читают pg_dump и pg_restore.
+
+    python backup_postgres.py backup --jobs 8
+    python backup_postgres.py restore /backups/postgres/pg_mydb_....dump \\
+        --target-db mydb_restore --jobs 8 [--drop]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "/backups/postgres")
+CHUNK_SIZE = 1024 * 1024
+# первая версия pg_dump с --compress=zstd
+MIN_PG_DUMP_VERSION = 16
+
+
+def pg_env() -> dict:
+    env = os.environ.copy()
+    env.setdefault("PGHOST", "localhost")
+    env.setdefault("PGPORT", "5432")
+    env.setdefault("PGUSER", "postgres")
+    env.setdefault("PGDATABASE", "postgres")
+    return env
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tool_version(tool: str) -> str:
+    return subprocess.run(
+        [tool, "--version"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def pg_dump_major() -> int:
+    match = re.search(r"(\d+)(?:\.\d+)?", tool_version("pg_dump"))
+    return int(match.group(1)) if match else 0
+
+
+def file_checksums(dump_dir: Path) -> dict:
+    """{имя файла: SHA-256} для всех файлов каталога дампа."""
+    return {
+        path.name: sha256_file(path)
+        for path in sorted(dump_dir.iterdir())
+        if path.is_file()
+    }
+
+
+def backup(database: str, backup_dir: str, jobs: int, level: int, method: str = "zstd") -> dict:
+    """Снять дамп базы; возвращает манифест (он же записан рядом с каталогом)."""
+    env = pg_env()
+    Path(backup_dir).mkdir(parents=True, exist_ok=True)
+    date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    dump_dir = Path(backup_dir) / f"pg_{database}_{date}.dump"
+    partial = dump_dir.with_name(f".{dump_dir.name}.partial")
+
+    print(f"Начинаю резервное копирование PostgreSQL базы '{database}' ({jobs} потоков)...")
+    started = time.perf_counter()
+    try:
+        subprocess.run(
+            [
+                "pg_dump",
+                "--format=directory",
+                f"--jobs={jobs}",
+                f"--compress={method}:{level}",
+                f"--dbname={database}",
+                f"--file={partial}",
+            ],
+            env=env,
+            check=True,
+        )
+        dump_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        checksums = file_checksums(partial)
+        checksum_seconds = time.perf_counter() - started
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+
+    manifest = {
+        "database": database,
+        "host": env["PGHOST"],
+        "port": int(env["PGPORT"]),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "pg_dump_version": tool_version("pg_dump"),
+        "format": f"directory+{method}",
+        "jobs": jobs,
+        "compress_level": level,
+        "archive": dump_dir.name,
+        "sha256": checksums,
+        "dump_files": len(checksums),
+        "dump_bytes": dir_size(partial),
+        "dump_seconds": round(dump_seconds, 3),
+        "checksum_seconds": round(checksum_seconds, 3),
+    }
+    partial.rename(dump_dir)
+    manifest_path = dump_dir.with_name(dump_dir.name + ".manifest.json")
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    print(
+        f"Бэкап PostgreSQL сохранён: {dump_dir} "
+        f"({manifest['dump_bytes'] / 2**20:.1f} МиБ, дамп {dump_seconds:.1f} с)"
+    )
+    return manifest
+
+
+def load_manifest(archive: Path) -> dict:
+    return json.loads(archive.with_name(archive.name + ".manifest.json").read_text())
+
+
+def database_exists(env: dict, name: str) -> bool:
+    output = subprocess.run(
+        ["psql", "--no-psqlrc", "-At", "--set=ON_ERROR_STOP=1", "--dbname=postgres", "-v", f"name={name}"],
+        input="SELECT 1 FROM pg_database WHERE datname = :'name'",
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return output.strip() == "1"
+
+
+def restore(
+    archive: str,
+    target_db: str,
+    jobs: int,
+    create: bool = True,
+    drop: bool = False,
+    no_privileges: bool = False,
+    env: dict | None = None,
+) -> dict:
+    """
+    Восстановить каталог дампа archive в базу target_db.
+    create        — создать базу; если она уже есть, восстановление
+                    отказывает, пока не передан drop=True (база удаляется);
+    no_privileges — не восстанавливать GRANT/REVOKE (для сервера, где нет
+                    ролей исходного);
+    env           — окружение с PG* для целевого сервера, если он не тот,
+                    с которого снимался дамп.
+    Возвращает длительности этапов.
+    """
+    env = env or pg_env()
+    archive = Path(archive)
+    manifest = load_manifest(archive)
+
+    started = time.perf_counter()
+    if file_checksums(archive) != manifest["sha256"]:
+        raise RuntimeError(f"Контрольные суммы файлов {archive} не совпадают с манифестом")
+    verify_seconds = time.perf_counter() - started
+
+    if create:
+        if database_exists(env, target_db):
+            if not drop:
+                raise RuntimeError(
+                    f"База '{target_db}' уже существует: укажите --drop, чтобы пересоздать её, "
+                    "или --no-create, чтобы восстановить в неё"
+                )
+            subprocess.run(["dropdb", target_db], env=env, check=True)
+        subprocess.run(["createdb", target_db], env=env, check=True)
+
+    print(f"Восстанавливаю {archive.name} в базу '{target_db}' ({jobs} потоков)...")
+    started = time.perf_counter()
+    subprocess.run(
+        [
+            "pg_restore",
+            f"--jobs={jobs}",
+            "--no-owner",
+            "--exit-on-error",
+            *(["--no-privileges"] if no_privileges else []),
+            f"--dbname={target_db}",
+            str(archive),
+        ],
+        env=env,
+        check=True,
+    )
+    restore_seconds = time.perf_counter() - started
+
+    print(f"База '{target_db}' восстановлена за {restore_seconds:.1f} с")
+    return {
+        "verify_seconds": round(verify_seconds, 3),
+        "restore_seconds": round(restore_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backup_cmd = commands.add_parser("backup", help="снять дамп")
+    backup_cmd.add_argument("--db", default=pg_env()["PGDATABASE"])
+    backup_cmd.add_argument("--backup-dir", default=BACKUP_DIR)
+    backup_cmd.add_argument("--jobs", type=int, default=os.cpu_count())
+    backup_cmd.add_argument("--method", choices=("zstd", "lz4", "gzip"), default="zstd")
+    backup_cmd.add_argument("--level", type=int, default=3, help="уровень сжатия")
+
+    restore_cmd = commands.add_parser("restore", help="восстановить из каталога дампа")
+    restore_cmd.add_argument("archive")
+    restore_cmd.add_argument("--target-db", required=True)
+    restore_cmd.add_argument("--jobs", type=int, default=os.cpu_count())
+    restore_cmd.add_argument(
+        "--no-create", action="store_true", help="не создавать целевую базу, она уже есть"
+    )
+    restore_cmd.add_argument(
+        "--drop", action="store_true", help="удалить и пересоздать существующую целевую базу"
+    )
+
+    args = parser.parse_args()
+    for tool in ("pg_dump", "pg_restore", "psql"):
+        if shutil.which(tool) is None:
+            parser.error(f"не найдена утилита {tool}")
+    if args.command == "backup" and pg_dump_major() < MIN_PG_DUMP_VERSION:
+        parser.error(f"нужен pg_dump {MIN_PG_DUMP_VERSION}+ (--compress=zstd)")
+
+    if args.command == "backup":
+        backup(args.db, args.backup_dir, args.jobs, args.level, args.method)
+    else:
+        restore(args.archive, args.target_db, args.jobs, create=not args.no_create, drop=args.drop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Сравнение backup_postgres.sh (plain | gzip) и backup_postgres.py
+(directory --jobs N --compress=zstd) на базе, заполненной pgbench.
+
+pgbench -i -s 300 даёт около 4.5 ГБ данных. Для каждого режима выводится
+время дампа, размер архива и время восстановления (для plain — psql,
+для directory — pg_restore --jobs N).
+
+    python bench_backup_postgres.py --scale 300 --jobs 1 4 8
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from backup_postgres import backup, pg_env, restore
+
+BENCH_DB = "bench_backup"
+
+
+def prepare(scale: int):
+    env = pg_env()
+    subprocess.run(["dropdb", "--if-exists", BENCH_DB], env=env, check=True)
+    subprocess.run(["createdb", BENCH_DB], env=env, check=True)
+    print(f"pgbench -i -s {scale} {BENCH_DB} ...")
+    started = time.perf_counter()
+    subprocess.run(["pgbench", "-i", "-q", "-s", str(scale), BENCH_DB], env=env, check=True)
+    print(f"Заполнение: {time.perf_counter() - started:.0f} с")
+
+
+def bench_plain(backup_dir: Path) -> tuple[float, int, float]:
+    """Текущий способ из backup_postgres.sh и восстановление через psql."""
+    env = pg_env()
+    archive = backup_dir / f"pg_{BENCH_DB}_plain.sql.gz"
+    started = time.perf_counter()
+    with open(archive, "wb") as out:
+        dump = subprocess.Popen(
+            ["pg_dump", "--format=plain", f"--dbname={BENCH_DB}"], env=env, stdout=subprocess.PIPE
+        )
+        gzip = subprocess.Popen(["gzip"], stdin=dump.stdout, stdout=out)
+        dump.stdout.close()
+        if gzip.wait() != 0 or dump.wait() != 0:
+            raise RuntimeError("Ошибка pg_dump | gzip")
+    dump_seconds = time.perf_counter() - started
+
+    target = f"{BENCH_DB}_restore"
+    subprocess.run(["dropdb", "--if-exists", target], env=env, check=True)
+    subprocess.run(["createdb", target], env=env, check=True)
+    started = time.perf_counter()
+    unzip = subprocess.Popen(["gunzip", "-c", str(archive)], stdout=subprocess.PIPE)
+    psql = subprocess.Popen(
+        ["psql", "--quiet", "--set=ON_ERROR_STOP=1", f"--dbname={target}"],
+        env=env,
+        stdin=unzip.stdout,
+        stdout=subprocess.DEVNULL,
+    )
+    unzip.stdout.close()
+    if psql.wait() != 0 or unzip.wait() != 0:
+        raise RuntimeError("Ошибка восстановления через psql")
+    restore_seconds = time.perf_counter() - started
+    return dump_seconds, archive.stat().st_size, restore_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=300, help="масштаб pgbench -i -s")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4, os.cpu_count()])
+    parser.add_argument("--level", type=int, default=3)
+    parser.add_argument("--skip-prepare", action="store_true", help="база уже заполнена")
+    parser.add_argument("--skip-plain", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_prepare:
+        prepare(args.scale)
+
+    with tempfile.TemporaryDirectory(prefix="bench_backup_") as tmp:
+        backup_dir = Path(tmp)
+        rows = []
+        if not args.skip_plain:
+            rows.append(("plain | gzip", *bench_plain(backup_dir)))
+        for jobs in args.jobs:
+            manifest = backup(BENCH_DB, str(backup_dir), jobs, args.level)
+            timings = restore(
+                str(backup_dir / manifest["archive"]), f"{BENCH_DB}_restore", jobs, drop=True
+            )
+            rows.append(
+                (
+                    f"directory -j{jobs} zstd",
+                    manifest["dump_seconds"] + manifest["checksum_seconds"],
+                    manifest["dump_bytes"],
+                    timings["verify_seconds"] + timings["restore_seconds"],
+                )
+            )
+            shutil.rmtree(backup_dir / manifest["archive"])
+
+    print(f"\n{'режим':<26}{'дамп, с':>10}{'размер, МиБ':>14}{'восстановление, с':>20}")
+    for name, dump_seconds, size, restore_seconds in rows:
+        print(f"{name:<26}{dump_seconds:>10.1f}{size / 2**20:>14.1f}{restore_seconds:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Проверка восстановимости бэкапов и замер времени восстановления (RTO).
+
+Последний бэкап PostgreSQL (backup_postgres.py) и MongoDB (backup_mongo.py)
+восстанавливается во временный контейнер Docker (postgres:16 / mongo:7 на
+свободном локальном порту), после чего с источником сравниваются:
+
+  - PostgreSQL: число строк и md5 содержимого каждой таблицы;
+  - MongoDB: число документов и md5 коллекций (команда dbHash).
+
+Источник продолжает работать, поэтому таблицы, изменившиеся после
+снятия бэкапа, тоже попадут в расхождения — проверку лучше запускать
+сразу после бэкапа или против реплики, остановленной на момент дампа.
+
+Результат каждой проверки (размер и время дампа, время восстановления,
+расхождения) дописывается в verify_history.jsonl, --report выводит
+динамику по истории.
+
+    python verify_backups.py                 # обе СУБД
+    python verify_backups.py --only postgres --no-checksum
+    python verify_backups.py --report
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+HISTORY_FILE = "verify_history.jsonl"
+PG_BACKUP_DIR = os.environ.get("PG_BACKUP_DIR", "/backups/postgres")
+MONGO_BACKUP_DIR = os.environ.get("MONGO_BACKUP_DIR", "/backups/mongo")
+STARTUP_TIMEOUT = 60
+
+PG_TABLES = """
+SELECT format('%I.%I', schemaname, tablename)
+FROM pg_tables
+WHERE schemaname NOT IN ('pg_catalog', 'information_schema')
+ORDER BY 1
+"""
+
+
+# ---------------- Временные контейнеры ----------------
+
+
+class Throwaway:
+    """Контейнер, удаляемый при выходе из with; порт публикуется на 127.0.0.1."""
+
+    def __init__(self, image: str, port: int, env: dict | None = None, command=()):
+        self.image = image
+        self.port = port
+        self.env = env or {}
+        self.command = list(command)
+        self.name = f"verify_{uuid.uuid4().hex[:8]}"
+        self.host_port = None
+
+    def __enter__(self):
+        env_args = [arg for key, value in self.env.items() for arg in ("-e", f"{key}={value}")]
+        subprocess.run(
+            [
+                "docker", "run", "-d", "--rm", "--name", self.name,
+                "-p", f"127.0.0.1::{self.port}", *env_args, self.image, *self.command,
+            ],
+            check=True,
+            capture_output=True,
+        )
+        try:
+            mapping = subprocess.run(
+                ["docker", "port", self.name, str(self.port)],
+                check=True, capture_output=True, text=True,
+            ).stdout.splitlines()[0]
+            self.host_port = int(mapping.rsplit(":", 1)[1])
+        except Exception:
+            # __exit__ не вызывается, если __enter__ упал
+            self.__exit__()
+            raise
+        return self
+
+    def wait(self, probe: list[str]):
+        """Ждать, пока команда probe внутри контейнера не завершится успешно."""
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if subprocess.run(["docker", "exec", self.name, *probe], capture_output=True).returncode == 0:
+                return
+            time.sleep(0.5)
+        raise RuntimeError(f"Контейнер {self.image} не поднялся за {STARTUP_TIMEOUT} с")
+
+    def __exit__(self, *exc):
+        subprocess.run(["docker", "rm", "-f", self.name], capture_output=True)
+
+
+# ---------------- PostgreSQL ----------------
+
+
+def latest_pg_archive(backup_dir: str) -> Path:
+    archives = sorted(
+        (p for p in Path(backup_dir).glob("pg_*.dump") if p.is_dir()),
+        key=lambda p: p.stat().st_mtime,
+    )
+    archives = [a for a in archives if a.with_name(a.name + ".manifest.json").exists()]
+    if not archives:
+        raise RuntimeError(f"В {backup_dir} нет бэкапов backup_postgres.py")
+    return archives[-1]
+
+
+def psql(env: dict, database: str, query: str) -> list[str]:
+    output = subprocess.run(
+        ["psql", "--no-psqlrc", "-At", "--set=ON_ERROR_STOP=1", f"--dbname={database}", "-c", query],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return output.splitlines()
+
+
+def pg_fingerprint(env: dict, database: str, checksum: bool) -> dict:
+    """{таблица: "<строк> <md5>"}; md5 не зависит от физического порядка строк."""
+    result = {}
+    for table in psql(env, database, PG_TABLES):
+        if checksum:
+            query = (
+                "SELECT count(*) || ' ' || coalesce(md5(string_agg(h, '' ORDER BY h)), '') "
+                f"FROM (SELECT md5(t::text) AS h FROM {table} t) s"
+            )
+        else:
+            query = f"SELECT count(*) FROM {table}"
+        result[table] = psql(env, database, query)[0]
+    return result
+
+
+def verify_postgres(backup_dir: str, jobs: int, checksum: bool) -> dict:
+    from backup_postgres import load_manifest, pg_env, restore
+
+    archive = latest_pg_archive(backup_dir)
+    manifest = load_manifest(archive)
+    database = manifest["database"]
+    source_env = pg_env()
+
+    password = uuid.uuid4().hex
+    with Throwaway("postgres:16", 5432, env={"POSTGRES_PASSWORD": password}) as container:
+        container.wait(["pg_isready", "-U", "postgres", "-h", "127.0.0.1"])
+        target_env = {
+            **source_env,
+            "PGHOST": "127.0.0.1",
+            "PGPORT": str(container.host_port),
+            "PGUSER": "postgres",
+            "PGPASSWORD": password,
+            "PGDATABASE": "postgres",
+        }
+        started = time.perf_counter()
+        # контейнер одноразовый: база с тем же именем (например, postgres)
+        # пересоздаётся; ролей исходного сервера (limited_user и т. п.) в нём
+        # нет, поэтому GRANT не восстанавливаются — данные сверяются и без них
+        restore(str(archive), database, jobs, drop=True, no_privileges=True, env=target_env)
+        restore_seconds = time.perf_counter() - started
+
+        restored = pg_fingerprint(target_env, database, checksum)
+    source = pg_fingerprint(source_env, database, checksum)
+
+    return {
+        "engine": "postgres",
+        "backup": archive.name,
+        "dump_bytes": manifest["dump_bytes"],
+        "dump_seconds": manifest["dump_seconds"] + manifest["checksum_seconds"],
+        "restore_seconds": round(restore_seconds, 3),
+        "objects": len(source),
+        "mismatches": diff(source, restored),
+    }
+
+
+# ---------------- MongoDB ----------------
+
+
+def mongo_fingerprint(uri: str, checksum: bool) -> dict:
+    """{"<db>.<коллекция>": "<документов> <md5>"} по всем пользовательским базам."""
+    from pymongo import MongoClient
+
+    client = MongoClient(uri)
+    result = {}
+    for name in client.list_database_names():
+        if name in ("admin", "config", "local"):
+            continue
+        db = client[name]
+        hashes = db.command("dbHash")["collections"] if checksum else {}
+        for collection in db.list_collection_names():
+            if collection.startswith("system."):
+                continue
+            count = db[collection].count_documents({})
+            result[f"{name}.{collection}"] = f"{count} {hashes.get(collection, '')}".strip()
+    return result
+
+
+def verify_mongo(backup_dir: str, checksum: bool) -> dict:
+    from backup_mongo import list_fulls, list_segments, mongo_uri, restore
+
+    fulls = list_fulls(backup_dir)
+    if not fulls:
+        raise RuntimeError(f"В {backup_dir} нет полных дампов backup_mongo.py")
+    full_path, manifest = fulls[-1]
+    segments_bytes = sum(path.stat().st_size for _, _, path in list_segments(backup_dir))
+
+    with Throwaway("mongo:7", 27017) as container:
+        container.wait(["mongosh", "--quiet", "--eval", "db.runCommand({ping: 1}).ok"])
+        target_uri = f"mongodb://127.0.0.1:{container.host_port}/"
+        started = time.perf_counter()
+        restore(target_uri, backup_dir)
+        restore_seconds = time.perf_counter() - started
+
+        restored = mongo_fingerprint(target_uri, checksum)
+    source = mongo_fingerprint(mongo_uri(), checksum)
+
+    return {
+        "engine": "mongo",
+        "backup": full_path.name,
+        "dump_bytes": manifest["bytes"],
+        "oplog_bytes": segments_bytes,
+        "dump_seconds": manifest["seconds"],
+        "restore_seconds": round(restore_seconds, 3),
+        "objects": len(source),
+        "mismatches": diff(source, restored),
+    }
+
+
+# ---------------- Отчёт ----------------
+
+
+def diff(source: dict, restored: dict) -> dict:
+    """Объекты, у которых число записей или контрольная сумма не совпали."""
+    return {
+        name: {"source": source.get(name), "restored": restored.get(name)}
+        for name in sorted(source.keys() | restored.keys())
+        if source.get(name) != restored.get(name)
+    }
+
+
+def record(history: Path, result: dict):
+    result = {"checked_at": datetime.now().isoformat(timespec="seconds"), **result}
+    with open(history, "a") as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def print_result(result: dict):
+    status = "OK" if not result["mismatches"] else f"{len(result['mismatches'])} расхождений"
+    print(
+        f"[{result['engine']}] {result['backup']}: {status}; "
+        f"объектов {result['objects']}, дамп {result['dump_bytes'] / 2**20:.1f} МиБ "
+        f"за {result['dump_seconds']:.1f} с, восстановление {result['restore_seconds']:.1f} с"
+    )
+    for name, values in result["mismatches"].items():
+        print(f"    {name}: источник {values['source']!r}, копия {values['restored']!r}")
+
+
+def report(history: Path, last: int):
+    if not history.exists():
+        print(f"История пуста: {history}")
+        return
+    rows = [json.loads(line) for line in history.read_text().splitlines() if line.strip()]
+    print(
+        f"{'дата':<21}{'СУБД':<10}{'дамп, МиБ':>11}{'дамп, с':>10}"
+        f"{'восст., с':>11}{'расхожд.':>10}"
+    )
+    for row in rows[-last:]:
+        print(
+            f"{row['checked_at']:<21}{row['engine']:<10}{row['dump_bytes'] / 2**20:>11.1f}"
+            f"{row['dump_seconds']:>10.1f}{row['restore_seconds']:>11.1f}"
+            f"{len(row['mismatches']):>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", choices=["postgres", "mongo"])
+    parser.add_argument("--pg-backup-dir", default=PG_BACKUP_DIR)
+    parser.add_argument("--mongo-backup-dir", default=MONGO_BACKUP_DIR)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="pg_restore --jobs")
+    parser.add_argument("--no-checksum", action="store_true", help="сравнивать только количество")
+    parser.add_argument("--history", type=Path, default=Path(HISTORY_FILE))
+    parser.add_argument("--report", action="store_true", help="показать историю проверок")
+    parser.add_argument("--last", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.report:
+        report(args.history, args.last)
+        return
+
+    checksum = not args.no_checksum
+    results = []
+    if args.only in (None, "postgres"):
+        results.append(verify_postgres(args.pg_backup_dir, args.jobs, checksum))
+    if args.only in (None, "mongo"):
+        results.append(verify_mongo(args.mongo_backup_dir, checksum))
+
+    for result in results:
+        record(args.history, result)
+        print_result(result)
+    if any(result["mismatches"] for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
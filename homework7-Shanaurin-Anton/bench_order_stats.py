@@ -0,0 +1,119 @@
+"""
+Агрегаты заказов на триггерах: выигрыш на чтении и цена на записи.
+
+Чтение: сумма покупок пользователя соединением orders × products
+(SELECT_USER_SPEND_JOIN) против одной строки user_order_stats.
+Запись: вставка заказов по одному и пакетом (execute_values) без
+триггеров и с триггерами CREATE_USER_ORDER_STATS (списание склада +
+агрегаты). Данные загружаются через datagen.py до установки триггеров,
+агрегаты заполняются при установке (REBUILD_USER_ORDER_STATS).
+
+    python bench_order_stats.py --users 100000 --orders 2000000
+"""
+
+import argparse
+import random
+import time
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from bench_queries import measure
+from datagen import load_dataset
+from models import (
+    CREATE_ORDERS_TABLE,
+    CREATE_PRODUCTS_TABLE,
+    CREATE_USER_ORDER_STATS,
+    CREATE_USERS_TABLE,
+    INSERT_ORDER,
+    SELECT_USER_ORDER_STATS,
+    SELECT_USER_SPEND_JOIN,
+)
+
+SCHEMA = 'bench_order_stats'
+
+
+def insert_rates(conn, cur, rows, batch):
+    """Строк/с при вставке по одному и пакетами; изменения откатываются"""
+    started = time.perf_counter()
+    for row in rows:
+        cur.execute(INSERT_ORDER, row)
+    single = len(rows) / (time.perf_counter() - started)
+    conn.rollback()
+
+    started = time.perf_counter()
+    for i in range(0, len(rows), batch):
+        execute_values(
+            cur, "INSERT INTO orders (user_id, product_id, quantity) VALUES %s",
+            rows[i:i + batch], page_size=batch
+        )
+    batched = len(rows) / (time.perf_counter() - started)
+    conn.rollback()
+    return single, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default='host=localhost port=5436 dbname=testdb user=testuser password=testpass')
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--inserts', type=int, default=10_000)
+    parser.add_argument('--batch', type=int, default=1000, help='строк в пакетной вставке')
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    for ddl in (CREATE_USERS_TABLE, CREATE_PRODUCTS_TABLE, CREATE_ORDERS_TABLE):
+        cur.execute(ddl)
+    load_dataset(cur, args.users, args.products, args.orders)
+    # склада должно хватить на все вставки бенчмарка
+    cur.execute("UPDATE products SET stock = 1000000000")
+    conn.commit()
+
+    rnd = random.Random(1)
+    user_ids = [(rnd.randint(1, args.users),) for _ in range(args.calls)]
+    rows = [
+        (rnd.randint(1, args.users), rnd.randint(1, args.products), rnd.randint(1, 5))
+        for _ in range(args.inserts)
+    ]
+
+    plain_single, plain_batched = insert_rates(conn, cur, rows, args.batch)
+
+    started = time.perf_counter()
+    cur.execute(CREATE_USER_ORDER_STATS)  # включает REBUILD_USER_ORDER_STATS
+    cur.execute("ANALYZE orders, user_order_stats")
+    conn.commit()
+    rebuild_seconds = time.perf_counter() - started
+
+    stats_single, stats_batched = insert_rates(conn, cur, rows, args.batch)
+
+    def read(sql):
+        def call(params):
+            cur.execute(sql, params)
+            cur.fetchall()
+        return call
+
+    join_p50, join_p99 = measure(read(SELECT_USER_SPEND_JOIN), user_ids)
+    stats_p50, stats_p99 = measure(read(SELECT_USER_ORDER_STATS), user_ids)
+    conn.rollback()
+
+    print(f"заказов: {args.orders:,}, пересчёт агрегатов: {rebuild_seconds:.2f} с\n")
+    print(f"{'чтение суммы покупок':<28}{'p50, мкс':>10}{'p99, мкс':>10}")
+    print(f"{'JOIN orders × products':<28}{join_p50:>10.0f}{join_p99:>10.0f}")
+    print(f"{'user_order_stats':<28}{stats_p50:>10.0f}{stats_p99:>10.0f}")
+    print(f"\n{'вставка заказов, строк/с':<28}{'по одному':>12}{'пакетом ' + str(args.batch):>14}")
+    print(f"{'без триггеров':<28}{plain_single:>12,.0f}{plain_batched:>14,.0f}")
+    print(f"{'с триггерами':<28}{stats_single:>12,.0f}{stats_batched:>14,.0f}")
+
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Задержка горячих CRUD-запросов: обычный cursor.execute против
+подготовленных операторов (queries.PreparedQueries) и пакетные вставки.
+
+Данные загружаются через datagen.py в отдельную схему, после бенчмарка
+схема удаляется.
+
+    python bench_queries.py --calls 5000 --users 100000 --orders 500000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import psycopg2
+
+from datagen import load_dataset
+from models import (
+    CREATE_ORDERS_TABLE,
+    CREATE_PRODUCTS_TABLE,
+    CREATE_USERS_TABLE,
+    INSERT_ORDER,
+    SELECT_ORDERS_BY_USER,
+    SELECT_PRODUCT_BY_ID,
+    SELECT_USER_BY_ID,
+    UPDATE_USER,
+)
+from queries import PreparedQueries
+
+SCHEMA = 'bench_queries'
+
+
+def measure(func, params_list):
+    """p50 и p99 одного вызова в микросекундах"""
+    timings = []
+    for params in params_list:
+        started = time.perf_counter()
+        func(params)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[min(int(len(timings) * 0.99), len(timings) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default='host=localhost port=5436 dbname=testdb user=testuser password=testpass')
+    parser.add_argument('--calls', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=10_000, help='строк в пакетной вставке')
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--orders', type=int, default=500_000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    for ddl in (CREATE_USERS_TABLE, CREATE_PRODUCTS_TABLE, CREATE_ORDERS_TABLE):
+        cur.execute(ddl)
+    load_dataset(cur, args.users, args.products, args.orders)
+    conn.commit()
+
+    rnd = random.Random(1)
+    user_ids = [(rnd.randint(1, args.users),) for _ in range(args.calls)]
+    product_ids = [(rnd.randint(1, args.products),) for _ in range(args.calls)]
+    updates = [(f"bench_{i}", f"bench_{i}@example.com", 30, uid) for i, (uid,) in enumerate(user_ids)]
+    queries = PreparedQueries(conn)
+    # PREPARE выполняется один раз на соединение — в замеры он не входит
+    queries.prepare('select_user_by_id', 'select_product_by_id', 'select_orders_by_user',
+                    'update_user', 'insert_order')
+
+    cases = [
+        ('select_user_by_id', SELECT_USER_BY_ID, user_ids),
+        ('select_product_by_id', SELECT_PRODUCT_BY_ID, product_ids),
+        ('select_orders_by_user', SELECT_ORDERS_BY_USER, user_ids),
+        ('update_user', UPDATE_USER, updates),
+    ]
+    print(f"{'запрос':<24}{'execute p50':>13}{'p99':>9}{'prepared p50':>14}{'p99':>9}  мкс")
+    for name, sql, params_list in cases:
+        def plain(params):
+            cur.execute(sql, params)
+            if cur.description:
+                cur.fetchall()
+
+        def prepared(params):
+            queries.execute(cur, name, params)
+            if cur.description:
+                cur.fetchall()
+
+        plain_p50, plain_p99 = measure(plain, params_list)
+        prep_p50, prep_p99 = measure(prepared, params_list)
+        conn.rollback()
+        print(f"{name:<24}{plain_p50:>13.0f}{plain_p99:>9.0f}{prep_p50:>14.0f}{prep_p99:>9.0f}")
+
+    rows = [(rnd.randint(1, args.users), rnd.randint(1, args.products), 1) for _ in range(args.batch)]
+    batch_cases = [
+        ('execute в цикле', lambda: [cur.execute(INSERT_ORDER, row) for row in rows]),
+        ('PREPARE + execute_batch', lambda: queries.execute_batch('insert_order', rows)),
+        ('execute_values', lambda: queries.insert_values('orders', rows)),
+    ]
+    print(f"\n{'вставка ' + str(args.batch) + ' заказов':<28}{'строк/с':>12}")
+    for label, func in batch_cases:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        conn.rollback()
+        print(f"{label:<28}{len(rows) / elapsed:>12,.0f}")
+
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
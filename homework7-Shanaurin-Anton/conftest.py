@@ -1,5 +1,8 @@
 """Конфигурация pytest и фикстуры"""
 
+import hashlib
+import os
+
 import pytest
 import psycopg2
 from faker import Faker
@@ -7,12 +10,12 @@ from models import (
     CREATE_USERS_TABLE, 
     CREATE_PRODUCTS_TABLE, 
     CREATE_ORDERS_TABLE,
-    DROP_TABLES
 )
 
 fake = Faker('ru_RU')
 
-# Конфигурация подключения к БД
+# Конфигурация подключения к БД. Сама testdb используется только как
+# служебная: тесты работают в отдельной базе на каждый воркер xdist
 DB_CONFIG = {
     'host': 'localhost',
     'port': 5436,
@@ -21,35 +24,227 @@ DB_CONFIG = {
     'password': 'testpass'
 }
 
+SCHEMA_DDL = [CREATE_USERS_TABLE, CREATE_PRODUCTS_TABLE, CREATE_ORDERS_TABLE]
+TEMPLATE_DB = f"{DB_CONFIG['database']}_template"
+# Ключ pg_advisory_lock, под которым воркеры создают шаблон и клонируют его
+TEMPLATE_LOCK_KEY = 5436_0001
 
-@pytest.fixture(scope='session')
-def db_connection():
-    """Создание соединения с БД на уровне сессии"""
+
+def _admin_connection():
     conn = psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = True  # CREATE/DROP DATABASE нельзя выполнять в транзакции
+    return conn
+
+
+def _ensure_template(cur):
+    """
+    Создать шаблонную базу со схемой models.py, если её нет или DDL
+    изменился (хеш DDL хранится в комментарии к базе).
+    """
+    ddl_hash = hashlib.md5("".join(SCHEMA_DDL).encode()).hexdigest()
+    cur.execute(
+        "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = %s",
+        (TEMPLATE_DB,)
+    )
+    row = cur.fetchone()
+    if row is not None and row[0] == ddl_hash:
+        return
+
+    cur.execute(f"DROP DATABASE IF EXISTS {TEMPLATE_DB}")
+    cur.execute(f"CREATE DATABASE {TEMPLATE_DB}")
+    conn = psycopg2.connect(**{**DB_CONFIG, 'database': TEMPLATE_DB})
+    with conn, conn.cursor() as template_cur:
+        for ddl in SCHEMA_DDL:
+            template_cur.execute(ddl)
+    conn.close()
+    cur.execute(f"COMMENT ON DATABASE {TEMPLATE_DB} IS %s", (ddl_hash,))
+
+
+@pytest.fixture(scope='session')
+def worker_db():
+    """
+    Отдельная база на воркер pytest-xdist (testdb_gw0, testdb_gw1, ...;
+    без xdist — testdb_master), клонированная из шаблона со схемой.
+    CREATE DATABASE ... TEMPLATE копирует файлы базы и быстрее, чем DDL,
+    а воркеры не мешают друг другу. База удаляется в конце сессии.
+    """
+    worker = os.environ.get('PYTEST_XDIST_WORKER', 'master')
+    name = f"{DB_CONFIG['database']}_{worker}"
+
+    admin = _admin_connection()
+    cur = admin.cursor()
+    # клонирование требует, чтобы к шаблону никто не был подключён,
+    # поэтому создание шаблона и клоны идут по очереди
+    cur.execute("SELECT pg_advisory_lock(%s)", (TEMPLATE_LOCK_KEY,))
+    try:
+        _ensure_template(cur)
+        cur.execute(f"DROP DATABASE IF EXISTS {name}")
+        cur.execute(f"CREATE DATABASE {name} TEMPLATE {TEMPLATE_DB}")
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (TEMPLATE_LOCK_KEY,))
+
+    yield {**DB_CONFIG, 'database': name}
+
+    cur.execute(f"DROP DATABASE IF EXISTS {name}")
+    cur.close()
+    admin.close()
+
+
+@pytest.fixture(scope='session')
+def db_connection(worker_db):
+    """Одно соединение с базой воркера на всю сессию"""
+    conn = psycopg2.connect(**worker_db)
     conn.autocommit = False
     yield conn
+    conn.rollback()
     conn.close()
 
 
+@pytest.fixture(scope='session')
+def db_pool(worker_db):
+    """
+    Пул соединений к базе воркера для тестов с несколькими потоками.
+    Соединения пула не видят незакоммиченных данных db_connection.
+    """
+    from pool import ConnectionPool
+
+    pool = ConnectionPool(1, 8, **worker_db, acquire_timeout=10)
+    yield pool
+    pool.closeall()
+
+
 @pytest.fixture(scope='function')
-def db_cursor(db_connection):
-    """Курсор с откатом изменений после каждого теста"""
+def db_transaction(db_connection):
+    """
+    Изоляция теста точкой сохранения: всё, что тест изменил,
+    откатывается ROLLBACK TO SAVEPOINT, схема и общие данные сессии
+    остаются. Откат работает и после ошибки внутри теста.
+    """
     cursor = db_connection.cursor()
-    
-    # Создание таблиц перед тестом
-    cursor.execute(DROP_TABLES)
-    cursor.execute(CREATE_USERS_TABLE)
-    cursor.execute(CREATE_PRODUCTS_TABLE)
-    cursor.execute(CREATE_ORDERS_TABLE)
+    cursor.execute("SAVEPOINT test_case")
+    yield db_connection
+    try:
+        cursor.execute("ROLLBACK TO SAVEPOINT test_case")
+        cursor.execute("RELEASE SAVEPOINT test_case")
+    except psycopg2.Error:
+        # тест сам сделал commit или rollback — точки сохранения больше нет
+        db_connection.rollback()
+        raise RuntimeError(
+            "Тест завершил транзакцию сам (commit/rollback): "
+            "изоляция через SAVEPOINT не сработала"
+        )
+    finally:
+        cursor.close()
+
+
+@pytest.fixture(scope='function')
+def db_cursor(db_transaction):
+    """Курсор для тестов таблиц models.py; изменения откатываются после теста"""
+    cursor = db_transaction.cursor()
+    yield cursor
+    cursor.close()
+
+
+# ---------------- Большие объёмы данных ----------------
+
+BULK_SCHEMA = 'bulk'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bulk', 'объём данных для bulk_cursor')
+    group.addoption('--bulk-users', type=int, default=10_000)
+    group.addoption('--bulk-products', type=int, default=1_000)
+    group.addoption('--bulk-orders', type=int, default=50_000)
+
+    group = parser.getgroup('perf', 'тесты производительности запросов')
+    group.addoption('--perf', action='store_true', help='запускать тесты с меткой perf')
+    group.addoption(
+        '--update-baseline', action='store_true',
+        help='перезаписать perf_baseline.json текущими замерами'
+    )
+    group.addoption(
+        '--perf-threshold', type=float, default=0.5,
+        help='допустимый рост задержки относительно базовой линии (0.5 = +50%%)'
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'perf: тест производительности, запускается с --perf')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--perf'):
+        return
+    skip = pytest.mark.skip(reason='тест производительности: запустите с --perf')
+    for item in items:
+        if 'perf' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope='session')
+def bulk_dataset(request, db_connection):
+    """
+    Таблицы models.py в схеме bulk, заполненные через COPY (datagen.py).
+    Загружаются один раз за сессию; размеры задаются опциями --bulk-*.
+    Возвращает размеры и время загрузки каждой таблицы.
+    """
+    from datagen import load_dataset
+
+    sizes = {
+        'users': request.config.getoption('--bulk-users'),
+        'products': request.config.getoption('--bulk-products'),
+        'orders': request.config.getoption('--bulk-orders'),
+    }
+    cursor = db_connection.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {BULK_SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {BULK_SCHEMA}")
+    cursor.execute(f"SET LOCAL search_path TO {BULK_SCHEMA}")
+    for ddl in SCHEMA_DDL:
+        cursor.execute(ddl)
+    timings = load_dataset(cursor, **sizes)
+    db_connection.commit()
+    cursor.close()
+
+    yield {'sizes': sizes, 'timings': timings}
+
+    cursor = db_connection.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {BULK_SCHEMA} CASCADE")
     db_connection.commit()
-    
+    cursor.close()
+
+
+@pytest.fixture(scope='function')
+def bulk_cursor(bulk_dataset, db_transaction):
+    """
+    Курсор, видящий таблицы схемы bulk под обычными именами users,
+    products, orders. SET LOCAL отменяется вместе с откатом к SAVEPOINT.
+    """
+    cursor = db_transaction.cursor()
+    cursor.execute(f"SET LOCAL search_path TO {BULK_SCHEMA}")
     yield cursor
-    
-    # Откат всех изменений после теста
-    db_connection.rollback()
     cursor.close()
 
 
+# ---------------- Время выполнения ----------------
+
+_phase_durations = {'setup': 0.0, 'call': 0.0, 'teardown': 0.0}
+
+
+def pytest_runtest_logreport(report):
+    _phase_durations[report.when] += report.duration
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Суммарное время фаз: подготовка фикстур против самих тестов"""
+    total = sum(_phase_durations.values())
+    terminalreporter.write_sep('-', 'время выполнения')
+    terminalreporter.write_line(
+        f"всего {total:.2f} с: фикстуры (setup) {_phase_durations['setup']:.2f} с, "
+        f"тесты (call) {_phase_durations['call']:.2f} с, "
+        f"teardown {_phase_durations['teardown']:.2f} с"
+    )
+
+
 @pytest.fixture
 def fake_user():
     """Генерация данных для пользователя"""
@@ -107,7 +302,6 @@ def inserted_user(db_cursor, fake_user):
         (fake_user['username'], fake_user['email'], fake_user['age'])
     )
     user_id = db_cursor.fetchone()[0]
-    db_cursor.connection.commit()
     return {'id': user_id, **fake_user}
 
 
@@ -121,5 +315,4 @@ def inserted_product(db_cursor, fake_product):
          fake_product['stock'], fake_product['description'])
     )
     product_id = db_cursor.fetchone()[0]
-    db_cursor.connection.commit()
     return {'id': product_id, **fake_product}
@@ -0,0 +1,171 @@
+"""Генерация больших объёмов тестовых данных и загрузка через COPY"""
+
+import io
+import random
+import time
+
+from faker import Faker
+
+# Сколько значений каждого вида заранее генерирует Faker. Строки собираются
+# из пулов случайным выбором, а уникальность обеспечивает номер строки,
+# поэтому стоимость Faker не растёт с числом строк
+POOL_SIZE = 2000
+
+
+class FakerPool:
+    """Кеш значений Faker: вызов провайдера дорогой, выбор из списка — нет"""
+
+    def __init__(self, locale='ru_RU', size=POOL_SIZE, seed=42):
+        fake = Faker(locale)
+        fake.seed_instance(seed)
+        self.user_names = [fake.user_name() for _ in range(size)]
+        self.domains = [fake.free_email_domain() for _ in range(50)]
+        self.phrases = [fake.catch_phrase() for _ in range(size)]
+        self.texts = [fake.text(max_nb_chars=200) for _ in range(size)]
+
+
+def users_rows(n, pool, seed=42):
+    """(username, email, age); username и email уникальны за счёт номера"""
+    rnd = random.Random(seed)
+    for i in range(n):
+        name = rnd.choice(pool.user_names)
+        yield (
+            f"{name}_{i}"[:50],
+            f"{name}.{i}@{rnd.choice(pool.domains)}"[:100],
+            rnd.randint(18, 80),
+        )
+
+
+def products_rows(n, pool, seed=43):
+    """(name, price, stock, description)"""
+    rnd = random.Random(seed)
+    for i in range(n):
+        yield (
+            f"{rnd.choice(pool.phrases)} #{i}"[:100],
+            f"{rnd.uniform(10.0, 1000.0):.2f}",
+            rnd.randint(0, 100),
+            rnd.choice(pool.texts),
+        )
+
+
+def orders_rows(n, user_ids, product_ids, seed=44):
+    """(user_id, product_id, quantity); id берутся из диапазонов (min, max)"""
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield (
+            rnd.randint(*user_ids),
+            rnd.randint(*product_ids),
+            rnd.randint(1, 5),
+        )
+
+
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def to_copy_line(row):
+    """Строка в текстовом формате COPY: поля через TAB, NULL — \\N"""
+    return '\t'.join(
+        '\\N' if value is None else str(value).translate(_ESCAPES) for value in row
+    ) + '\n'
+
+
+class RowsFile(io.TextIOBase):
+    """
+    Файлоподобный объект поверх генератора строк: copy_expert читает его
+    кусками, поэтому в памяти не держится весь набор данных.
+    """
+
+    def __init__(self, rows):
+        self._lines = map(to_copy_line, rows)
+        self._buffer = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return self._buffer + ''.join(self._lines)
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            parts.append(line)
+            length += len(line)
+        data = ''.join(parts)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def copy_rows(cursor, table, columns, rows, buffer_size=1 << 20):
+    """Загрузка строк в таблицу одной командой COPY ... FROM STDIN"""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    cursor.copy_expert(sql, RowsFile(rows), size=buffer_size)
+
+
+def id_range(cursor, table):
+    cursor.execute(f"SELECT min(id), max(id) FROM {table}")
+    return cursor.fetchone()
+
+
+def load_dataset(cursor, users, products, orders, pool=None, seed=42):
+    """
+    Загрузить users/products/orders (таблицы из models.py, по search_path).
+    Возвращает время загрузки каждой таблицы в секундах.
+    """
+    pool = pool or FakerPool(seed=seed)
+    timings = {}
+
+    started = time.perf_counter()
+    copy_rows(cursor, 'users', ('username', 'email', 'age'), users_rows(users, pool, seed))
+    timings['users'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    copy_rows(
+        cursor, 'products', ('name', 'price', 'stock', 'description'),
+        products_rows(products, pool, seed + 1)
+    )
+    timings['products'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if orders:
+        copy_rows(
+            cursor, 'orders', ('user_id', 'product_id', 'quantity'),
+            orders_rows(orders, id_range(cursor, 'users'), id_range(cursor, 'products'), seed + 2)
+        )
+    timings['orders'] = time.perf_counter() - started
+
+    cursor.execute("ANALYZE users, products, orders")
+    return timings
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import psycopg2
+
+    from models import CREATE_ORDERS_TABLE, CREATE_PRODUCTS_TABLE, CREATE_USERS_TABLE
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dsn', default='host=localhost port=5436 dbname=testdb user=testuser password=testpass')
+    parser.add_argument('--schema', default='bulk')
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--orders', type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    with conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+        cur.execute(f"CREATE SCHEMA {args.schema}")
+        cur.execute(f"SET search_path TO {args.schema}")
+        for ddl in (CREATE_USERS_TABLE, CREATE_PRODUCTS_TABLE, CREATE_ORDERS_TABLE):
+            cur.execute(ddl)
+        timings = load_dataset(cur, args.users, args.products, args.orders)
+    conn.close()
+
+    for table, seconds in timings.items():
+        count = getattr(args, table)
+        rate = count / seconds if seconds else 0
+        print(f"{table:<10}{count:>12,} строк  {seconds:>8.1f} с  {rate:>12,.0f} строк/с")
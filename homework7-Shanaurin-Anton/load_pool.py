@@ -0,0 +1,132 @@
+"""
+Нагрузочный тест INSERT_ORDER / SELECT_ORDERS_BY_USER из 1–64 потоков:
+новое соединение на каждую операцию против пула (pool.ConnectionPool).
+
+Каждый поток --seconds секунд выполняет операции в отдельных
+транзакциях (вставка заказа или выборка заказов пользователя, доля
+вставок — --write-ratio). Выводится число операций в секунду и
+время ожидания соединения из пула.
+
+    python load_pool.py --threads 1 4 16 64 --pool-size 16
+"""
+
+import argparse
+import random
+import threading
+import time
+
+import psycopg2
+
+from datagen import load_dataset
+from models import (
+    CREATE_ORDERS_TABLE,
+    CREATE_PRODUCTS_TABLE,
+    CREATE_USERS_TABLE,
+    INSERT_ORDER,
+    SELECT_ORDERS_BY_USER,
+)
+from pool import ConnectionPool, PoolTimeout
+
+SCHEMA = 'load_pool'
+
+
+def prepare(dsn, users, products, orders):
+    conn = psycopg2.connect(dsn)
+    with conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"SET LOCAL search_path TO {SCHEMA}")
+        for ddl in (CREATE_USERS_TABLE, CREATE_PRODUCTS_TABLE, CREATE_ORDERS_TABLE):
+            cur.execute(ddl)
+        load_dataset(cur, users, products, orders)
+    conn.close()
+
+
+def operation(conn, rnd, args):
+    with conn.cursor() as cur:
+        if rnd.random() < args.write_ratio:
+            cur.execute(
+                INSERT_ORDER,
+                (rnd.randint(1, args.users), rnd.randint(1, args.products), rnd.randint(1, 5)),
+            )
+        else:
+            cur.execute(SELECT_ORDERS_BY_USER, (rnd.randint(1, args.users),))
+        cur.fetchall()
+    conn.commit()
+
+
+def run(n_threads, args, pool=None):
+    """Возвращает (операций/с, ошибок)"""
+    stop_at = time.monotonic() + args.seconds
+    done = [0] * n_threads
+    errors = [0] * n_threads
+
+    def worker(index):
+        rnd = random.Random(index)
+        while time.monotonic() < stop_at:
+            try:
+                if pool is None:
+                    conn = psycopg2.connect(args.dsn, options=f"-c search_path={SCHEMA}")
+                    try:
+                        operation(conn, rnd, args)
+                    finally:
+                        conn.close()
+                else:
+                    with pool.connection() as conn:
+                        operation(conn, rnd, args)
+                done[index] += 1
+            except (psycopg2.Error, PoolTimeout):
+                errors[index] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(done) / (time.monotonic() - started), sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default='host=localhost port=5436 dbname=testdb user=testuser password=testpass')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--pool-size', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--products', type=int, default=1_000)
+    parser.add_argument('--orders', type=int, default=100_000)
+    args = parser.parse_args()
+
+    prepare(args.dsn, args.users, args.products, args.orders)
+
+    print(
+        f"{'потоков':>8}{'без пула, оп/с':>17}{'с пулом, оп/с':>16}"
+        f"{'ожидание p50, мс':>19}{'p99, мс':>10}{'ошибок':>8}"
+    )
+    for n_threads in args.threads:
+        plain_rate, plain_errors = run(n_threads, args)
+        # соединения открываются заранее, чтобы замер не включал подключение
+        pool = ConnectionPool(
+            args.pool_size, args.pool_size, args.dsn,
+            options=f"-c search_path={SCHEMA}",
+            acquire_timeout=args.seconds,
+        )
+        pool_rate, pool_errors = run(n_threads, args, pool)
+        stats = pool.stats.snapshot()
+        pool.closeall()
+        print(
+            f"{n_threads:>8}{plain_rate:>17,.0f}{pool_rate:>16,.0f}"
+            f"{stats['p50_wait_ms']:>19.2f}{stats['p99_wait_ms']:>10.2f}"
+            f"{plain_errors + pool_errors:>8}"
+        )
+
+    conn = psycopg2.connect(args.dsn)
+    with conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -28,6 +28,7 @@ CREATE TABLE IF NOT EXISTS orders (
     quantity INTEGER CHECK (quantity > 0),
     order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders (user_id);
 """
 
 DROP_TABLES = """
@@ -55,3 +56,154 @@ INSERT_ORDER = "INSERT INTO orders (user_id, product_id, quantity) VALUES (%s, %
 SELECT_ORDER_BY_ID = "SELECT * FROM orders WHERE id = %s;"
 SELECT_ORDERS_BY_USER = "SELECT * FROM orders WHERE user_id = %s;"
 DELETE_ORDER = "DELETE FROM orders WHERE id = %s;"
+
+# Пересчёт агрегатов целиком: после загрузки через COPY без триггеров
+# или как отложенная пакетная задача вместо триггеров orders_stats_*
+REBUILD_USER_ORDER_STATS = """
+UPDATE orders o SET unit_price = p.price
+FROM products p WHERE p.id = o.product_id AND o.unit_price IS NULL;
+TRUNCATE user_order_stats;
+INSERT INTO user_order_stats (user_id, orders_count, total_quantity, total_spent)
+SELECT user_id, count(*), sum(quantity), sum(quantity * coalesce(unit_price, 0))
+FROM orders WHERE user_id IS NOT NULL
+GROUP BY user_id;
+"""
+
+# Агрегаты заказов по пользователю, которые поддерживаются триггерами.
+# Ставится поверх таблиц выше: цена фиксируется в orders.unit_price в момент
+# заказа, склад уменьшается в том же INSERT (UPDATE товара или количества
+# пересчитывает склад и цену, DELETE возвращает товар), а user_order_stats
+# обновляется триггерами уровня оператора (одна агрегирующая вставка на
+# INSERT/COPY, а не на каждую строку). Уже существующие заказы учитываются
+# пересчётом REBUILD_USER_ORDER_STATS в конце установки
+CREATE_USER_ORDER_STATS = """
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS unit_price DECIMAL(10, 2);
+
+CREATE TABLE IF NOT EXISTS user_order_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    orders_count INTEGER NOT NULL DEFAULT 0,
+    total_quantity BIGINT NOT NULL DEFAULT 0,
+    total_spent DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION orders_reserve_stock() RETURNS trigger AS $$
+BEGIN
+    UPDATE products SET stock = stock - NEW.quantity
+    WHERE id = NEW.product_id AND stock >= NEW.quantity
+    RETURNING price INTO NEW.unit_price;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Недостаточно товара % на складе', NEW.product_id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION orders_adjust_stock() RETURNS trigger AS $$
+BEGIN
+    IF NEW.product_id IS DISTINCT FROM OLD.product_id THEN
+        -- другой товар: вернуть прежний и зарезервировать новый по его цене
+        UPDATE products SET stock = stock + OLD.quantity WHERE id = OLD.product_id;
+        UPDATE products SET stock = stock - NEW.quantity
+        WHERE id = NEW.product_id AND stock >= NEW.quantity
+        RETURNING price INTO NEW.unit_price;
+    ELSIF NEW.quantity IS DISTINCT FROM OLD.quantity THEN
+        UPDATE products SET stock = stock - (NEW.quantity - OLD.quantity)
+        WHERE id = NEW.product_id AND stock >= NEW.quantity - OLD.quantity;
+    ELSE
+        RETURN NEW;
+    END IF;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Недостаточно товара % на складе', NEW.product_id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION orders_release_stock() RETURNS trigger AS $$
+BEGIN
+    UPDATE products SET stock = stock + OLD.quantity WHERE id = OLD.product_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION orders_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE user_order_stats s SET
+            orders_count = s.orders_count - d.orders_count,
+            total_quantity = s.total_quantity - d.total_quantity,
+            total_spent = s.total_spent - d.total_spent,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT user_id, count(*) AS orders_count, sum(quantity) AS total_quantity,
+                   sum(quantity * coalesce(unit_price, 0)) AS total_spent
+            FROM old_rows WHERE user_id IS NOT NULL GROUP BY user_id
+        ) d
+        WHERE s.user_id = d.user_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        -- ORDER BY: одинаковый порядок блокировок строк у параллельных вставок
+        INSERT INTO user_order_stats AS s (user_id, orders_count, total_quantity, total_spent)
+        SELECT user_id, count(*), sum(quantity), sum(quantity * coalesce(unit_price, 0))
+        FROM new_rows WHERE user_id IS NOT NULL
+        GROUP BY user_id ORDER BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            orders_count = s.orders_count + EXCLUDED.orders_count,
+            total_quantity = s.total_quantity + EXCLUDED.total_quantity,
+            total_spent = s.total_spent + EXCLUDED.total_spent,
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_reserve_stock ON orders;
+CREATE TRIGGER orders_reserve_stock BEFORE INSERT ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_reserve_stock();
+DROP TRIGGER IF EXISTS orders_adjust_stock ON orders;
+CREATE TRIGGER orders_adjust_stock BEFORE UPDATE OF product_id, quantity ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_adjust_stock();
+-- при удалении товара заказы удаляются каскадом, строки товара уже нет
+DROP TRIGGER IF EXISTS orders_release_stock ON orders;
+CREATE TRIGGER orders_release_stock AFTER DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_release_stock();
+
+-- таблицы переходов нельзя объявить у триггера на несколько событий
+DROP TRIGGER IF EXISTS orders_stats_insert ON orders;
+CREATE TRIGGER orders_stats_insert AFTER INSERT ON orders
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION orders_stats_apply();
+DROP TRIGGER IF EXISTS orders_stats_update ON orders;
+CREATE TRIGGER orders_stats_update AFTER UPDATE ON orders
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION orders_stats_apply();
+DROP TRIGGER IF EXISTS orders_stats_delete ON orders;
+CREATE TRIGGER orders_stats_delete AFTER DELETE ON orders
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION orders_stats_apply();
+""" + REBUILD_USER_ORDER_STATS
+
+DROP_USER_ORDER_STATS = """
+DROP TRIGGER IF EXISTS orders_reserve_stock ON orders;
+DROP TRIGGER IF EXISTS orders_adjust_stock ON orders;
+DROP TRIGGER IF EXISTS orders_release_stock ON orders;
+DROP TRIGGER IF EXISTS orders_stats_insert ON orders;
+DROP TRIGGER IF EXISTS orders_stats_update ON orders;
+DROP TRIGGER IF EXISTS orders_stats_delete ON orders;
+DROP FUNCTION IF EXISTS orders_reserve_stock();
+DROP FUNCTION IF EXISTS orders_adjust_stock();
+DROP FUNCTION IF EXISTS orders_release_stock();
+DROP FUNCTION IF EXISTS orders_stats_apply();
+DROP TABLE IF EXISTS user_order_stats;
+"""
+
+# Сумма покупок пользователя: соединением по заказам и из агрегатов
+SELECT_USER_SPEND_JOIN = """
+SELECT count(*), coalesce(sum(o.quantity), 0), coalesce(sum(o.quantity * p.price), 0)
+FROM orders o JOIN products p ON p.id = o.product_id
+WHERE o.user_id = %s;
+"""
+SELECT_USER_ORDER_STATS = "SELECT orders_count, total_quantity, total_spent FROM user_order_stats WHERE user_id = %s;"
@@ -0,0 +1,236 @@
+"""
+Потокобезопасный пул соединений psycopg2 поверх ThreadedConnectionPool.
+
+Что добавлено к ThreadedConnectionPool:
+  - ожидание свободного соединения с таймаутом (acquire_timeout) вместо
+    немедленной ошибки PoolError при исчерпании пула;
+  - проверка соединения (SELECT 1), если оно простаивало дольше
+    health_check_interval, и замена разорванного соединения;
+  - ограничение времени жизни соединения (max_lifetime);
+  - откат незавершённой транзакции при возврате соединения;
+  - метрики ожидания: число выдач, таймаутов, перезапусков, p50/p99.
+
+    pool = ConnectionPool(1, 16, **DB_CONFIG)
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute(SELECT_ORDERS_BY_USER, (user_id,))
+    pool.stats.snapshot()
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за acquire_timeout"""
+
+
+class PoolStats:
+    """Потокобезопасные метрики пула; время ожидания — по последним window выдачам"""
+
+    def __init__(self, window=10_000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)
+        self.acquired = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.broken = 0
+        self.wait_seconds = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.acquired += 1
+            self.wait_seconds += seconds
+            self._waits.append(seconds)
+
+    def record(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            acquired = self.acquired
+
+        def pct(q):
+            return waits[min(int(len(waits) * q), len(waits) - 1)] * 1000 if waits else 0.0
+
+        return {
+            'acquired': acquired,
+            'timeouts': self.timeouts,
+            'recycled': self.recycled,
+            'broken': self.broken,
+            'avg_wait_ms': self.wait_seconds / acquired * 1000 if acquired else 0.0,
+            'p50_wait_ms': pct(0.5),
+            'p99_wait_ms': pct(0.99),
+        }
+
+
+class _RetainingPool(ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool закрывает возвращённое соединение, если в нём
+    уже лежит minconn свободных: при minconn < maxconn пул под нагрузкой
+    переподключался бы почти на каждой выдаче. Здесь minconn соединений
+    открывается сразу, а свободные хранятся до maxconn.
+    """
+
+    def _putconn(self, conn, key=None, close=False):
+        if self.closed:
+            raise PoolError("connection pool is closed")
+        if key is None:
+            key = self._rused.get(id(conn))
+            if key is None:
+                raise PoolError("trying to put unkeyed connection")
+
+        if len(self._pool) < self.maxconn and not close:
+            if not conn.closed:
+                status = conn.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    conn.close()  # соединение с сервером потеряно
+                else:
+                    if status != extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    self._pool.append(conn)
+        else:
+            conn.close()
+
+        if not self.closed or key in self._used:
+            del self._used[key]
+            del self._rused[id(conn)]
+
+
+class ConnectionPool:
+    """
+    minconn            — сколько соединений открыть сразу;
+    maxconn            — предел открытых соединений, свободные
+                         соединения хранятся до этого предела;
+    acquire_timeout    — сколько ждать свободного соединения, с;
+    max_lifetime       — после скольких секунд соединение пересоздаётся;
+    health_check_interval — проверять SELECT 1 соединения, простаивавшие
+                         дольше этого интервала (0 — проверять всегда).
+    Остальные аргументы передаются в psycopg2.connect.
+    """
+
+    def __init__(
+        self,
+        minconn,
+        maxconn,
+        *args,
+        acquire_timeout=5.0,
+        max_lifetime=1800.0,
+        health_check_interval=30.0,
+        **kwargs,
+    ):
+        self._pool = _RetainingPool(minconn, maxconn, *args, **kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._created_at = {}   # id(conn) -> monotonic
+        self._released_at = {}  # id(conn) -> monotonic
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.stats = PoolStats()
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._released_at.get(id(conn), 0.0)
+        if idle < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _forget(self, conn):
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+            self._released_at.pop(id(conn), None)
+
+    def _discard(self, conn):
+        self._forget(conn)
+        self._pool.putconn(conn, close=True)
+
+    def getconn(self, timeout=None):
+        started = time.monotonic()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            self.stats.record('timeouts')
+            raise PoolTimeout(f"Нет свободного соединения за {timeout} с")
+        try:
+            while True:
+                conn = self._pool.getconn()
+                now = time.monotonic()
+                with self._lock:
+                    created_at = self._created_at.setdefault(id(conn), now)
+                    self._released_at.setdefault(id(conn), now)
+                if now - created_at > self.max_lifetime:
+                    self.stats.record('recycled')
+                    self._discard(conn)
+                    continue
+                if not self._is_healthy(conn):
+                    self.stats.record('broken')
+                    self._discard(conn)
+                    continue
+                break
+        except Exception:
+            self._slots.release()
+            raise
+        self.stats.record_wait(time.monotonic() - started)
+        return conn
+
+    def putconn(self, conn, close=False):
+        # слот освобождается, только когда пул принял соединение: чужое или
+        # возвращённое повторно соединение даёт PoolError, а не ValueError
+        # переполненного BoundedSemaphore
+        self._return(conn, close)
+        self._slots.release()
+
+    def _return(self, conn, close):
+        if close or conn.closed:
+            self._discard(conn)
+            return
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+        with self._lock:
+            self._released_at[id(conn)] = time.monotonic()
+        self._pool.putconn(conn)
+        if conn.closed:
+            # пул сам закрыл соединение (например, потерянное сервером):
+            # его id может достаться новому
+            self._forget(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Соединение на время блока: commit при успехе, rollback при ошибке"""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass  # putconn выбросит разорванное соединение
+            raise
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        self._pool.closeall()
+        with self._lock:
+            self._created_at.clear()
+            self._released_at.clear()
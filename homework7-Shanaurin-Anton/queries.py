@@ -0,0 +1,133 @@
+"""
+Слой выполнения запросов из models.py через подготовленные операторы.
+
+cursor.execute(SQL) каждый раз заново разбирает и планирует запрос.
+PreparedQueries один раз на соединение выполняет PREPARE для каждого
+оператора, дальше вызывается только EXECUTE: разбор и (после нескольких
+вызовов) план берутся из кеша сервера. Пакетные операции отправляют
+много EXECUTE за один сетевой обмен (execute_batch), а вставки —
+многострочным INSERT ... VALUES (execute_values).
+
+    queries = PreparedQueries(conn)
+    queries.fetchall('select_orders_by_user', (user_id,))
+    queries.execute_batch('insert_order', [(1, 2, 3), (1, 5, 1)])
+
+Подготовленные операторы живут до конца сессии и не откатываются вместе
+с транзакцией; после DISCARD ALL или переподключения нужен reset().
+"""
+
+import re
+
+from psycopg2.extras import execute_batch, execute_values
+
+import models
+
+_PLACEHOLDER = re.compile(r'(?<!%)%s')
+
+# Имя оператора -> SQL из models.py
+STATEMENTS = {
+    'insert_user': models.INSERT_USER,
+    'select_user_by_id': models.SELECT_USER_BY_ID,
+    'select_all_users': models.SELECT_ALL_USERS,
+    'update_user': models.UPDATE_USER,
+    'delete_user': models.DELETE_USER,
+    'insert_product': models.INSERT_PRODUCT,
+    'select_product_by_id': models.SELECT_PRODUCT_BY_ID,
+    'select_all_products': models.SELECT_ALL_PRODUCTS,
+    'update_product': models.UPDATE_PRODUCT,
+    'delete_product': models.DELETE_PRODUCT,
+    'insert_order': models.INSERT_ORDER,
+    'select_order_by_id': models.SELECT_ORDER_BY_ID,
+    'select_orders_by_user': models.SELECT_ORDERS_BY_USER,
+    'delete_order': models.DELETE_ORDER,
+}
+
+# Вставки для execute_values: (таблица, столбцы)
+INSERT_TARGETS = {
+    'users': ('username', 'email', 'age'),
+    'products': ('name', 'price', 'stock', 'description'),
+    'orders': ('user_id', 'product_id', 'quantity'),
+}
+
+
+def to_positional(sql):
+    """Заменить %s на $1, $2, ... для PREPARE; возвращает (sql, число параметров)"""
+    counter = iter(range(1, 1000))
+    converted = _PLACEHOLDER.sub(lambda _: f"${next(counter)}", sql.strip().rstrip(';'))
+    return converted.replace('%%', '%'), next(counter) - 1
+
+
+class PreparedQueries:
+    """Подготовленные операторы models.py для одного соединения psycopg2"""
+
+    def __init__(self, conn, statements=None):
+        self.conn = conn
+        self.statements = statements or STATEMENTS
+        self._prepared = {}  # имя -> число параметров
+
+    def _ensure(self, cursor, name):
+        if name not in self._prepared:
+            sql, n_params = to_positional(self.statements[name])
+            prepare = f"PREPARE {name} AS {sql}"
+            # оператор мог подготовить другой экземпляр на этом же соединении;
+            # pg_prepared_statements.statement — текст исходной команды PREPARE
+            cursor.execute("SELECT statement FROM pg_prepared_statements WHERE name = %s", (name,))
+            existing = cursor.fetchone()
+            if existing is None:
+                cursor.execute(prepare)
+            elif existing[0] != prepare:
+                raise RuntimeError(
+                    f"Оператор {name} уже подготовлен на этом соединении с другим текстом"
+                )
+            self._prepared[name] = n_params
+        return self._prepared[name]
+
+    def prepare(self, *names):
+        """Подготовить операторы заранее, например до замеров времени"""
+        with self.conn.cursor() as cursor:
+            for name in names:
+                self._ensure(cursor, name)
+
+    def _execute_sql(self, name, n_params):
+        if not n_params:
+            return f"EXECUTE {name}"
+        return f"EXECUTE {name} ({', '.join(['%s'] * n_params)})"
+
+    def execute(self, cursor, name, params=()):
+        """
+        Выполнить оператор на курсоре вызывающего (его закрывает вызывающий);
+        возвращает тот же курсор для fetch*
+        """
+        n_params = self._ensure(cursor, name)
+        cursor.execute(self._execute_sql(name, n_params), params)
+        return cursor
+
+    def fetchone(self, name, params=()):
+        with self.conn.cursor() as cursor:
+            return self.execute(cursor, name, params).fetchone()
+
+    def fetchall(self, name, params=()):
+        with self.conn.cursor() as cursor:
+            return self.execute(cursor, name, params).fetchall()
+
+    def execute_batch(self, name, rows, page_size=100):
+        """Много вызовов оператора: page_size EXECUTE в одном запросе к серверу"""
+        with self.conn.cursor() as cursor:
+            n_params = self._ensure(cursor, name)
+            execute_batch(cursor, self._execute_sql(name, n_params), rows, page_size=page_size)
+
+    def insert_values(self, table, rows, page_size=1000, returning=True):
+        """Многострочный INSERT ... VALUES; возвращает id вставленных строк"""
+        columns = INSERT_TARGETS[table]
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+        if returning:
+            sql += " RETURNING id"
+        with self.conn.cursor() as cursor:
+            result = execute_values(cursor, sql, rows, page_size=page_size, fetch=returning)
+        return [row[0] for row in result] if returning else None
+
+    def reset(self):
+        """Удалить подготовленные операторы этого соединения"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("DEALLOCATE ALL")
+        self._prepared.clear()
@@ -0,0 +1,78 @@
+"""Тесты генерации данных и загрузки через COPY"""
+
+import pytest
+import psycopg2
+
+from datagen import FakerPool, RowsFile, copy_rows, to_copy_line, users_rows
+from models import SELECT_ORDERS_BY_USER, SELECT_USER_BY_ID
+
+
+@pytest.fixture(scope='module')
+def pool():
+    return FakerPool(size=100)
+
+
+class TestDatagen:
+    """Генерация строк без обращения к БД"""
+
+    def test_copy_line_escaping(self):
+        line = to_copy_line(('a\tb', 'c\\d', None, 'x\ny', 5))
+        assert line == 'a\\tb\tc\\\\d\t\\N\tx\\ny\t5\n'
+
+    def test_rows_file_reads_in_chunks(self, pool):
+        rows = list(users_rows(100, pool))
+        expected = ''.join(to_copy_line(row) for row in rows)
+
+        f = RowsFile(iter(rows))
+        chunks = []
+        while chunk := f.read(97):
+            chunks.append(chunk)
+
+        assert ''.join(chunks) == expected
+
+    def test_users_are_unique_and_deterministic(self, pool):
+        rows = list(users_rows(1000, pool, seed=1))
+
+        assert len({row[0] for row in rows}) == 1000
+        assert len({row[1] for row in rows}) == 1000
+        assert rows == list(users_rows(1000, pool, seed=1))
+
+
+class TestBulkLoad:
+    """Загрузка набора данных в схему bulk"""
+
+    def test_row_counts(self, bulk_cursor, bulk_dataset):
+        for table, size in bulk_dataset['sizes'].items():
+            bulk_cursor.execute(f"SELECT count(*) FROM {table}")
+            assert bulk_cursor.fetchone()[0] == size
+
+    def test_orders_reference_existing_rows(self, bulk_cursor):
+        bulk_cursor.execute("""
+            SELECT count(*) FROM orders o
+            LEFT JOIN users u ON u.id = o.user_id
+            LEFT JOIN products p ON p.id = o.product_id
+            WHERE u.id IS NULL OR p.id IS NULL
+        """)
+        assert bulk_cursor.fetchone()[0] == 0
+
+    def test_models_queries_work(self, bulk_cursor):
+        bulk_cursor.execute("SELECT user_id FROM orders LIMIT 1")
+        user_id = bulk_cursor.fetchone()[0]
+
+        bulk_cursor.execute(SELECT_USER_BY_ID, (user_id,))
+        assert bulk_cursor.fetchone()[0] == user_id
+        bulk_cursor.execute(SELECT_ORDERS_BY_USER, (user_id,))
+        assert len(bulk_cursor.fetchall()) >= 1
+
+    def test_changes_are_rolled_back(self, bulk_cursor, bulk_dataset, pool):
+        copy_rows(bulk_cursor, 'users', ('username', 'email', 'age'), users_rows(10, pool, seed=7))
+        bulk_cursor.execute("SELECT count(*) FROM users")
+        assert bulk_cursor.fetchone()[0] == bulk_dataset['sizes']['users'] + 10
+
+    def test_dataset_intact_after_rollback(self, bulk_cursor, bulk_dataset):
+        bulk_cursor.execute("SELECT count(*) FROM users")
+        assert bulk_cursor.fetchone()[0] == bulk_dataset['sizes']['users']
+
+    def test_copy_violating_constraint_fails(self, bulk_cursor, pool):
+        with pytest.raises(psycopg2.IntegrityError):
+            copy_rows(bulk_cursor, 'users', ('username', 'email', 'age'), [('x', 'x@x', 200)])
@@ -7,44 +7,20 @@ import random
 
 fake = Faker('ru_RU')
 
-# Параметры подключения
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5436,
-    'database': 'testdb',
-    'user': 'testuser',
-    'password': 'testpass'
-}
+# Схема этого модуля отличается от models.py (users.email/name,
+# orders.total_price), поэтому таблицы живут в отдельной схеме crud.
+# Соединение и откат через SAVEPOINT — общие фикстуры из conftest.py
+CRUD_SCHEMA = "crud"
 
-@pytest.fixture(scope='function')
-def db_connection():
-    """Фикстура для подключения к БД с транзакцией"""
-    conn = psycopg2.connect(**DB_CONFIG)
-    conn.autocommit = False
-    yield conn
-    conn.rollback()
-    conn.close()
 
-@pytest.fixture(scope='function')
-def cursor(db_connection):
-    """Фикстура для курсора"""
-    cur = db_connection.cursor(cursor_factory=RealDictCursor)
-    yield cur
-    cur.close()
+@pytest.fixture(scope='module', autouse=True)
+def crud_schema(db_connection):
+    """Создание таблиц один раз для всего модуля"""
+    cur = db_connection.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {CRUD_SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {CRUD_SCHEMA}")
+    cur.execute(f"SET search_path TO {CRUD_SCHEMA}")
 
-@pytest.fixture(scope='session', autouse=True)
-def setup_database():
-    """Создание таблиц перед всеми тестами"""
-    conn = psycopg2.connect(**DB_CONFIG)
-    conn.autocommit = True
-    cur = conn.cursor()
-    
-    # Удаление таблиц если существуют
-    cur.execute("DROP TABLE IF EXISTS orders CASCADE")
-    cur.execute("DROP TABLE IF EXISTS products CASCADE")
-    cur.execute("DROP TABLE IF EXISTS users CASCADE")
-    
-    # Создание таблиц
     cur.execute("""
         CREATE TABLE users (
             id SERIAL PRIMARY KEY,
@@ -73,20 +49,23 @@ def setup_database():
             order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    
+    db_connection.commit()
     cur.close()
-    conn.close()
     yield
     
-    # Очистка после всех тестов
-    conn = psycopg2.connect(**DB_CONFIG)
-    conn.autocommit = True
-    cur = conn.cursor()
-    cur.execute("DROP TABLE IF EXISTS orders CASCADE")
-    cur.execute("DROP TABLE IF EXISTS products CASCADE")
-    cur.execute("DROP TABLE IF EXISTS users CASCADE")
+    # Очистка после всех тестов модуля
+    cur = db_connection.cursor()
+    cur.execute("RESET search_path")
+    cur.execute(f"DROP SCHEMA IF EXISTS {CRUD_SCHEMA} CASCADE")
+    db_connection.commit()
+    cur.close()
+
+@pytest.fixture(scope='function')
+def cursor(db_transaction):
+    """Фикстура для курсора; изменения теста откатываются"""
+    cur = db_transaction.cursor(cursor_factory=RealDictCursor)
+    yield cur
     cur.close()
-    conn.close()
 
 # ============== ПОЗИТИВНЫЕ ТЕСТЫ ==============
 
@@ -0,0 +1,143 @@
+"""Тесты агрегатов user_order_stats и списания склада триггерами"""
+
+from decimal import Decimal
+
+import psycopg2
+import pytest
+from psycopg2.extras import execute_values
+
+from models import (
+    CREATE_USER_ORDER_STATS,
+    INSERT_ORDER,
+    INSERT_PRODUCT,
+    REBUILD_USER_ORDER_STATS,
+    SELECT_USER_ORDER_STATS,
+    SELECT_USER_SPEND_JOIN,
+)
+
+
+@pytest.fixture
+def stats_cursor(db_cursor):
+    """Триггеры ставятся внутри SAVEPOINT теста и откатываются вместе с ним"""
+    db_cursor.execute(CREATE_USER_ORDER_STATS)
+    return db_cursor
+
+
+@pytest.fixture
+def product(stats_cursor):
+    stats_cursor.execute(INSERT_PRODUCT, ('Товар', Decimal('12.50'), 10, None))
+    return stats_cursor.fetchone()[0]
+
+
+def user_stats(cursor, user_id):
+    cursor.execute(SELECT_USER_ORDER_STATS, (user_id,))
+    return cursor.fetchone()
+
+
+def stock(cursor, product_id):
+    cursor.execute("SELECT stock FROM products WHERE id = %s", (product_id,))
+    return cursor.fetchone()[0]
+
+
+def test_insert_updates_stats_and_stock(stats_cursor, inserted_user, product):
+    stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 3))
+    stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 2))
+
+    assert user_stats(stats_cursor, inserted_user['id']) == (2, 5, Decimal('62.50'))
+    assert stock(stats_cursor, product) == 5
+
+
+def test_insufficient_stock_rejected(stats_cursor, inserted_user, product):
+    stats_cursor.execute("SAVEPOINT order_insert")
+    with pytest.raises(psycopg2.errors.CheckViolation):
+        stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 11))
+    stats_cursor.execute("ROLLBACK TO SAVEPOINT order_insert")
+
+    assert stock(stats_cursor, product) == 10
+    assert user_stats(stats_cursor, inserted_user['id']) is None
+
+
+def test_spend_uses_price_at_order_time(stats_cursor, inserted_user, product):
+    stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 2))
+    stats_cursor.execute("UPDATE products SET price = 100 WHERE id = %s", (product,))
+
+    assert user_stats(stats_cursor, inserted_user['id'])[2] == Decimal('25.00')
+
+
+def test_update_and_delete_adjust_stats(stats_cursor, inserted_user, product):
+    stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 2))
+    order_id = stats_cursor.fetchone()[0]
+    stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 1))
+
+    stats_cursor.execute("UPDATE orders SET quantity = 4 WHERE id = %s", (order_id,))
+    assert user_stats(stats_cursor, inserted_user['id']) == (2, 5, Decimal('62.50'))
+    assert stock(stats_cursor, product) == 5
+
+    stats_cursor.execute("DELETE FROM orders WHERE id = %s", (order_id,))
+    assert user_stats(stats_cursor, inserted_user['id']) == (1, 1, Decimal('12.50'))
+    assert stock(stats_cursor, product) == 9
+
+
+def test_quantity_increase_beyond_stock_rejected(stats_cursor, inserted_user, product):
+    stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 2))
+    order_id = stats_cursor.fetchone()[0]
+
+    stats_cursor.execute("SAVEPOINT order_update")
+    with pytest.raises(psycopg2.errors.CheckViolation):
+        stats_cursor.execute("UPDATE orders SET quantity = 11 WHERE id = %s", (order_id,))
+    stats_cursor.execute("ROLLBACK TO SAVEPOINT order_update")
+
+    assert stock(stats_cursor, product) == 8
+
+
+def test_product_change_moves_stock_and_price(stats_cursor, inserted_user, product):
+    stats_cursor.execute(INSERT_PRODUCT, ('Другой товар', Decimal('3.00'), 5, None))
+    other = stats_cursor.fetchone()[0]
+    stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 2))
+    order_id = stats_cursor.fetchone()[0]
+
+    stats_cursor.execute("UPDATE orders SET product_id = %s WHERE id = %s", (other, order_id))
+
+    assert stock(stats_cursor, product) == 10
+    assert stock(stats_cursor, other) == 3
+    assert user_stats(stats_cursor, inserted_user['id']) == (1, 2, Decimal('6.00'))
+
+
+def test_install_counts_existing_orders(db_cursor, inserted_user):
+    db_cursor.execute(INSERT_PRODUCT, ('Товар', Decimal('12.50'), 10, None))
+    product_id = db_cursor.fetchone()[0]
+    db_cursor.execute(INSERT_ORDER, (inserted_user['id'], product_id, 3))
+
+    db_cursor.execute(CREATE_USER_ORDER_STATS)
+
+    assert user_stats(db_cursor, inserted_user['id']) == (1, 3, Decimal('37.50'))
+
+
+def test_multi_row_insert_matches_join(stats_cursor, fake_users, product):
+    user_ids = []
+    for user in fake_users:
+        stats_cursor.execute(
+            "INSERT INTO users (username, email, age) VALUES (%s, %s, %s) RETURNING id",
+            (user['username'], user['email'], user['age'])
+        )
+        user_ids.append(stats_cursor.fetchone()[0])
+
+    execute_values(
+        stats_cursor,
+        "INSERT INTO orders (user_id, product_id, quantity) VALUES %s",
+        [(user_id, product, 1) for user_id in user_ids] + [(user_ids[0], product, 2)],
+    )
+
+    for user_id in user_ids:
+        stats_cursor.execute(SELECT_USER_SPEND_JOIN, (user_id,))
+        expected = stats_cursor.fetchone()
+        assert user_stats(stats_cursor, user_id) == expected
+
+
+def test_rebuild_matches_triggers(stats_cursor, inserted_user, product):
+    stats_cursor.execute(INSERT_ORDER, (inserted_user['id'], product, 3))
+    expected = user_stats(stats_cursor, inserted_user['id'])
+
+    stats_cursor.execute(REBUILD_USER_ORDER_STATS)
+
+    assert user_stats(stats_cursor, inserted_user['id']) == expected
@@ -0,0 +1,123 @@
+"""
+Регрессионные тесты производительности запросов из models.py.
+
+Каждый запрос выполняется на данных bulk_dataset через
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON); медианное время выполнения и
+отпечаток плана сравниваются с базовой линией perf_baseline.json.
+Тест падает, если:
+  - в плане появилось последовательное сканирование таблицы там,
+    где ожидается индекс;
+  - задержка выросла больше чем на --perf-threshold от базовой.
+
+    pytest test_performance.py --perf --update-baseline   # записать базу
+    pytest test_performance.py --perf --bulk-users 1000000 --bulk-orders 5000000
+"""
+
+import json
+import statistics
+import warnings
+from pathlib import Path
+
+import pytest
+
+from models import (
+    SELECT_ALL_PRODUCTS,
+    SELECT_ALL_USERS,
+    SELECT_ORDER_BY_ID,
+    SELECT_ORDERS_BY_USER,
+    SELECT_PRODUCT_BY_ID,
+    SELECT_USER_BY_ID,
+)
+
+pytestmark = pytest.mark.perf
+
+BASELINE_FILE = Path(__file__).with_name('perf_baseline.json')
+REPEAT = 7
+# Абсолютный допуск, чтобы шум на долях миллисекунды не ронял тесты
+MIN_SLACK_MS = 0.5
+
+# (название, запрос, таблица для выбора параметра или None, допустим ли Seq Scan)
+QUERIES = [
+    ('select_user_by_id', SELECT_USER_BY_ID, 'users', False),
+    ('select_all_users', SELECT_ALL_USERS, None, True),
+    ('select_product_by_id', SELECT_PRODUCT_BY_ID, 'products', False),
+    ('select_all_products', SELECT_ALL_PRODUCTS, None, True),
+    ('select_order_by_id', SELECT_ORDER_BY_ID, 'orders', False),
+    ('select_orders_by_user', SELECT_ORDERS_BY_USER, 'users', False),
+]
+
+
+def plan_nodes(node):
+    """Узлы плана в порядке обхода в глубину"""
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def fingerprint(plan):
+    """Отпечаток плана: типы узлов с таблицами и индексами, без стоимостей"""
+    parts = []
+    for node in plan_nodes(plan):
+        target = node.get('Index Name') or node.get('Relation Name')
+        parts.append(f"{node['Node Type']}({target})" if target else node['Node Type'])
+    return ' > '.join(parts)
+
+
+def explain(cursor, sql, params):
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+    return cursor.fetchone()[0][0]
+
+
+@pytest.fixture(scope='module')
+def baseline(request, bulk_dataset):
+    """Базовая линия для текущих размеров данных; при --update-baseline перезаписывается"""
+    saved = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    current = {'sizes': bulk_dataset['sizes'], 'queries': {}}
+    yield saved if saved.get('sizes') == bulk_dataset['sizes'] else None, current
+
+    if request.config.getoption('--update-baseline') and current['queries']:
+        BASELINE_FILE.write_text(json.dumps(current, ensure_ascii=False, indent=2))
+
+
+@pytest.mark.parametrize('name, sql, param_table, seq_scan_ok', QUERIES, ids=[q[0] for q in QUERIES])
+def test_query_performance(request, bulk_cursor, baseline, name, sql, param_table, seq_scan_ok):
+    saved, current = baseline
+    params = None
+    if param_table is not None:
+        # середина диапазона id: не первая и не последняя страница таблицы
+        bulk_cursor.execute(f"SELECT (min(id) + max(id)) / 2 FROM {param_table}")
+        params = (bulk_cursor.fetchone()[0],)
+
+    explain(bulk_cursor, sql, params)  # прогрев кеша
+    runs = [explain(bulk_cursor, sql, params) for _ in range(REPEAT)]
+    latency_ms = statistics.median(run['Execution Time'] for run in runs)
+    plan = runs[-1]['Plan']
+    shape = fingerprint(plan)
+    current['queries'][name] = {
+        'latency_ms': round(latency_ms, 3),
+        'plan': shape,
+        'shared_hit': plan.get('Shared Hit Blocks', 0),
+        'shared_read': plan.get('Shared Read Blocks', 0),
+    }
+
+    if not seq_scan_ok:
+        seq_scans = [
+            node['Relation Name'] for node in plan_nodes(plan) if node['Node Type'] == 'Seq Scan'
+        ]
+        assert not seq_scans, f"{name}: последовательное сканирование {seq_scans}, план: {shape}"
+
+    if request.config.getoption('--update-baseline'):
+        return
+    if saved is None or name not in saved['queries']:
+        pytest.skip('нет базовой линии для этих размеров данных: запустите с --update-baseline')
+
+    expected = saved['queries'][name]
+    if expected['plan'] != shape:
+        warnings.warn(f"{name}: план изменился: {expected['plan']} -> {shape}")
+
+    threshold = request.config.getoption('--perf-threshold')
+    limit = max(expected['latency_ms'] * (1 + threshold), expected['latency_ms'] + MIN_SLACK_MS)
+    assert latency_ms <= limit, (
+        f"{name}: {latency_ms:.3f} мс против базовых {expected['latency_ms']:.3f} мс "
+        f"(допустимо до {limit:.3f} мс)"
+    )
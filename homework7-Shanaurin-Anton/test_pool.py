@@ -0,0 +1,172 @@
+"""Тесты пула соединений"""
+
+import threading
+
+import pytest
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def small_pool(worker_db):
+    pool = ConnectionPool(1, 2, **worker_db, acquire_timeout=0.2)
+    yield pool
+    pool.closeall()
+
+
+def test_connection_context_commits(db_pool):
+    with db_pool.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT 1")
+        assert cur.fetchone() == (1,)
+    assert db_pool.stats.snapshot()['acquired'] >= 1
+
+
+def test_acquire_timeout(small_pool):
+    first = small_pool.getconn()
+    second = small_pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        small_pool.getconn()
+    assert small_pool.stats.snapshot()['timeouts'] == 1
+
+    small_pool.putconn(first)
+    small_pool.putconn(second)
+
+
+def test_waiting_thread_gets_released_connection(small_pool):
+    held = [small_pool.getconn(), small_pool.getconn()]
+    got = []
+
+    waiter = threading.Thread(target=lambda: got.append(small_pool.getconn(timeout=5)))
+    waiter.start()
+    small_pool.putconn(held.pop())
+    waiter.join()
+
+    assert len(got) == 1
+    small_pool.putconn(got[0])
+    small_pool.putconn(held.pop())
+
+
+def test_open_transaction_rolled_back_on_return(small_pool):
+    conn = small_pool.getconn()
+    conn.cursor().execute("SELECT 1")
+    assert conn.get_transaction_status() == extensions.TRANSACTION_STATUS_INTRANS
+
+    small_pool.putconn(conn)
+
+    assert conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+
+
+def test_max_lifetime_recycles(worker_db):
+    pool = ConnectionPool(1, 1, **worker_db, max_lifetime=0)
+    first = pool.getconn()
+    pool.putconn(first)
+
+    second = pool.getconn()
+
+    assert first.closed
+    assert second is not first
+    assert pool.stats.snapshot()['recycled'] >= 1
+    pool.putconn(second)
+    pool.closeall()
+
+
+def test_broken_connection_replaced(worker_db):
+    pool = ConnectionPool(1, 1, **worker_db, health_check_interval=0)
+    conn = pool.getconn()
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_backend_pid()")
+        pid = cur.fetchone()[0]
+    pool.putconn(conn)
+
+    # разорвать соединение со стороны сервера
+    killer = ConnectionPool(1, 1, **worker_db)
+    with killer.connection() as other, other.cursor() as cur:
+        cur.execute("SELECT pg_terminate_backend(%s)", (pid,))
+    killer.closeall()
+
+    with pool.connection() as fresh, fresh.cursor() as cur:
+        cur.execute("SELECT 1")
+        assert cur.fetchone() == (1,)
+    assert pool.stats.snapshot()['broken'] == 1
+    pool.closeall()
+
+
+class FakeConnection:
+    """Соединение без сервера: пул проверяет только состояние транзакции"""
+
+    def __init__(self, opened):
+        self.closed = False
+        self.info = self
+        self.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+        opened.append(self)
+
+    def get_transaction_status(self):
+        return self.transaction_status
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_returned_connections_are_kept_up_to_maxconn(monkeypatch):
+    opened = []
+    monkeypatch.setattr('psycopg2.connect', lambda *a, **kw: FakeConnection(opened))
+    pool = ConnectionPool(1, 8, acquire_timeout=5)
+    barrier = threading.Barrier(8)
+
+    def worker():
+        for _ in range(10):
+            conn = pool.getconn()
+            barrier.wait(timeout=5)  # все 8 соединений заняты одновременно
+            pool.putconn(conn)
+            barrier.wait(timeout=5)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(opened) == 8
+    assert pool.stats.snapshot()['acquired'] == 80
+    pool.closeall()
+
+
+def test_connection_closed_by_pool_is_forgotten(monkeypatch):
+    opened = []
+    monkeypatch.setattr('psycopg2.connect', lambda *a, **kw: FakeConnection(opened))
+    pool = ConnectionPool(1, 2)
+    conn = pool.getconn()
+    conn.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN  # сервер потерян
+
+    pool.putconn(conn)
+
+    assert conn.closed
+    assert id(conn) not in pool._created_at
+    assert id(conn) not in pool._released_at
+    pool.closeall()
+
+
+def test_returning_connection_twice_raises_pool_error(monkeypatch):
+    opened = []
+    monkeypatch.setattr('psycopg2.connect', lambda *a, **kw: FakeConnection(opened))
+    pool = ConnectionPool(1, 1, acquire_timeout=0.2)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    with pytest.raises(PoolError):
+        pool.putconn(conn)
+    with pytest.raises(PoolError):
+        pool.putconn(FakeConnection(opened))
+
+    # лишний слот не появился: второе соединение не выдаётся
+    again = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    pool.putconn(again)
+    pool.closeall()
@@ -0,0 +1,71 @@
+"""Тесты слоя подготовленных операторов"""
+
+import pytest
+
+from models import INSERT_USER, SELECT_USER_BY_ID
+from queries import PreparedQueries, to_positional
+
+
+@pytest.fixture
+def queries(db_cursor):
+    return PreparedQueries(db_cursor.connection)
+
+
+def test_to_positional():
+    sql, n_params = to_positional("UPDATE users SET username = %s, age = %s WHERE id = %s;")
+
+    assert sql == "UPDATE users SET username = $1, age = $2 WHERE id = $3"
+    assert n_params == 3
+
+
+def test_prepared_matches_plain_execute(db_cursor, queries, fake_user):
+    db_cursor.execute(INSERT_USER, (fake_user['username'], fake_user['email'], fake_user['age']))
+    user_id = db_cursor.fetchone()[0]
+
+    db_cursor.execute(SELECT_USER_BY_ID, (user_id,))
+    assert queries.fetchone('select_user_by_id', (user_id,)) == db_cursor.fetchone()
+
+
+def test_statement_prepared_once(db_cursor, queries, fake_users):
+    for user in fake_users:
+        queries.fetchone('insert_user', (user['username'], user['email'], user['age']))
+
+    db_cursor.execute(
+        "SELECT count(*) FROM pg_prepared_statements WHERE name = 'insert_user'"
+    )
+    assert db_cursor.fetchone()[0] == 1
+    # второй экземпляр на том же соединении не падает на повторном PREPARE
+    assert PreparedQueries(db_cursor.connection).fetchall('select_all_users')
+
+
+def test_same_name_with_other_sql_rejected(db_cursor):
+    PreparedQueries(db_cursor.connection, {'test_conflict': 'SELECT 1'}).prepare('test_conflict')
+    other = PreparedQueries(db_cursor.connection, {'test_conflict': 'SELECT 2'})
+    try:
+        with pytest.raises(RuntimeError):
+            other.fetchone('test_conflict')
+    finally:
+        db_cursor.execute("DEALLOCATE test_conflict")
+
+
+def test_execute_uses_callers_cursor(db_cursor, queries, inserted_user):
+    assert queries.execute(db_cursor, 'select_user_by_id', (inserted_user['id'],)) is db_cursor
+    assert db_cursor.fetchone()[0] == inserted_user['id']
+
+
+def test_execute_batch(db_cursor, queries, inserted_user, inserted_product):
+    rows = [(inserted_user['id'], inserted_product['id'], q) for q in range(1, 11)]
+
+    queries.execute_batch('insert_order', rows)
+
+    orders = queries.fetchall('select_orders_by_user', (inserted_user['id'],))
+    assert sorted(order[3] for order in orders) == list(range(1, 11))
+
+
+def test_insert_values_returns_ids(queries, fake_products):
+    rows = [(p['name'], p['price'], p['stock'], p['description']) for p in fake_products]
+
+    ids = queries.insert_values('products', rows)
+
+    assert len(ids) == len(rows)
+    assert queries.fetchone('select_product_by_id', (ids[0],))[1] == rows[0][0]
@@ -0,0 +1,88 @@
+"""
+Поиск по списку id: `id = ANY(%s)` против развёрнутого `IN (%s, %s, ...)`.
+
+Для списков от 10 до 100 000 id замеряется медианное время запроса:
+  - IN (...)       — по плейсхолдеру на каждый id, текст запроса
+                     зависит от длины списка;
+  - ANY(%s)        — один параметр-массив (query_builder.select);
+  - PREPARE ANY($1) — тот же запрос как подготовленный оператор: текст
+                     не меняется, план разбирается один раз.
+Таблица users из отчёта создаётся во временной схеме и удаляется.
+
+    python bench_in_list.py --rows 1000000 --sizes 10 100 1000 10000 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import psycopg2
+from psycopg2 import sql
+
+from query_builder import insert, select
+
+SCHEMA = 'bench_in_list'
+
+
+def expanded_in(ids):
+    placeholders = sql.SQL(', ').join(sql.Placeholder() * len(ids))
+    statement = sql.SQL('SELECT {} FROM {} WHERE {} IN ({})').format(
+        sql.Identifier('id'), sql.Identifier('users'), sql.Identifier('id'), placeholders
+    )
+    return statement, ids
+
+
+def timed(cur, statement, params, repeat):
+    """Медиана времени выполнения с выборкой результата, мс"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(statement, params)
+        rows = cur.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default='host=localhost port=5432 dbname=testdb user=testuser password=testpass')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    cur.execute("CREATE TABLE users (id SERIAL PRIMARY KEY, username TEXT, password TEXT)")
+    rows = ((f"user{i}", f"pass{i}") for i in range(args.rows))
+    for query in insert('users', ['username', 'password'], rows, batch_size=5000):
+        cur.execute(*query)
+    cur.execute("ANALYZE users")
+    cur.execute("PREPARE users_by_ids (int[]) AS SELECT id FROM users WHERE id = ANY($1)")
+    conn.commit()
+
+    rnd = random.Random(1)
+    print(f"{'id в списке':>12}{'IN (...), мс':>15}{'ANY(%s), мс':>14}{'PREPARE, мс':>14}")
+    for size in args.sizes:
+        ids = rnd.sample(range(1, args.rows + 1), min(size, args.rows))
+
+        in_ms, in_rows = timed(cur, *expanded_in(ids), args.repeat)
+        any_ms, any_rows = timed(cur, *select('users', ['id'], where={'id': ids}), args.repeat)
+        prep_ms, prep_rows = timed(cur, "EXECUTE users_by_ids (%s)", (ids,), args.repeat)
+        assert in_rows == any_rows == prep_rows == len(ids)
+
+        print(f"{size:>12,}{in_ms:>15.2f}{any_ms:>14.2f}{prep_ms:>14.2f}")
+
+    conn.rollback()
+    cur.execute("DEALLOCATE users_by_ids")
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Построитель параметризованных запросов для psycopg2.
+
+Имена таблиц и колонок оформляются через psycopg2.sql.Identifier,
+значения всегда уходят отдельным параметром (%s) — способа вставить
+значение в текст запроса нет, поэтому инъекция из раздела 1.2 отчёта
+невозможна по построению.
+
+Списки значений в условиях превращаются в `колонка = ANY(%s)` с одним
+параметром-массивом вместо `IN (%s, %s, ...)`: текст запроса не зависит от
+длины списка, поэтому один подготовленный оператор (PREPARE) и одна
+запись pg_stat_statements обслуживают списки любой длины. Многострочная
+вставка режется на пакеты одного размера, чтобы текст всех полных
+пакетов тоже совпадал.
+
+    q = select('users', ['id', 'username'], where={'id': [1, 2, 3]})
+    cur.execute(*q)
+    for q in insert('users', ['username', 'password'], rows):
+        cur.execute(*q)
+"""
+
+from typing import NamedTuple
+
+from psycopg2 import sql
+
+
+class Query(NamedTuple):
+    """Текст запроса и параметры: cur.execute(*query)"""
+    statement: sql.Composed
+    params: tuple
+
+    def as_string(self, conn):
+        """Текст запроса (без подстановки параметров), например для логов"""
+        return self.statement.as_string(conn)
+
+
+def _identifiers(names):
+    return sql.SQL(', ').join(sql.Identifier(name) for name in names)
+
+
+def _where(where):
+    """
+    where — словарь колонка -> значение:
+      None              -> колонка IS NULL
+      list/tuple/set    -> колонка = ANY(%s), параметр-массив
+      прочее            -> колонка = %s
+    """
+    if not where:
+        return sql.SQL(''), ()
+    parts, params = [], []
+    for column, value in where.items():
+        name = sql.Identifier(column)
+        if value is None:
+            parts.append(sql.SQL('{} IS NULL').format(name))
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            parts.append(sql.SQL('{} = ANY(%s)').format(name))
+            params.append(list(value))
+        else:
+            parts.append(sql.SQL('{} = %s').format(name))
+            params.append(value)
+    return sql.SQL(' WHERE ') + sql.SQL(' AND ').join(parts), tuple(params)
+
+
+def _returning(returning):
+    if not returning:
+        return sql.SQL('')
+    return sql.SQL(' RETURNING ') + _identifiers(returning)
+
+
+def select(table, columns=None, where=None, order_by=None, limit=None):
+    """SELECT columns FROM table [WHERE ...] [ORDER BY ...] [LIMIT %s]"""
+    fields = _identifiers(columns) if columns else sql.SQL('*')
+    condition, params = _where(where)
+    statement = sql.SQL('SELECT {} FROM {}').format(fields, sql.Identifier(table)) + condition
+    if order_by:
+        statement += sql.SQL(' ORDER BY ') + _identifiers(order_by)
+    if limit is not None:
+        statement += sql.SQL(' LIMIT %s')
+        params += (limit,)
+    return Query(statement, params)
+
+
+def insert(table, columns, rows, batch_size=1000, returning=None):
+    """
+    Генератор многострочных INSERT ... VALUES (%s, ...), (%s, ...), ...
+    по batch_size строк; последний пакет может быть короче.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size должен быть положительным")
+    head = sql.SQL('INSERT INTO {} ({}) VALUES ').format(
+        sql.Identifier(table), _identifiers(columns)
+    )
+    row_sql = sql.SQL('({})').format(sql.SQL(', ').join(sql.Placeholder() * len(columns)))
+    tail = _returning(returning)
+
+    templates = {}
+    batch = []
+
+    def flush():
+        n = len(batch)
+        if n not in templates:
+            templates[n] = head + sql.SQL(', ').join([row_sql] * n) + tail
+        params = tuple(value for row in batch for value in row)
+        batch.clear()
+        return Query(templates[n], params)
+
+    for row in rows:
+        if len(row) != len(columns):
+            raise ValueError(f"Строка {row!r}: ожидалось {len(columns)} значений")
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield flush()
+    if batch:
+        yield flush()
+
+
+def update(table, values, where, returning=None):
+    """UPDATE table SET col = %s, ... WHERE ...; без условия не строится"""
+    if not where:
+        raise ValueError("UPDATE без WHERE изменит всю таблицу")
+    if not values:
+        raise ValueError("UPDATE без SET: нет столбцов для изменения")
+    assignments = sql.SQL(', ').join(
+        sql.SQL('{} = %s').format(sql.Identifier(column)) for column in values
+    )
+    condition, params = _where(where)
+    statement = (
+        sql.SQL('UPDATE {} SET {}').format(sql.Identifier(table), assignments)
+        + condition + _returning(returning)
+    )
+    return Query(statement, tuple(values.values()) + params)
+
+
+def delete(table, where, returning=None):
+    """DELETE FROM table WHERE ...; без условия не строится"""
+    if not where:
+        raise ValueError("DELETE без WHERE удалит всю таблицу")
+    condition, params = _where(where)
+    statement = (
+        sql.SQL('DELETE FROM {}').format(sql.Identifier(table))
+        + condition + _returning(returning)
+    )
+    return Query(statement, params)
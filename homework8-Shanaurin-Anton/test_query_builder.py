@@ -0,0 +1,92 @@
+"""Тесты построителя запросов: текст собирается из Composed без соединения с базой"""
+
+import pytest
+from psycopg2 import sql
+
+from query_builder import delete, insert, select, update
+
+
+def render(composable):
+    """Текст запроса, как его отправит psycopg2 (идентификаторы в кавычках)"""
+    if isinstance(composable, sql.Composed):
+        return ''.join(render(part) for part in composable.seq)
+    if isinstance(composable, sql.Identifier):
+        return '.'.join(f'"{name}"' for name in composable.strings)
+    if isinstance(composable, sql.Placeholder):
+        return '%s'
+    return composable.string
+
+
+def test_list_becomes_any_with_array_param():
+    query = select('users', ['id'], where={'id': [1, 2, 3]})
+
+    assert render(query.statement) == 'SELECT "id" FROM "users" WHERE "id" = ANY(%s)'
+    assert query.params == ([1, 2, 3],)
+
+
+def test_empty_list_keeps_single_array_param():
+    query = select('users', ['id'], where={'id': []})
+
+    assert render(query.statement) == 'SELECT "id" FROM "users" WHERE "id" = ANY(%s)'
+    assert query.params == ([],)
+
+
+def test_set_passed_as_list():
+    query = select('users', where={'id': {7}})
+
+    assert query.params == ([7],)
+
+
+def test_none_becomes_is_null_without_param():
+    query = select('users', where={'password': None, 'username': 'admin'})
+
+    assert render(query.statement) == (
+        'SELECT * FROM "users" WHERE "password" IS NULL AND "username" = %s'
+    )
+    assert query.params == ('admin',)
+
+
+def test_limit_is_a_parameter():
+    query = select('users', ['id'], order_by=['id'], limit=10)
+
+    assert render(query.statement) == 'SELECT "id" FROM "users" ORDER BY "id" LIMIT %s'
+    assert query.params == (10,)
+
+
+def test_insert_reuses_template_for_full_batches():
+    rows = [(f'user{i}', f'pass{i}') for i in range(5)]
+
+    queries = list(insert('users', ['username', 'password'], rows, batch_size=2))
+
+    assert len(queries) == 3
+    assert queries[0].statement is queries[1].statement
+    assert render(queries[2].statement) == (
+        'INSERT INTO "users" ("username", "password") VALUES (%s, %s)'
+    )
+    assert queries[0].params == ('user0', 'pass0', 'user1', 'pass1')
+
+
+def test_insert_rejects_row_of_wrong_length():
+    with pytest.raises(ValueError):
+        list(insert('users', ['username', 'password'], [('only_name',)]))
+
+
+def test_update_and_delete_require_where():
+    with pytest.raises(ValueError):
+        update('users', {'password': 'x'}, where={})
+    with pytest.raises(ValueError):
+        delete('users', where=None)
+
+
+def test_update_requires_values():
+    with pytest.raises(ValueError):
+        update('users', {}, where={'id': 1})
+
+
+def test_update_params_order():
+    query = update('users', {'password': 'new'}, where={'id': [1, 2]}, returning=['id'])
+
+    assert render(query.statement) == (
+        'UPDATE "users" SET "password" = %s WHERE "id" = ANY(%s) RETURNING "id"'
+    )
+    assert query.params == ('new', [1, 2])
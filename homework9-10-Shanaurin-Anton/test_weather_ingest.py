@@ -0,0 +1,77 @@
+"""Тесты инкрементальной загрузки на SQLite в памяти"""
+
+from datetime import timedelta, timezone
+
+import pytest
+
+from weather_ingest import COLUMNS, connect, ingest, normalize_datetime
+
+
+def observation(when, temperature=20.0):
+    record = dict.fromkeys(COLUMNS)
+    record.update(datetime=when, temperature_c=temperature, wind_direction="С")
+    return record
+
+
+@pytest.fixture
+def conn():
+    conn = connect(":memory:")
+    yield conn
+    conn.close()
+
+
+def temperatures(conn):
+    return conn.execute("SELECT datetime, temperature_c FROM weather ORDER BY datetime").fetchall()
+
+
+def test_ignore_skips_known_hours(conn):
+    ingest(conn, [observation("2025-06-13T03:00:00", 18.0)])
+
+    stats = ingest(conn, [observation("2025-06-13T03:00:00", 25.0), observation("2025-06-13T06:00:00")])
+
+    assert stats["inserted"] == 1
+    assert stats["updated"] == 0
+    assert temperatures(conn) == [("2025-06-13 03:00:00", 18.0), ("2025-06-13 06:00:00", 20.0)]
+
+
+def test_upsert_updates_only_changed_rows(conn):
+    ingest(conn, [observation("2025-06-13T03:00:00", 18.0), observation("2025-06-13T06:00:00")])
+
+    stats = ingest(
+        conn,
+        [observation("2025-06-13T03:00:00", 25.0), observation("2025-06-13T06:00:00")],
+        mode="upsert",
+    )
+
+    assert stats["inserted"] == 0
+    assert stats["updated"] == 1
+    assert temperatures(conn)[0] == ("2025-06-13 03:00:00", 25.0)
+
+
+def test_only_new_drops_older_before_insert(conn):
+    ingest(conn, [observation("2025-06-13T06:00:00")])
+
+    stats = ingest(
+        conn,
+        [observation("2025-06-13T03:00:00"), observation("2025-06-13T09:00:00")],
+        only_new=True,
+    )
+
+    assert stats["read"] == 2
+    assert stats["inserted"] == 1
+    assert [row[0] for row in temperatures(conn)] == ["2025-06-13 06:00:00", "2025-06-13 09:00:00"]
+
+
+def test_offset_converted_to_table_timezone(conn):
+    moscow = timezone(timedelta(hours=3))
+    ingest(conn, [observation("2025-06-13T03:00:00")])
+
+    stats = ingest(conn, [observation("2025-06-13T00:00:00+00:00")], tz=moscow)
+
+    assert stats["inserted"] == 0
+    assert normalize_datetime("2025-06-13T03:00:00+03:00", moscow) == "2025-06-13 03:00:00"
+
+
+def test_offset_without_timezone_rejected():
+    with pytest.raises(ValueError):
+        normalize_datetime("2025-06-13T03:00:00+03:00")
@@ -0,0 +1,198 @@
+"""
+Инкрементальная загрузка наблюдений погоды в weather.sqlite.
+
+Вместо перезаписи таблицы целиком
+(`df.to_sql("weather", conn, if_exists="replace")`) добавляются только
+новые наблюдения; ноутбук загружает данные через connect() и ingest():
+  - уникальный индекс по datetime, повторная загрузка того же часа —
+    INSERT OR IGNORE (--mode ignore) или обновление изменившихся значений
+    (--mode upsert, INSERT ... ON CONFLICT(datetime) DO UPDATE);
+  - WAL и настроенные PRAGMA: чтение из ноутбука не блокирует запись;
+  - executemany пакетами по --batch-size строк, один пакет — одна
+    транзакция.
+Формат входа — JSON-список наблюдений, как raw_json в ноутбуке.
+Время в таблице хранится без часового пояса (местное время станции).
+Наблюдения со смещением ('...T03:00:00+03:00') переводятся в пояс
+--utc-offset; без этого параметра такие записи отклоняются: иначе один
+и тот же час лёг бы в таблицу второй строкой.
+
+    python weather_ingest.py feed.json --db weather.sqlite --mode upsert
+    curl -s https://.../feed.json | python weather_ingest.py - --only-new
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+COLUMNS = [
+    "pressure_mmhg",
+    "temperature_c",
+    "humidity_pct",
+    "wind_direction",
+    "wind_speed_ms",
+    "cloudiness_score",
+    "visibility_km",
+    "datetime",
+    "temperature_max_c",
+]
+VALUES = [c for c in COLUMNS if c != "datetime"]
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS weather (
+    pressure_mmhg REAL,
+    temperature_c REAL,
+    humidity_pct REAL,
+    wind_direction TEXT,
+    wind_speed_ms REAL,
+    cloudiness_score REAL,
+    visibility_km REAL,
+    datetime TIMESTAMP NOT NULL,
+    temperature_max_c REAL
+)
+"""
+
+# Таблица, созданная to_sql, уникальности не имеет: сначала убираем
+# дубликаты по времени (остаётся первая запись), затем создаём индекс.
+# Прежний неуникальный idx_weather_datetime становится лишним
+MIGRATE_UNIQUE = """
+BEGIN;
+DELETE FROM weather
+WHERE rowid NOT IN (SELECT min(rowid) FROM weather GROUP BY datetime);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_weather_datetime ON weather(datetime);
+DROP INDEX IF EXISTS idx_weather_datetime;
+COMMIT;
+"""
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",   # в WAL данные не теряются при падении процесса
+    "temp_store": "MEMORY",
+    "cache_size": -64000,      # 64 МБ
+    "mmap_size": 256 << 20,
+    "busy_timeout": 5000,
+}
+
+_placeholders = ", ".join("?" * len(COLUMNS))
+INSERT_IGNORE = f"INSERT OR IGNORE INTO weather ({', '.join(COLUMNS)}) VALUES ({_placeholders})"
+# обновляем строку, только если значения действительно изменились
+UPSERT = (
+    f"INSERT INTO weather ({', '.join(COLUMNS)}) VALUES ({_placeholders}) "
+    f"ON CONFLICT(datetime) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in VALUES)
+    + " WHERE " + " OR ".join(f"{c} IS NOT excluded.{c}" for c in VALUES)
+)
+MODES = {"ignore": INSERT_IGNORE, "upsert": UPSERT}
+
+
+def connect(path):
+    """Соединение с включённым WAL; таблица и уникальный индекс создаются при необходимости"""
+    conn = sqlite3.connect(path)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    with conn:
+        conn.execute(CREATE_TABLE)
+    has_unique = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_weather_datetime'"
+    ).fetchone()
+    if not has_unique:
+        conn.executescript(MIGRATE_UNIQUE)
+    return conn
+
+
+def normalize_datetime(value, tz=None):
+    """
+    '2025-06-13T03:00:00' -> '2025-06-13 03:00:00', как записывает to_sql.
+    Время со смещением переводится в пояс tz и теряет смещение;
+    без tz — ValueError.
+    """
+    moment = datetime.fromisoformat(str(value))
+    if moment.tzinfo is not None:
+        if tz is None:
+            raise ValueError(f"Время {value!r} со смещением: укажите часовой пояс таблицы")
+        moment = moment.astimezone(tz).replace(tzinfo=None)
+    return moment.isoformat(sep=" ")
+
+
+def to_row(record, tz=None):
+    return tuple(
+        normalize_datetime(record["datetime"], tz) if c == "datetime" else record.get(c)
+        for c in COLUMNS
+    )
+
+
+def latest_datetime(conn):
+    return conn.execute("SELECT max(datetime) FROM weather").fetchone()[0]
+
+
+def ingest(conn, records, mode="ignore", batch_size=500, only_new=False, tz=None):
+    """
+    Загрузить наблюдения (словари с ключами COLUMNS).
+    only_new — отбросить ещё до вставки всё, что не новее последней записи;
+    tz — часовой пояс таблицы для времени со смещением (normalize_datetime).
+    Возвращает статистику: прочитано, добавлено, обновлено, секунд.
+    """
+    sql = MODES[mode]
+    started = time.perf_counter()
+    rows = [to_row(record, tz) for record in records]
+    read = len(rows)
+    if only_new:
+        last = latest_datetime(conn)
+        if last is not None:
+            rows = [row for row in rows if row[COLUMNS.index("datetime")] > last]
+
+    count_before = conn.execute("SELECT count(*) FROM weather").fetchone()[0]
+    changes_before = conn.total_changes
+    for start in range(0, len(rows), batch_size):
+        with conn:  # пакет — одна транзакция
+            conn.executemany(sql, rows[start:start + batch_size])
+    seconds = time.perf_counter() - started
+
+    inserted = conn.execute("SELECT count(*) FROM weather").fetchone()[0] - count_before
+    return {
+        "read": read,
+        "inserted": inserted,
+        "updated": conn.total_changes - changes_before - inserted,
+        "seconds": seconds,
+    }
+
+
+def load_json(path):
+    if path == "-":
+        return json.load(sys.stdin)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="JSON-файл с наблюдениями или - для stdin")
+    parser.add_argument("--db", default="weather.sqlite")
+    parser.add_argument("--mode", choices=MODES, default="ignore")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--only-new", action="store_true", help="пропускать наблюдения не новее последнего в базе")
+    parser.add_argument(
+        "--utc-offset", type=float, default=None,
+        help="смещение времени таблицы от UTC, ч (например 3); нужно, если во входе время со смещением",
+    )
+    args = parser.parse_args()
+
+    tz = None if args.utc_offset is None else timezone(timedelta(hours=args.utc_offset))
+    conn = connect(args.db)
+    stats = ingest(conn, load_json(args.source), args.mode, args.batch_size, args.only_new, tz)
+    conn.execute("PRAGMA optimize")
+    conn.close()
+
+    rate = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(
+        f"прочитано {stats['read']}, добавлено {stats['inserted']}, "
+        f"обновлено {stats['updated']}, пропущено "
+        f"{stats['read'] - stats['inserted'] - stats['updated']}; "
+        f"{stats['seconds']:.3f} с, {rate:,.0f} строк/с"
+    )
+
+
+if __name__ == "__main__":
+    main()